@@ -4,32 +4,177 @@ Backend: Flask + SQLite + JWT Authentication
 """
 
 import os
+import re
+import atexit
+import base64
+import bisect
 import sqlite3
+import glob
+import gzip
 import hashlib
+import hmac
 import jwt
 import json
+import mimetypes
 import time
+import random
 import secrets
+import threading
+import logging.handlers
+import multiprocessing
+import queue
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import Flask, request, jsonify, send_from_directory, g
+from multiprocessing.managers import BaseManager
+import click
+from flask import Flask, request, jsonify, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from werkzeug.test import EnvironBuilder
+
+try:
+    import orjson   # optional: faster JSON responses (see JSON_PROVIDER)
+except ImportError:
+    orjson = None
+
+try:
+    import brotli   # optional: br as well as gzip for compressed responses
+except ImportError:
+    brotli = None
 
 # ─── Config ───────────────────────────────────────────────────────────────────
 BASE_DIR   = os.path.dirname(os.path.abspath(__file__))
-DB_PATH    = os.path.join(BASE_DIR, "urmart.db")
-FRONTEND   = os.path.join(BASE_DIR, "..", "frontend")
+DB_PATH    = os.environ.get("URMART_DB", os.path.join(BASE_DIR, "urmart.db"))
+FRONTEND   = os.environ.get("FRONTEND_DIR", os.path.join(BASE_DIR, "..", "frontend"))
 SECRET_KEY = os.environ.get("SECRET_KEY", secrets.token_hex(32))
 JWT_EXP_H  = 72   # token expires in 72 hours
-
-app = Flask(__name__, static_folder=FRONTEND, static_url_path="")
+COUNT_CAP  = int(os.environ.get("COUNT_CAP", 10000))  # row limit for ?count=approx
+
+# Connection pools (per worker process)
+DB_POOL_SIZE    = int(os.environ.get("DB_POOL_SIZE", 8))        # max open read connections
+DB_WRITE_POOL   = int(os.environ.get("DB_WRITE_POOL", 2))       # max open write connections
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))  # seconds to wait for a free one
+DB_STMT_CACHE   = int(os.environ.get("DB_STMT_CACHE", 256))     # prepared statements kept per connection
+DB_HEALTH_AFTER = float(os.environ.get("DB_HEALTH_AFTER", 30))  # re-check connections idle this long
+
+# Password hashing: "inline" runs scrypt on the request thread, "process" in a
+# pool of KDF_WORKERS processes with at most KDF_MAX_QUEUE jobs pending
+KDF_MODE      = os.environ.get("KDF_MODE", "inline")
+KDF_WORKERS   = int(os.environ.get("KDF_WORKERS", os.cpu_count() or 2))
+KDF_MAX_QUEUE = int(os.environ.get("KDF_MAX_QUEUE", 64))
+
+# Verified-token cache (per worker process; 0 disables)
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", 10000))
+AUTH_CACHE_TTL  = float(os.environ.get("AUTH_CACHE_TTL", 300))   # also bounds revocation lag across workers
+
+# Per-route latency/SQL metrics at /api/admin/metrics (per worker process)
+METRICS = os.environ.get("METRICS", "1") != "0"
+
+# Slow query log: statements slower than SLOW_QUERY_MS (0 = off) are appended
+# to SLOW_QUERY_LOG as NDJSON, rotated at SLOW_QUERY_LOG_MB
+SLOW_QUERY_MS      = float(os.environ.get("SLOW_QUERY_MS", 0))
+SLOW_QUERY_LOG     = os.environ.get("SLOW_QUERY_LOG", os.path.join(BASE_DIR, "slow_queries.ndjson"))
+SLOW_QUERY_LOG_MB  = float(os.environ.get("SLOW_QUERY_LOG_MB", 10))
+SLOW_QUERY_BACKUPS = int(os.environ.get("SLOW_QUERY_BACKUPS", 3))
+
+# Adds X-SQL-Queries / X-SQL-Time (ms) to every response; for benchmarks
+SQL_STATS = os.environ.get("SQL_STATS", "") == "1"
+
+# JSON encoding for responses: "auto" uses orjson when it is installed, "std" the stdlib
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto")
+
+# Response compression: bodies of at least COMPRESS_MIN bytes are gzip/brotli
+# encoded when the client accepts it (0 disables)
+COMPRESS_MIN   = int(os.environ.get("COMPRESS_MIN", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))   # gzip level for dynamic responses
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))   # br quality for dynamic responses
+
+# POST /api/batch: max sub-requests per call, and threads for running its reads concurrently
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 20))
+BATCH_THREADS   = int(os.environ.get("BATCH_THREADS", 4))
+
+# Static frontend files: max-age for files that aren't content-hashed or HTML,
+# and how often to re-scan FRONTEND_DIR for changes (0 = only at startup)
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 3600))
+STATIC_WATCH   = float(os.environ.get("STATIC_WATCH", 0))
+
+# Cart storage: "sql" reads and writes the cart table on every request;
+# "memory" serves carts from this process and writes changed ones back every
+# CART_FLUSH_INTERVAL seconds, journaling each change to CART_JOURNAL.<pid>.ndjson
+# ("" disables) until then; "shared" hosts that store in one process for all workers
+CART_STORE          = os.environ.get("CART_STORE", "sql")
+CART_FLUSH_INTERVAL = float(os.environ.get("CART_FLUSH_INTERVAL", 1))
+CART_JOURNAL        = os.environ.get("CART_JOURNAL", os.path.join(BASE_DIR, "cart_journal"))
+CART_MEMORY_MAX     = int(os.environ.get("CART_MEMORY_MAX", 50000))   # carts kept in memory
+# "shared" when another process already hosts the store (start.py --asgi --workers
+# starts one and hands uvicorn's workers its address and hex authkey)
+CART_MANAGER        = os.environ.get("CART_MANAGER", "")
+CART_MANAGER_KEY    = os.environ.get("CART_MANAGER_KEY", "")
+
+# Order event streams (server-sent events). Under start.py --workers each open
+# stream holds a request thread for up to ORDER_EVENTS_STREAM_TTL seconds, so keep
+# ORDER_EVENTS_MAX_STREAMS well below --threads; streams beyond it get a 503.
+# asgi.py serves them without a thread and caps them at ASGI_MAX_STREAMS instead
+ORDER_EVENTS_POLL        = float(os.environ.get("ORDER_EVENTS_POLL", 0.5))   # seconds between checks for other workers' events
+ORDER_EVENTS_BUFFER      = int(os.environ.get("ORDER_EVENTS_BUFFER", 1000))  # recent events kept in memory for replay
+ORDER_EVENTS_MAX_STREAMS = int(os.environ.get("ORDER_EVENTS_MAX_STREAMS", 4))
+ORDER_EVENTS_STREAM_TTL  = float(os.environ.get("ORDER_EVENTS_STREAM_TTL", 300))
+ORDER_EVENTS_PING        = float(os.environ.get("ORDER_EVENTS_PING", 15))    # heartbeat comment on idle streams
+ORDER_EVENTS_TICKET_TTL  = int(os.environ.get("ORDER_EVENTS_TICKET_TTL", 30))  # seconds a stream ticket is good for
+
+# Catalog read cache (per worker process; 0 disables)
+CATALOG_CACHE_SIZE = int(os.environ.get("CATALOG_CACHE_SIZE", 2048))
+CATALOG_CACHE_TTL  = float(os.environ.get("CATALOG_CACHE_TTL", 60))
+
+app = Flask(__name__, static_folder=None)   # serve_frontend() serves the frontend files
 app.config["SECRET_KEY"] = SECRET_KEY
 
+# ─── JSON ─────────────────────────────────────────────────────────────────────
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's default JSON provider with orjson doing the work.
+
+    Same output (sorted keys, compact, Flask's handling of dates and other
+    extra types) except that non-ASCII text is sent as UTF-8 rather than as
+    \\u escapes. Debug mode keeps the stdlib's indented output.
+    """
+
+    def _options(self):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        return options | orjson.OPT_SORT_KEYS if self.sort_keys else options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get("indent"):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+if JSON_PROVIDER == "orjson" and orjson is None:
+    raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed: pip install orjson")
+if JSON_PROVIDER in ("auto", "orjson") and orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # ─── CORS (manual, no flask-cors needed) ──────────────────────────────────────
 @app.after_request
 def add_cors(response):
     response.headers["Access-Control-Allow-Origin"]  = "*"
     response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS, PATCH"
+    response.headers["Access-Control-Expose-Headers"] = "X-Trace-Id"
+    if SQL_STATS:
+        response.headers["X-SQL-Queries"] = str(g.get("sql_queries", 0))
+        response.headers["X-SQL-Time"]    = f"{g.get('sql_time', 0.0) * 1000:.3f}"
     return response
 
 @app.before_request
@@ -42,181 +187,1218 @@ def handle_options():
         return response, 200
 
 # ─── Database ─────────────────────────────────────────────────────────────────
-def get_db():
+class ServerBusy(Exception):
+    """A bounded resource is saturated; the client should retry."""
+
+class PoolTimeout(ServerBusy):
+    pass
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections reused across requests.
+
+    Connections are opened lazily up to `size`, configured once (pragmas,
+    statement cache) and handed out LIFO so the hottest connection - and its
+    page cache - is reused first. A connection idle for longer than
+    `health_after` seconds is pinged before being handed out again.
+    """
+
+    def __init__(self, path, size=8, timeout=10.0, stmt_cache=256,
+                 health_after=30.0, pragmas=()):
+        self.path         = path
+        self.size         = size
+        self.timeout      = timeout
+        self.stmt_cache   = stmt_cache
+        self.health_after = health_after
+        self.pragmas      = pragmas
+        self._cond        = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self._pid     = os.getpid()
+        self._idle    = []      # stack of (conn, last_used)
+        self._open    = 0
+        self._in_use  = 0
+        self._stats   = {"checkouts": 0, "waits": 0, "wait_time": 0.0, "max_wait": 0.0,
+                         "timeouts": 0, "created": 0, "recycled": 0}
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               cached_statements=self.stmt_cache, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        start = time.perf_counter()
+        conn  = None
+        with self._cond:
+            if self._pid != os.getpid():
+                # Forked worker: never reuse the parent's connections
+                self._reset()
+            waited = False
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    last_used = None
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            wait = time.perf_counter() - start
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+            self._stats["waits"]     += waited
+            self._stats["wait_time"] += wait
+            self._stats["max_wait"]   = max(self._stats["max_wait"], wait)
+
+        try:
+            if conn is not None and time.monotonic() - last_used > self.health_after \
+                    and not self._healthy(conn):
+                self._stats["recycled"] += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                self._stats["created"] += 1
+        except Exception:
+            with self._cond:
+                self._open   -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self.discard(conn)
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._in_use -= 1
+            self._cond.notify()
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._open   -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                conn.close()
+            self._open -= len(self._idle)
+            self._idle  = []
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            return False
+
+    def stats(self):
+        with self._cond:
+            s = dict(self._stats)
+            s.update(size=self.size, open=self._open, in_use=self._in_use,
+                     idle=len(self._idle), stmt_cache=self.stmt_cache)
+        s["avg_wait_ms"] = round(s["wait_time"] / s["checkouts"] * 1000, 3) if s["checkouts"] else 0.0
+        s["wait_time"]   = round(s["wait_time"], 6)
+        s["max_wait_ms"] = round(s.pop("max_wait") * 1000, 3)
+        return s
+
+read_pool = ConnectionPool(
+    DB_PATH, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, stmt_cache=DB_STMT_CACHE,
+    health_after=DB_HEALTH_AFTER,
+    pragmas=("PRAGMA foreign_keys=ON", "PRAGMA query_only=ON"),
+)
+write_pool = ConnectionPool(
+    DB_PATH, size=DB_WRITE_POOL, timeout=DB_POOL_TIMEOUT, stmt_cache=DB_STMT_CACHE,
+    health_after=DB_HEALTH_AFTER,
+    pragmas=("PRAGMA foreign_keys=ON",),
+)
+
+def get_db(write=False):
+    if write:
+        if "wdb" not in g:
+            g.wdb = _checkout(write_pool)
+        return g.wdb
     if "db" not in g:
-        g.db = sqlite3.connect(DB_PATH)
-        g.db.row_factory = sqlite3.Row
-        g.db.execute("PRAGMA journal_mode=WAL")
-        g.db.execute("PRAGMA foreign_keys=ON")
+        g.db = _checkout(read_pool)
     return g.db
 
+def _checkout(pool):
+    start = time.perf_counter()
+    conn  = pool.acquire()
+    g.db_wait = g.get("db_wait", 0.0) + time.perf_counter() - start
+    return conn
+
 @app.teardown_appcontext
 def close_db(e=None):
     db = g.pop("db", None)
     if db:
-        db.close()
+        read_pool.release(db)
+    wdb = g.pop("wdb", None)
+    if wdb:
+        write_pool.release(wdb)
+
+@app.errorhandler(ServerBusy)
+def server_busy(e):
+    return err("Server busy, please retry", 503)
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+# Per-route request counts, latency histograms, SQL statement counts/time and
+# connection-pool wait, served in Prometheus text format at /api/admin/metrics.
+# Recording is a perf_counter pair and one short lock per request. Each worker
+# process keeps its own numbers.
+
+class RouteStats:
+    __slots__ = ("buckets", "count", "sum", "sql", "sql_time", "db_wait")
+
+    def __init__(self, n):
+        self.buckets  = [0] * (n + 1)   # per bucket, last is +Inf; cumulated on render
+        self.count    = 0
+        self.sum      = 0.0
+        self.sql      = 0
+        self.sql_time = 0.0
+        self.db_wait  = 0.0
+
+    def copy(self):
+        other = RouteStats(0)
+        for f in self.__slots__:
+            setattr(other, f, getattr(self, f))
+        other.buckets = list(self.buckets)
+        return other
+
+class Metrics:
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._routes = {}   # (method, route) -> RouteStats
+        self._status = {}   # (method, route, status) -> count
+
+    def observe(self, method, route, status, seconds, sql, sql_time, db_wait):
+        i   = bisect.bisect_left(self.BUCKETS, seconds)
+        key = (method, route)
+        with self._lock:
+            r = self._routes.get(key)
+            if r is None:
+                r = self._routes[key] = RouteStats(len(self.BUCKETS))
+            r.buckets[i] += 1
+            r.count      += 1
+            r.sum        += seconds
+            r.sql        += sql
+            r.sql_time   += sql_time
+            r.db_wait    += db_wait
+            skey = (method, route, status)
+            self._status[skey] = self._status.get(skey, 0) + 1
+
+    def render(self):
+        with self._lock:
+            routes = sorted((key, r.copy()) for key, r in self._routes.items())
+            status = dict(self._status)
+
+        # every process keeps its own counters; the pid keeps the series apart
+        # when a scraper sees several workers behind one address
+        worker = f'worker="{os.getpid()}"'
+        out = []
+        def family(name, kind, help_):
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+
+        family("urmart_http_requests_total", "counter", "Requests by route, method and status.")
+        for (method, route, code), n in sorted(status.items()):
+            out.append(f'urmart_http_requests_total{{{worker},method="{method}",route="{_label(route)}",status="{code}"}} {n}')
+
+        family("urmart_http_request_duration_seconds", "histogram", "Request latency by route.")
+        for (method, route), r in routes:
+            labels = f'{worker},method="{method}",route="{_label(route)}"'
+            total  = 0
+            for le, n in zip(self.BUCKETS + ("+Inf",), r.buckets):
+                total += n
+                out.append(f'urmart_http_request_duration_seconds_bucket{{{labels},le="{le}"}} {total}')
+            out.append(f"urmart_http_request_duration_seconds_sum{{{labels}}} {r.sum:.6f}")
+            out.append(f"urmart_http_request_duration_seconds_count{{{labels}}} {r.count}")
+
+        for name, attr, help_ in (
+            ("urmart_sql_statements_total", "sql",      "SQL statements run by route."),
+            ("urmart_sql_seconds_total",    "sql_time", "Time spent in SQL by route."),
+            ("urmart_db_wait_seconds_total", "db_wait", "Time spent waiting for a pooled connection by route."),
+        ):
+            family(name, "counter", help_)
+            for (method, route), r in routes:
+                value = getattr(r, attr)
+                out.append(f'{name}{{{worker},method="{method}",route="{_label(route)}"}} '
+                           + (str(value) if isinstance(value, int) else f"{value:.6f}"))
+
+        pools = (("read", read_pool.stats()), ("write", write_pool.stats()))
+        for name, key, kind, help_ in (
+            ("urmart_db_pool_checkouts_total",    "checkouts", "counter", "Connections handed out."),
+            ("urmart_db_pool_waits_total",        "waits",     "counter", "Checkouts that had to wait."),
+            ("urmart_db_pool_wait_seconds_total", "wait_time", "counter", "Total checkout wait."),
+            ("urmart_db_pool_timeouts_total",     "timeouts",  "counter", "Checkouts that gave up (503)."),
+            ("urmart_db_pool_in_use",             "in_use",    "gauge",   "Connections currently checked out."),
+            ("urmart_db_pool_open",               "open",      "gauge",   "Connections currently open."),
+        ):
+            family(name, kind, help_)
+            for pool, st in pools:
+                out.append(f'{name}{{{worker},pool="{pool}"}} {st[key]}')
+
+        caches = (("catalog", catalog_cache.info()), ("auth", token_cache.info()))
+        for name, key, help_ in (
+            ("urmart_cache_hits_total",   "hits",   "Cache hits."),
+            ("urmart_cache_misses_total", "misses", "Cache misses."),
+        ):
+            family(name, "counter", help_)
+            for cache, st in caches:
+                out.append(f'{name}{{{worker},cache="{cache}"}} {st[key]}')
+        return "\n".join(out) + "\n"
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics = Metrics()
+
+TRACE_ID_RE = re.compile(r"[\w.-]{1,64}")
+
+@app.before_request
+def start_request():
+    g.started = time.perf_counter()
+    # Keep an upstream proxy's id so its logs and ours line up
+    incoming   = request.headers.get("X-Trace-Id", "")
+    g.trace_id = incoming if TRACE_ID_RE.fullmatch(incoming) else secrets.token_hex(8)
+
+@app.after_request
+def finish_request(response):
+    if "started" not in g:
+        return response
+    response.headers["X-Trace-Id"] = g.trace_id
+    if METRICS:
+        metrics.observe(request.method, route_name(), response.status_code,
+                        time.perf_counter() - g.started, g.get("sql_queries", 0),
+                        g.get("sql_time", 0.0), g.get("db_wait", 0.0))
+    return response
+
+def route_name():
+    rule = request.url_rule
+    return rule.rule if rule else "<unmatched>"
+
+# ─── Compression ──────────────────────────────────────────────────────────────
+# Dynamic responses are compressed here. Static files are sent as is; their
+# .gz/.br twins are written once by precompress_static() (`flask --app app
+# compress-static`, or `start.py --precompress`) and picked by StaticFiles.
+# Registered after the metrics hook, so Flask runs it first and compression
+# time counts toward the request's latency.
+
+COMPRESSIBLE     = ("text/", "application/json", "application/javascript", "application/xml",
+                    "application/manifest+json", "image/svg+xml")
+PRECOMPRESS_EXTS = (".html", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".webmanifest")
+
+def accepted_encoding():
+    """Best encoding for a dynamic response: "br" (with brotli installed), "gzip" or None."""
+    return request.accept_encodings.best_match(["br", "gzip"] if brotli else ["gzip"])
+
+@app.after_request
+def compress_response(response):
+    if (not COMPRESS_MIN or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = accepted_encoding()
+    data     = response.get_data()
+    if not encoding or len(data) < COMPRESS_MIN:
+        return response
+    if encoding == "br":
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, COMPRESS_LEVEL, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+def precompress_static(root=None):
+    """Write max-level .gz (and .br, with brotli) twins of compressible files under root.
+
+    Skips files under COMPRESS_MIN, twins newer than their source and twins
+    that wouldn't be smaller. Returns the number of files written.
+    """
+    root    = root or FRONTEND
+    codecs  = [(".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+    if brotli:
+        codecs.append((".br", lambda d: brotli.compress(d, quality=11)))
+    written = 0
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d != "node_modules"]
+        for name in files:
+            src = os.path.join(dirpath, name)
+            if not name.endswith(PRECOMPRESS_EXTS) or os.path.getsize(src) < max(COMPRESS_MIN, 1):
+                continue
+            data = None
+            for ext, encode in codecs:
+                dst = src + ext
+                if os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src):
+                    continue
+                if data is None:
+                    with open(src, "rb") as f:
+                        data = f.read()
+                out = encode(data)
+                if len(out) >= len(data):
+                    continue
+                with open(dst + ".tmp", "wb") as f:
+                    f.write(out)
+                os.replace(dst + ".tmp", dst)
+                written += 1
+    if written and os.path.abspath(root) == static_files.root:
+        static_files.scan()
+    return written
+
+# ─── Slow query log ───────────────────────────────────────────────────────────
+# With SLOW_QUERY_MS set, any statement that takes longer is written as one JSON
+# line: normalized SQL, parameter types (never values), rows, duration, the
+# EXPLAIN QUERY PLAN and the request's trace id. `flask --app app slow-queries`
+# ranks the worst statements. Each worker appends to the same file, so give
+# workers separate SLOW_QUERY_LOG paths if rotation must be exact.
+
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def normalize_sql(sql):
+    """Literals to ?, IN-lists to (?...), whitespace collapsed: one shape per statement."""
+    sql = SQL_LITERAL_RE.sub("?", sql)
+    sql = SQL_IN_LIST_RE.sub("(?...)", sql)
+    return " ".join(sql.split())
+
+def params_shape(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: type(v).__name__ for k, v in params.items()}
+    return [type(v).__name__ for v in params]
+
+class SlowQueryLog:
+    def __init__(self, path, max_bytes, backups):
+        self.path      = path
+        self.max_bytes = max_bytes
+        self.backups   = backups
+        self._logger   = None
+        self._lock     = threading.Lock()
+
+    @property
+    def logger(self):
+        # Created on the first slow statement: no file, no handler until then
+        with self._lock:
+            if self._logger is None:
+                handler = logging.handlers.RotatingFileHandler(
+                    self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("urmart.slow_queries")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                self._logger = logger
+            return self._logger
+
+    def record(self, db, sql, params, rows, seconds):
+        try:
+            plan = [r[3] for r in db.execute("EXPLAIN QUERY PLAN " + sql, params)] \
+                if params is not None else []
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+        shape = normalize_sql(sql)
+        entry = {
+            "ts":     datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "trace":  g.get("trace_id"),
+            "route":  f"{request.method} {route_name()}" if has_request_context() else None,
+            "fp":     hashlib.sha1(shape.encode()).hexdigest()[:12],
+            "sql":    shape,
+            "params": params_shape(params),
+            "rows":   rows,
+            "ms":     round(seconds * 1000, 3),
+            "plan":   plan,
+            "pid":    os.getpid(),
+        }
+        self.logger.info(json.dumps(entry))
+
+    def files(self):
+        """Log files, oldest first."""
+        paths = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)] + [self.path]
+        return [p for p in paths if os.path.exists(p)]
+
+slow_log = SlowQueryLog(SLOW_QUERY_LOG, int(SLOW_QUERY_LOG_MB * 1024 * 1024), SLOW_QUERY_BACKUPS)
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+class TTLCache:
+    """Thread-safe LRU cache with a TTL and tag-based invalidation.
+
+    Entries carry tags (e.g. "product:p1"); invalidate_tags() drops every
+    entry holding any of the given tags. maxsize=0 disables caching.
+
+    Each tag (and clear()) also bumps a generation. A loader that read the
+    database before an invalidation must not store what it read after it:
+    take generation() before loading and pass it to set(), which then
+    skips the store if any of the entry's tags moved in between.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._data   = OrderedDict()   # key -> (expires_at, value, tags)
+        self._tags   = {}              # tag -> set of keys
+        self._gens   = {}              # tag -> times invalidated (one int per tag ever invalidated)
+        self._epoch  = 0               # times cleared
+        self._lock   = threading.Lock()
+        self._stats  = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0,
+                        "stale_loads": 0}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"]      += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def generation(self, tags=()):
+        """Snapshot for set(generation=...)."""
+        with self._lock:
+            return self._generation(tags)
+
+    def _generation(self, tags):
+        return (self._epoch, *(self._gens.get(tag, 0) for tag in tags))
+
+    def set(self, key, value, tags=(), ttl=None, generation=None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation(tags):
+                self._stats["stale_loads"] += 1   # invalidated while it was being loaded
+                return
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + (ttl or self.ttl), value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self._stats["evictions"] += 1
+
+    def get_or_load(self, key, loader, tags=(), ttl=None):
+        """Cached value for key, else loader() - cached unless it returns None."""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            generation = self.generation(tags)
+            value = loader()
+            if value is not None:
+                self.set(key, value, tags, ttl, generation)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._drop(key)
+                    self._stats["invalidations"] += 1
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._gens[tag] = self._gens.get(tag, 0) + 1
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+            self._tags.clear()
+
+    def _drop(self, key):
+        _, _, tags = self._data.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def info(self):
+        with self._lock:
+            s = dict(self._stats, size=len(self._data), maxsize=self.maxsize, ttl=self.ttl)
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / lookups, 4) if lookups else 0.0
+        return s
+
+# Categories, product detail and the home-page lists. Tags: "categories",
+# "product-lists" (featured/trending) and "product:<id>". Writers invalidate
+# after commit; other worker processes converge within CATALOG_CACHE_TTL.
+catalog_cache = TTLCache(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL)
+
+def invalidate_products(*pids):
+    """Drop cached catalog data for these products (and the lists they appear in) after commit."""
+    after_commit(lambda: catalog_cache.invalidate_tags("product-lists", *(f"product:{p}" for p in pids)))
+
+def _sql_done(start, db, sql, params, rows):
+    """Per-request statement count and time (metrics, SQL_STATS); slow statements to the log."""
+    elapsed       = time.perf_counter() - start
+    g.sql_queries = g.get("sql_queries", 0) + 1
+    g.sql_time    = g.get("sql_time", 0.0) + elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_log.record(db, sql, params, rows, elapsed)
 
 def query(sql, params=(), one=False):
-    db  = get_db()
-    cur = db.execute(sql, params)
-    db.commit()
+    """Read rows. Never commits; inside a transaction() it sees that transaction's writes."""
+    db    = g.get("tx") or get_db()
+    start = time.perf_counter()   # after the checkout: pool waits are db_wait, not SQL time
+    cur   = db.cursor()
+    cur.row_factory = None   # plain tuples: dicts are built straight from them, no sqlite3.Row in between
+    cur.execute(sql, params)
+    cols  = [d[0] for d in cur.description]
     if one:
         row = cur.fetchone()
-        return dict(row) if row else None
-    return [dict(r) for r in cur.fetchall()]
+        _sql_done(start, db, sql, params, int(row is not None))
+        return dict(zip(cols, row)) if row else None
+    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+    _sql_done(start, db, sql, params, len(rows))
+    return rows
+
+def execute(sql, params=()):
+    """Run a write statement. Outside a transaction() it commits on its own."""
+    with transaction() as db:
+        start = time.perf_counter()
+        cur   = db.execute(sql, params)
+        _sql_done(start, db, sql, params, cur.rowcount)
+        return cur
+
+def executemany(sql, seq):
+    with transaction() as db:
+        start = time.perf_counter()
+        cur   = db.executemany(sql, seq)
+        _sql_done(start, db, sql, None, cur.rowcount)   # no single parameter set to plan with
+        return cur
+
+@contextmanager
+def transaction():
+    """Unit of work: every query()/execute() in the block shares one commit.
+
+    Takes the write lock up front (BEGIN IMMEDIATE) so read-then-write steps
+    can't be invalidated by a concurrent writer. Nested blocks join the
+    outer transaction. The write connection goes back to its pool as soon
+    as the block ends: a request that kept it while it went on to wait for a
+    read connection could deadlock with requests holding read connections
+    while they wait for a write one.
+    """
+    if g.get("tx") is not None:
+        yield g.tx
+        return
+    db = get_db(write=True)
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        g.tx       = db
+        g.tx_hooks = []
+        try:
+            yield db
+            db.execute("COMMIT")
+        except BaseException:
+            db.rollback()
+            raise
+    finally:
+        g.tx  = None
+        hooks = g.pop("tx_hooks", [])
+        write_pool.release(g.pop("wdb"))
+    for hook in hooks:
+        hook()
+
+def after_commit(fn):
+    """Run fn once the current transaction commits (right away outside one)."""
+    if g.get("tx") is not None:
+        g.tx_hooks.append(fn)
+    else:
+        fn()
 
 def init_db():
-    db = sqlite3.connect(DB_PATH)
-    db.row_factory = sqlite3.Row
-    cur = db.cursor()
-
-    cur.executescript("""
-        CREATE TABLE IF NOT EXISTS users (
-            id          TEXT PRIMARY KEY,
-            name        TEXT NOT NULL,
-            email       TEXT UNIQUE NOT NULL,
-            phone       TEXT,
-            password    TEXT NOT NULL,
-            role        TEXT DEFAULT 'user',
-            avatar      TEXT DEFAULT '',
-            created_at  TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS addresses (
-            id          TEXT PRIMARY KEY,
-            user_id     TEXT NOT NULL,
-            label       TEXT DEFAULT 'Home',
-            line1       TEXT NOT NULL,
-            city        TEXT NOT NULL,
-            state       TEXT NOT NULL,
-            pincode     TEXT NOT NULL,
-            is_default  INTEGER DEFAULT 0,
-            created_at  TEXT NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS categories (
-            id          TEXT PRIMARY KEY,
-            name        TEXT NOT NULL,
-            emoji       TEXT NOT NULL,
-            sort_order  INTEGER DEFAULT 0
-        );
-
-        CREATE TABLE IF NOT EXISTS products (
-            id          TEXT PRIMARY KEY,
-            name        TEXT NOT NULL,
-            description TEXT DEFAULT '',
-            category_id TEXT NOT NULL,
-            emoji       TEXT NOT NULL,
-            brand       TEXT DEFAULT '',
-            weight      TEXT DEFAULT '',
-            price       REAL NOT NULL,
-            mrp         REAL NOT NULL,
-            discount    INTEGER DEFAULT 0,
-            stock       INTEGER DEFAULT 100,
-            rating      REAL DEFAULT 4.0,
-            review_count INTEGER DEFAULT 0,
-            is_active   INTEGER DEFAULT 1,
-            created_at  TEXT NOT NULL,
-            FOREIGN KEY(category_id) REFERENCES categories(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS product_images (
-            id          TEXT PRIMARY KEY,
-            product_id  TEXT NOT NULL,
-            url         TEXT NOT NULL,
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS cart (
-            id          TEXT PRIMARY KEY,
-            user_id     TEXT NOT NULL,
-            product_id  TEXT NOT NULL,
-            qty         INTEGER NOT NULL DEFAULT 1,
-            added_at    TEXT NOT NULL,
-            UNIQUE(user_id, product_id),
-            FOREIGN KEY(user_id)    REFERENCES users(id),
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS wishlist (
-            id          TEXT PRIMARY KEY,
-            user_id     TEXT NOT NULL,
-            product_id  TEXT NOT NULL,
-            added_at    TEXT NOT NULL,
-            UNIQUE(user_id, product_id),
-            FOREIGN KEY(user_id)    REFERENCES users(id),
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS orders (
-            id              TEXT PRIMARY KEY,
-            user_id         TEXT NOT NULL,
-            address_line    TEXT NOT NULL,
-            city            TEXT NOT NULL,
-            pincode         TEXT NOT NULL,
-            phone           TEXT NOT NULL,
-            subtotal        REAL NOT NULL,
-            delivery_fee    REAL NOT NULL,
-            discount        REAL NOT NULL,
-            total           REAL NOT NULL,
-            payment_method  TEXT NOT NULL,
-            payment_status  TEXT DEFAULT 'pending',
-            status          TEXT DEFAULT 'confirmed',
-            notes           TEXT DEFAULT '',
-            created_at      TEXT NOT NULL,
-            updated_at      TEXT NOT NULL,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS order_items (
-            id          TEXT PRIMARY KEY,
-            order_id    TEXT NOT NULL,
-            product_id  TEXT NOT NULL,
-            name        TEXT NOT NULL,
-            emoji       TEXT NOT NULL,
-            weight      TEXT NOT NULL,
-            price       REAL NOT NULL,
-            qty         INTEGER NOT NULL,
-            FOREIGN KEY(order_id)   REFERENCES orders(id),
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS reviews (
-            id          TEXT PRIMARY KEY,
-            product_id  TEXT NOT NULL,
-            user_id     TEXT NOT NULL,
-            user_name   TEXT NOT NULL,
-            rating      INTEGER NOT NULL,
-            comment     TEXT NOT NULL,
-            created_at  TEXT NOT NULL,
-            FOREIGN KEY(product_id) REFERENCES products(id),
-            FOREIGN KEY(user_id)    REFERENCES users(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS coupons (
-            id          TEXT PRIMARY KEY,
-            code        TEXT UNIQUE NOT NULL,
-            type        TEXT NOT NULL,
-            value       REAL NOT NULL,
-            min_order   REAL DEFAULT 0,
-            max_uses    INTEGER DEFAULT 100,
-            used_count  INTEGER DEFAULT 0,
-            expires_at  TEXT,
-            is_active   INTEGER DEFAULT 1
-        );
+    """Bring the schema up to date. On a current database this is two reads.
+
+    Demo data is not loaded here; see seed_db().
+    """
+    db = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        if stored_version(db) != SCHEMA_VERSION:
+            db.execute("PRAGMA journal_mode=WAL")
+            migrate(db)
+        _detect_search(db)
+    finally:
+        db.close()
+
+def seed_db():
+    """Load the demo admin, catalogue and coupons, once per SEED_VERSION.
+
+    Explicit (`flask --app app seed`, `python app.py`) rather than an import
+    side effect. Returns False if the database was already seeded.
+    """
+    db = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        row = db.execute("SELECT value FROM meta WHERE key='seed_version'").fetchone()
+        if row and int(row[0]) >= SEED_VERSION:
+            db.execute("ROLLBACK")
+            return False
+        _seed(db)
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('seed_version', ?)", (str(SEED_VERSION),))
+        db.execute("COMMIT")
+        return True
+    finally:
+        db.close()
+
+# ─── Schema migrations ────────────────────────────────────────────────────────
+# Ordered and append-only: never edit a shipped step, add a new one. Each step
+# runs once, in its own transaction, and is recorded in schema_version.
+SCHEMA_BASE = """
+    CREATE TABLE IF NOT EXISTS users (
+        id          TEXT PRIMARY KEY,
+        name        TEXT NOT NULL,
+        email       TEXT UNIQUE NOT NULL,
+        phone       TEXT,
+        password    TEXT NOT NULL,
+        role        TEXT DEFAULT 'user',
+        avatar      TEXT DEFAULT '',
+        created_at  TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS addresses (
+        id          TEXT PRIMARY KEY,
+        user_id     TEXT NOT NULL,
+        label       TEXT DEFAULT 'Home',
+        line1       TEXT NOT NULL,
+        city        TEXT NOT NULL,
+        state       TEXT NOT NULL,
+        pincode     TEXT NOT NULL,
+        is_default  INTEGER DEFAULT 0,
+        created_at  TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS categories (
+        id          TEXT PRIMARY KEY,
+        name        TEXT NOT NULL,
+        emoji       TEXT NOT NULL,
+        sort_order  INTEGER DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS products (
+        id          TEXT PRIMARY KEY,
+        name        TEXT NOT NULL,
+        description TEXT DEFAULT '',
+        category_id TEXT NOT NULL,
+        emoji       TEXT NOT NULL,
+        brand       TEXT DEFAULT '',
+        weight      TEXT DEFAULT '',
+        price       REAL NOT NULL,
+        mrp         REAL NOT NULL,
+        discount    INTEGER DEFAULT 0,
+        stock       INTEGER DEFAULT 100,
+        rating      REAL DEFAULT 4.0,
+        review_count INTEGER DEFAULT 0,
+        is_active   INTEGER DEFAULT 1,
+        created_at  TEXT NOT NULL,
+        FOREIGN KEY(category_id) REFERENCES categories(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS product_images (
+        id          TEXT PRIMARY KEY,
+        product_id  TEXT NOT NULL,
+        url         TEXT NOT NULL,
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS cart (
+        id          TEXT PRIMARY KEY,
+        user_id     TEXT NOT NULL,
+        product_id  TEXT NOT NULL,
+        qty         INTEGER NOT NULL DEFAULT 1,
+        added_at    TEXT NOT NULL,
+        UNIQUE(user_id, product_id),
+        FOREIGN KEY(user_id)    REFERENCES users(id),
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS wishlist (
+        id          TEXT PRIMARY KEY,
+        user_id     TEXT NOT NULL,
+        product_id  TEXT NOT NULL,
+        added_at    TEXT NOT NULL,
+        UNIQUE(user_id, product_id),
+        FOREIGN KEY(user_id)    REFERENCES users(id),
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS orders (
+        id              TEXT PRIMARY KEY,
+        user_id         TEXT NOT NULL,
+        address_line    TEXT NOT NULL,
+        city            TEXT NOT NULL,
+        pincode         TEXT NOT NULL,
+        phone           TEXT NOT NULL,
+        subtotal        REAL NOT NULL,
+        delivery_fee    REAL NOT NULL,
+        discount        REAL NOT NULL,
+        total           REAL NOT NULL,
+        payment_method  TEXT NOT NULL,
+        payment_status  TEXT DEFAULT 'pending',
+        status          TEXT DEFAULT 'confirmed',
+        notes           TEXT DEFAULT '',
+        created_at      TEXT NOT NULL,
+        updated_at      TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS order_items (
+        id          TEXT PRIMARY KEY,
+        order_id    TEXT NOT NULL,
+        product_id  TEXT NOT NULL,
+        name        TEXT NOT NULL,
+        emoji       TEXT NOT NULL,
+        weight      TEXT NOT NULL,
+        price       REAL NOT NULL,
+        qty         INTEGER NOT NULL,
+        FOREIGN KEY(order_id)   REFERENCES orders(id),
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS reviews (
+        id          TEXT PRIMARY KEY,
+        product_id  TEXT NOT NULL,
+        user_id     TEXT NOT NULL,
+        user_name   TEXT NOT NULL,
+        rating      INTEGER NOT NULL,
+        comment     TEXT NOT NULL,
+        created_at  TEXT NOT NULL,
+        FOREIGN KEY(product_id) REFERENCES products(id),
+        FOREIGN KEY(user_id)    REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS coupons (
+        id          TEXT PRIMARY KEY,
+        code        TEXT UNIQUE NOT NULL,
+        type        TEXT NOT NULL,
+        value       REAL NOT NULL,
+        min_order   REAL DEFAULT 0,
+        max_uses    INTEGER DEFAULT 100,
+        used_count  INTEGER DEFAULT 0,
+        expires_at  TEXT,
+        is_active   INTEGER DEFAULT 1
+    );
+"""
+
+SCHEMA_SEARCH = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, brand, description,
+        content='products', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, brand, description)
+        VALUES (new.rowid, new.name, new.brand, new.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand, description)
+        VALUES ('delete', old.rowid, old.name, old.brand, old.description);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, brand, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand, description)
+        VALUES ('delete', old.rowid, old.name, old.brand, old.description);
+        INSERT INTO products_fts(rowid, name, brand, description)
+        VALUES (new.rowid, new.name, new.brand, new.description);
+    END;
+
+    INSERT INTO products_fts(products_fts) VALUES('rebuild');
+"""
+
+SCHEMA_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_users_created          ON users(created_at);
+    CREATE INDEX IF NOT EXISTS idx_users_role             ON users(role);
+    CREATE INDEX IF NOT EXISTS idx_addresses_user         ON addresses(user_id, is_default);
+    CREATE INDEX IF NOT EXISTS idx_categories_sort        ON categories(sort_order);
+    CREATE INDEX IF NOT EXISTS idx_products_active_rank   ON products(is_active, review_count, id);
+    CREATE INDEX IF NOT EXISTS idx_products_category_rank ON products(is_active, category_id, review_count, id);
+    CREATE INDEX IF NOT EXISTS idx_products_discount      ON products(is_active, discount, id);
+    CREATE INDEX IF NOT EXISTS idx_products_created       ON products(created_at);
+    CREATE INDEX IF NOT EXISTS idx_wishlist_user_added    ON wishlist(user_id, added_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_user_created    ON orders(user_id, created_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_created         ON orders(created_at);
+    CREATE INDEX IF NOT EXISTS idx_orders_status_created  ON orders(status, created_at);
+    CREATE INDEX IF NOT EXISTS idx_order_items_order      ON order_items(order_id);
+    CREATE INDEX IF NOT EXISTS idx_order_items_product    ON order_items(product_id);
+    CREATE INDEX IF NOT EXISTS idx_reviews_product        ON reviews(product_id, created_at);
+"""
+
+# Dashboard rollups. Triggers keep them current inside the same transaction as
+# the write that changes them (checkout, status update, signup, product edits),
+# so /api/admin/stats reads a handful of rows whatever the order volume.
+SCHEMA_STATS = """
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name        TEXT PRIMARY KEY,
+        value       INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS stats_status (
+        status      TEXT PRIMARY KEY,
+        orders      INTEGER NOT NULL DEFAULT 0,
+        revenue     REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day         TEXT NOT NULL,
+        status      TEXT NOT NULL,
+        orders      INTEGER NOT NULL DEFAULT 0,
+        revenue     REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, status)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS stats_product_sales (
+        product_id  TEXT PRIMARY KEY,
+        units       INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_stats_product_units ON stats_product_sales(units);
+
+    CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users WHEN new.role='user' BEGIN
+        UPDATE stats_counters SET value=value+1 WHERE name='users';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users WHEN old.role='user' BEGIN
+        UPDATE stats_counters SET value=value-1 WHERE name='users';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_products_ai AFTER INSERT ON products WHEN new.is_active=1 BEGIN
+        UPDATE stats_counters SET value=value+1 WHERE name='products';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_products_au AFTER UPDATE OF is_active ON products
+    WHEN (old.is_active=1) != (new.is_active=1) BEGIN
+        UPDATE stats_counters SET value=value + (CASE WHEN new.is_active=1 THEN 1 ELSE -1 END)
+        WHERE name='products';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_products_ad AFTER DELETE ON products WHEN old.is_active=1 BEGIN
+        UPDATE stats_counters SET value=value-1 WHERE name='products';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_orders_ai AFTER INSERT ON orders BEGIN
+        INSERT INTO stats_status VALUES (new.status, 1, new.total)
+            ON CONFLICT(status) DO UPDATE SET orders=orders+1, revenue=revenue+excluded.revenue;
+        INSERT INTO stats_daily VALUES (substr(new.created_at,1,10), new.status, 1, new.total)
+            ON CONFLICT(day, status) DO UPDATE SET orders=orders+1, revenue=revenue+excluded.revenue;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_orders_au AFTER UPDATE OF status, total ON orders
+    WHEN old.status != new.status OR old.total != new.total BEGIN
+        UPDATE stats_status SET orders=orders-1, revenue=revenue-old.total WHERE status=old.status;
+        UPDATE stats_daily SET orders=orders-1, revenue=revenue-old.total
+        WHERE day=substr(old.created_at,1,10) AND status=old.status;
+        INSERT INTO stats_status VALUES (new.status, 1, new.total)
+            ON CONFLICT(status) DO UPDATE SET orders=orders+1, revenue=revenue+excluded.revenue;
+        INSERT INTO stats_daily VALUES (substr(new.created_at,1,10), new.status, 1, new.total)
+            ON CONFLICT(day, status) DO UPDATE SET orders=orders+1, revenue=revenue+excluded.revenue;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_orders_ad AFTER DELETE ON orders BEGIN
+        UPDATE stats_status SET orders=orders-1, revenue=revenue-old.total WHERE status=old.status;
+        UPDATE stats_daily SET orders=orders-1, revenue=revenue-old.total
+        WHERE day=substr(old.created_at,1,10) AND status=old.status;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_items_ai AFTER INSERT ON order_items BEGIN
+        INSERT INTO stats_product_sales VALUES (new.product_id, new.qty)
+            ON CONFLICT(product_id) DO UPDATE SET units=units+excluded.units;
+    END;
+"""
+
+# Per-product review aggregates: a 1-5 star histogram on products, from which
+# review_count (its sum) and rating (its mean) are recomputed by the same
+# trigger, so a new review costs one row update however many reviews exist.
+# Products with no review rows keep the rating/review_count they were created with.
+RATING_TOTAL = "(stars_1 + stars_2 + stars_3 + stars_4 + stars_5)"
+RATING_SUM   = "(stars_1 + 2*stars_2 + 3*stars_3 + 4*stars_4 + 5*stars_5)"
+
+SCHEMA_RATINGS = f"""
+    ALTER TABLE products ADD COLUMN stars_1 INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE products ADD COLUMN stars_2 INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE products ADD COLUMN stars_3 INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE products ADD COLUMN stars_4 INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE products ADD COLUMN stars_5 INTEGER NOT NULL DEFAULT 0;
+
+    CREATE TRIGGER IF NOT EXISTS reviews_rating_ai AFTER INSERT ON reviews BEGIN
+        UPDATE products SET
+            stars_1 = stars_1 + (new.rating = 1), stars_2 = stars_2 + (new.rating = 2),
+            stars_3 = stars_3 + (new.rating = 3), stars_4 = stars_4 + (new.rating = 4),
+            stars_5 = stars_5 + (new.rating = 5),
+            review_count = {RATING_TOTAL} + 1,
+            rating = ROUND(({RATING_SUM} + new.rating) * 1.0 / ({RATING_TOTAL} + 1), 1)
+        WHERE id = new.product_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reviews_rating_ad AFTER DELETE ON reviews BEGIN
+        UPDATE products SET
+            stars_1 = stars_1 - (old.rating = 1), stars_2 = stars_2 - (old.rating = 2),
+            stars_3 = stars_3 - (old.rating = 3), stars_4 = stars_4 - (old.rating = 4),
+            stars_5 = stars_5 - (old.rating = 5),
+            review_count = {RATING_TOTAL} - 1,
+            rating = CASE WHEN {RATING_TOTAL} > 1
+                          THEN ROUND(({RATING_SUM} - old.rating) * 1.0 / ({RATING_TOTAL} - 1), 1)
+                          ELSE rating END
+        WHERE id = old.product_id;
+    END;
+
+    -- keyset pagination for GET /api/products/<id>/reviews (REVIEW_SORTS)
+    DROP INDEX IF EXISTS idx_reviews_product;
+    CREATE INDEX IF NOT EXISTS idx_reviews_product_created ON reviews(product_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_reviews_product_rating  ON reviews(product_id, rating, created_at, id);
+"""
+
+# Order event log behind the SSE streams: triggers append a row when an order
+# is placed or its status changes, in the same transaction, so every worker
+# process sees every event and `seq` is a global, gap-free Last-Event-ID.
+# Only the newest ORDER_EVENTS_KEEP rows are kept.
+ORDER_EVENTS_KEEP = 10000
+
+SCHEMA_ORDER_EVENTS = f"""
+    CREATE TABLE IF NOT EXISTS order_events (
+        seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+        type        TEXT NOT NULL,
+        order_id    TEXT NOT NULL,
+        user_id     TEXT NOT NULL,
+        status      TEXT NOT NULL,
+        total       REAL NOT NULL,
+        created_at  TEXT NOT NULL
+    );
+
+    CREATE TRIGGER IF NOT EXISTS order_events_ai AFTER INSERT ON orders BEGIN
+        INSERT INTO order_events (type, order_id, user_id, status, total, created_at)
+            VALUES ('order.created', new.id, new.user_id, new.status, new.total, new.updated_at);
+        DELETE FROM order_events WHERE seq <= (SELECT MAX(seq) FROM order_events) - {ORDER_EVENTS_KEEP};
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS order_events_au AFTER UPDATE OF status ON orders
+    WHEN new.status IS NOT old.status BEGIN
+        INSERT INTO order_events (type, order_id, user_id, status, total, created_at)
+            VALUES ('order.status', new.id, new.user_id, new.status, new.total, new.updated_at);
+        DELETE FROM order_events WHERE seq <= (SELECT MAX(seq) FROM order_events) - {ORDER_EVENTS_KEEP};
+    END;
+"""
+
+# One index per PRODUCT_SORTS ordering, with and without the category filter,
+# so every /api/products page - first or cursor - is a range scan in sort
+# order instead of a sort of every active row. (review_count and discount
+# without a category are covered by SCHEMA_INDEXES; idx_products_created
+# stays for the admin list, which includes inactive products.)
+SCHEMA_SORT_INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_products_price             ON products(is_active, price, id);
+    CREATE INDEX IF NOT EXISTS idx_products_rating            ON products(is_active, rating, id);
+    CREATE INDEX IF NOT EXISTS idx_products_newest            ON products(is_active, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_products_category_price    ON products(is_active, category_id, price, id);
+    CREATE INDEX IF NOT EXISTS idx_products_category_rating   ON products(is_active, category_id, rating, id);
+    CREATE INDEX IF NOT EXISTS idx_products_category_newest   ON products(is_active, category_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_products_category_discount ON products(is_active, category_id, discount, id);
+"""
+
+# Order lists page by (created_at, id) and carts list by added_at: carry the
+# whole ORDER BY in the index so neither sorts in a temp b-tree.
+SCHEMA_LIST_INDEXES = """
+    DROP INDEX IF EXISTS idx_orders_user_created;
+    DROP INDEX IF EXISTS idx_orders_created;
+    DROP INDEX IF EXISTS idx_orders_status_created;
+    CREATE INDEX IF NOT EXISTS idx_orders_user_created_id   ON orders(user_id, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_orders_created_id        ON orders(created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_orders_status_created_id ON orders(status, created_at, id);
+    CREATE INDEX IF NOT EXISTS idx_cart_user_added          ON cart(user_id, added_at);
+"""
+
+def backfill_ratings(db, prefix=""):
+    """Recompute histogram, count and rating from the reviews of products whose id starts with prefix."""
+    db.execute("""UPDATE products SET stars_1=r.s1, stars_2=r.s2, stars_3=r.s3, stars_4=r.s4, stars_5=r.s5,
+                         review_count=r.n, rating=ROUND(r.total * 1.0 / r.n, 1)
+                  FROM (SELECT product_id, SUM(rating=1) s1, SUM(rating=2) s2, SUM(rating=3) s3,
+                               SUM(rating=4) s4, SUM(rating=5) s5, COUNT(*) n, SUM(rating) total
+                        FROM reviews WHERE product_id LIKE ? GROUP BY product_id) r
+                  WHERE products.id=r.product_id""", (prefix + "%",))
+
+def _ratings_step(db):
+    run_script(db, SCHEMA_RATINGS)
+    backfill_ratings(db)
+
+def backfill_stats(db):
+    """Recompute every rollup from the base tables (inside the caller's transaction)."""
+    run_script(db, """
+        DELETE FROM stats_counters;
+        DELETE FROM stats_status;
+        DELETE FROM stats_daily;
+        DELETE FROM stats_product_sales;
+
+        INSERT INTO stats_counters VALUES
+            ('users',    (SELECT COUNT(*) FROM users WHERE role='user')),
+            ('products', (SELECT COUNT(*) FROM products WHERE is_active=1));
+
+        INSERT INTO stats_status
+            SELECT status, COUNT(*), SUM(total) FROM orders GROUP BY status;
+
+        INSERT INTO stats_daily
+            SELECT substr(created_at,1,10), status, COUNT(*), SUM(total) FROM orders GROUP BY 1, 2;
+
+        INSERT INTO stats_product_sales
+            SELECT product_id, SUM(qty) FROM order_items GROUP BY product_id;
     """)
+
+def _stats_step(db):
+    run_script(db, SCHEMA_STATS)
+    backfill_stats(db)
+
+def _search_step(db):
+    try:
+        run_script(db, SCHEMA_SEARCH)
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        # SQLite built without FTS5: search falls back to LIKE
+
+MIGRATIONS = [
+    (1, "base tables",          SCHEMA_BASE),
+    (2, "product search index", _search_step),
+    (3, "secondary indexes",    SCHEMA_INDEXES),
+    (4, "dashboard rollups",    _stats_step),
+    (5, "token revocation",     "ALTER TABLE users ADD COLUMN tokens_after INTEGER NOT NULL DEFAULT 0"),
+    (6, "app metadata",         "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"),
+    (7, "review aggregates",    _ratings_step),
+    (8, "order events",         SCHEMA_ORDER_EVENTS),
+    (9, "product sort indexes", SCHEMA_SORT_INDEXES),
+    (10, "list sort indexes",   SCHEMA_LIST_INDEXES),
+    # whole seconds let a token issued in the same second as a revocation survive it
+    (11, "revocation in ms",    "UPDATE users SET tokens_after = tokens_after * 1000"),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_script(db, script):
+    """Run a multi-statement script inside the caller's transaction.
+
+    Unlike executescript(), this doesn't commit first.
+    """
+    stmt = ""
+    for line in script.splitlines(keepends=True):
+        stmt += line
+        if sqlite3.complete_statement(stmt):
+            db.execute(stmt)
+            stmt = ""
+    if stmt.strip():
+        db.execute(stmt)
+
+def stored_version(db):
+    """Schema version without creating anything: 0 for a new database."""
+    try:
+        return db.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+def schema_version(db):
+    db.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version     INTEGER PRIMARY KEY,
+        name        TEXT NOT NULL,
+        applied_at  TEXT NOT NULL
+    )""")
+    return db.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def migrate(db):
+    """Apply pending migrations; `db` must be in autocommit mode. Returns the versions applied."""
+    current = schema_version(db)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema v{current} is newer than this app (v{SCHEMA_VERSION})")
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version <= current:
+            continue
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if callable(step):
+                step(db)
+            else:
+                run_script(db, step)
+            db.execute("INSERT INTO schema_version VALUES (?,?,?)", (version, name, _now()))
+            db.execute("COMMIT")
+        except BaseException:
+            db.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+# ─── Search index ─────────────────────────────────────────────────────────────
+# FTS5 index over products(name, brand, description). It is an external-content
+# table keyed by products.rowid and kept in sync by triggers, so every write to
+# products (admin routes included) updates it in the same transaction. Falls
+# back to LIKE matching when SQLite is built without FTS5.
+SEARCH_FTS     = False
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)   # bm25 weights: name, brand, description
+
+def _detect_search(db):
+    global SEARCH_FTS
+    SEARCH_FTS = bool(db.execute("SELECT 1 FROM sqlite_master WHERE name='products_fts'").fetchone())
+
+def rebuild_search(db):
+    """Repopulate the index from products (also needed after VACUUM, which may renumber rowids)."""
+    db.execute("INSERT INTO products_fts(products_fts) VALUES('rebuild')")
+    db.execute("INSERT INTO products_fts(products_fts) VALUES('optimize')")
     db.commit()
-    _seed(db)
-    db.close()
+
+def fts_query(text):
+    """Free text -> FTS5 query: every word must match as a prefix of some token."""
+    words = re.findall(r"\w+", text)
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words) or None
 
 # ─── Seed ─────────────────────────────────────────────────────────────────────
+SEED_VERSION = 1   # bump when the demo data below changes
+
 def _seed(db):
+    """Insert missing demo rows (inside the caller's transaction)."""
     # Admin user
     if not db.execute("SELECT 1 FROM users WHERE email='admin@urmart.com'").fetchone():
-        db.execute("""INSERT INTO users VALUES (?,?,?,?,?,?,?,?)""",
+        db.execute("""INSERT INTO users (id,name,email,phone,password,role,avatar,created_at)
+                      VALUES (?,?,?,?,?,?,?,?)""",
             ("admin", "Admin", "admin@urmart.com", "9999999999",
-             _hash("admin123"), "admin", "", _now()))
+             hash_password("admin123", inline=True), "admin", "", _now()))
 
     # Categories
     cats = [
@@ -226,9 +1408,7 @@ def _seed(db):
         ("frozen","Frozen","🧊",7),("household","Household","🧹",8),
         ("personal","Personal Care","🧴",9),
     ]
-    for c in cats:
-        if not db.execute("SELECT 1 FROM categories WHERE id=?", (c[0],)).fetchone():
-            db.execute("INSERT INTO categories VALUES (?,?,?,?)", c)
+    db.executemany("INSERT OR IGNORE INTO categories VALUES (?,?,?,?)", cats)
 
     # Products
     products = [
@@ -259,11 +1439,9 @@ def _seed(db):
         ("p25","Laundry Detergent","Concentrated laundry detergent. Works in cold water.","household","🧺","WashWell","2kg",599,680,12,50,4.5,312),
         ("p26","Shampoo","Nourishing shampoo for all hair types. Sulfate-free.","personal","🚿","HairLux","400ml",349,400,13,65,4.4,267),
     ]
-    for p in products:
-        if not db.execute("SELECT 1 FROM products WHERE id=?", (p[0],)).fetchone():
-            db.execute("""INSERT INTO products
-                (id,name,description,category_id,emoji,brand,weight,price,mrp,discount,stock,rating,review_count,is_active,created_at)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,1,?)""", (*p, _now()))
+    db.executemany("""INSERT OR IGNORE INTO products
+        (id,name,description,category_id,emoji,brand,weight,price,mrp,discount,stock,rating,review_count,is_active,created_at)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,1,?)""", [(*p, _now()) for p in products])
 
     # Coupons
     coupons = [
@@ -271,11 +1449,7 @@ def _seed(db):
         ("c2","SAVE50","flat",50,299,500,0,None,1),
         ("c3","FRESH20","percent",20,499,200,0,None,1),
     ]
-    for c in coupons:
-        if not db.execute("SELECT 1 FROM coupons WHERE id=?", (c[0],)).fetchone():
-            db.execute("INSERT INTO coupons VALUES (?,?,?,?,?,?,?,?,?)", c)
-
-    db.commit()
+    db.executemany("INSERT OR IGNORE INTO coupons VALUES (?,?,?,?,?,?,?,?,?)", coupons)
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 def _now():
@@ -284,18 +1458,152 @@ def _now():
 def _id():
     return secrets.token_hex(8)
 
-def _hash(pw):
-    return hashlib.sha256(pw.encode()).hexdigest()
-
-def make_token(user_id, role):
+# ─── Passwords ────────────────────────────────────────────────────────────────
+# Stored as scrypt$<n>$<r>$<p>$<salt hex>$<key hex>. Legacy rows hold a bare
+# unsalted SHA-256 digest and are re-hashed on the next successful login.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2**14, 8, 1
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+class KDFBusy(ServerBusy):
+    pass
+
+class KDFPool:
+    """Runs key-derivation work inline or in a bounded process pool.
+
+    In "process" mode hashing is shipped to a fixed set of worker processes,
+    so a login storm can use at most `workers` cores and its 16 MiB-per-hash
+    working set stays out of the web process; jobs beyond `max_queue` pending
+    are refused with KDFBusy rather than piling up behind the storm.
+    """
+
+    def __init__(self, mode="inline", workers=2, max_queue=64):
+        self.mode      = mode
+        self.workers   = workers
+        self.max_queue = max_queue
+        self._slots    = threading.BoundedSemaphore(max_queue)
+        self._lock     = threading.Lock()
+        self._pool     = None
+        self._pid      = None
+        self._stats    = {"submitted": 0, "completed": 0, "rejected": 0, "pending": 0,
+                          "busy_time": 0.0, "max_time": 0.0}
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # spawn, not fork: forking a multi-threaded server can deadlock the
+                # child. Entry scripts need the usual `if __name__ == "__main__"` guard.
+                self._pool = ProcessPoolExecutor(self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+                self._pid  = os.getpid()
+            return self._pool
+
+    def run(self, fn, *args, **kwargs):
+        if self.mode != "process":
+            return self._timed(fn, *args, **kwargs)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise KDFBusy("Password hashing queue is full")
+        try:
+            return self._timed(lambda: self._executor().submit(fn, *args, **kwargs).result())
+        finally:
+            self._slots.release()
+
+    def _timed(self, fn, *args, **kwargs):
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["pending"]   += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            took = time.perf_counter() - start
+            with self._lock:
+                self._stats["pending"]   -= 1
+                self._stats["completed"] += 1
+                self._stats["busy_time"] += took
+                self._stats["max_time"]   = max(self._stats["max_time"], took)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+        s.update(mode=self.mode, workers=self.workers, max_queue=self.max_queue)
+        s["avg_ms"]    = round(s["busy_time"] / s["completed"] * 1000, 2) if s["completed"] else 0.0
+        s["max_ms"]    = round(s.pop("max_time") * 1000, 2)
+        s["busy_time"] = round(s["busy_time"], 3)
+        return s
+
+kdf_pool = KDFPool(KDF_MODE, KDF_WORKERS, KDF_MAX_QUEUE)
+
+def _scrypt(password, salt, n, r, p, inline=False):
+    run = (lambda fn, *a, **kw: fn(*a, **kw)) if inline else kdf_pool.run
+    return run(hashlib.scrypt, password.encode(), salt=salt, n=n, r=r, p=p,
+               maxmem=SCRYPT_MAXMEM, dklen=32)
+
+def hash_password(password, inline=False):
+    salt = secrets.token_bytes(16)
+    key  = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, inline)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${key.hex()}"
+
+# Verified in place of a real hash when the email is unknown. Nothing derives to all zeros.
+DUMMY_HASH = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${'00' * 16}${'00' * 32}"
+
+def verify_password(password, stored):
+    """(matches, needs_rehash) for a password against its stored hash."""
+    if stored.startswith("scrypt$"):
+        _, n, r, p, salt, key = stored.split("$")
+        params  = (int(n), int(r), int(p))
+        matches = hmac.compare_digest(_scrypt(password, bytes.fromhex(salt), *params).hex(), key)
+        return matches, matches and params != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.compare_digest(legacy, stored), True
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+def make_token(user_id, role, tokens_after=0):
+    """Pass the user's `tokens_after` so the token is issued strictly after the last revocation."""
     payload = {
-        "sub":  user_id,
-        "role": role,
-        "exp":  datetime.now(timezone.utc) + timedelta(hours=JWT_EXP_H),
-        "iat":  datetime.now(timezone.utc),
+        "sub":    user_id,
+        "role":   role,
+        "exp":    datetime.now(timezone.utc) + timedelta(hours=JWT_EXP_H),
+        "iat":    datetime.now(timezone.utc),
+        "iat_ms": max(_now_ms(), tokens_after + 1),
     }
     return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
 
+STREAM_TICKET_AUDIENCE = "urmart:order-events"
+
+def make_stream_ticket(user_id, role):
+    """Short-lived JWT that only opens event streams; the `aud` keeps it from working as a token."""
+    now = datetime.now(timezone.utc)
+    payload = {"sub": user_id, "role": role, "aud": STREAM_TICKET_AUDIENCE,
+               "exp": now + timedelta(seconds=ORDER_EVENTS_TICKET_TTL), "iat": now,
+               "iat_ms": _now_ms()}
+    return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+
+def encode_cursor(*values):
+    """Opaque keyset cursor: the sort-key values of the last row served."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def int_arg(name, default, lo, hi):
+    """?name= as an int clamped to [lo, hi], or None if it isn't an integer."""
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        return None
+    return min(max(value, lo), hi)
+
 def ok(data=None, msg="Success", **kwargs):
     r = {"success": True, "message": msg}
     if data is not None:
@@ -307,20 +1615,82 @@ def err(msg, code=400):
     return jsonify({"success": False, "message": msg}), code
 
 # ─── Auth Middleware ───────────────────────────────────────────────────────────
+# Verified tokens are cached by SHA-256 digest until min(exp, AUTH_CACHE_TTL),
+# so repeat requests skip the base64/JSON/HMAC work. Tokens issued at or before
+# a user's `tokens_after` (epoch ms, bumped on password change) are rejected.
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+
+class AuthError(Exception):
+    pass
+
+def _issued_ms(payload):
+    # tokens from before `iat_ms` only have whole-second `iat`
+    return payload.get("iat_ms", payload.get("iat", 0) * 1000)
+
+def verify_token(token):
+    """(user_id, role) for a valid token, else raise AuthError."""
+    key    = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token expired")
+    except jwt.InvalidTokenError:
+        raise AuthError("Invalid token")
+    tags = (f"user:{payload['sub']}",)
+    generation = token_cache.generation(tags)   # a revocation committed during the read wins
+    user = query("SELECT tokens_after FROM users WHERE id=?", (payload["sub"],), one=True)
+    if user and _issued_ms(payload) <= user["tokens_after"]:
+        raise AuthError("Token revoked")
+    identity = (payload["sub"], payload["role"])
+    ttl = min(AUTH_CACHE_TTL, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, identity, tags=tags, ttl=ttl, generation=generation)
+    return identity
+
+def revoke_tokens(user_id):
+    """Invalidate every token issued to user_id so far (call inside a transaction).
+    Returns the new `tokens_after`, for make_token()."""
+    cutoff = _now_ms()
+    execute("UPDATE users SET tokens_after=? WHERE id=?", (cutoff, user_id))
+    after_commit(lambda: token_cache.invalidate_tags(f"user:{user_id}"))
+    return cutoff
+
+def verify_stream_ticket(ticket):
+    """(user_id, role) for a valid stream ticket, else raise AuthError. Not cached: each opens one stream."""
+    try:
+        payload = jwt.decode(ticket, SECRET_KEY, algorithms=["HS256"], audience=STREAM_TICKET_AUDIENCE)
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Ticket expired")
+    except jwt.InvalidTokenError:
+        raise AuthError("Invalid ticket")
+    user = query("SELECT tokens_after FROM users WHERE id=?", (payload["sub"],), one=True)
+    if not user or _issued_ms(payload) <= user["tokens_after"]:
+        raise AuthError("Ticket revoked")
+    return payload["sub"], payload["role"]
+
+# Routes that also take ?ticket= (from POST /api/orders/events/ticket):
+# EventSource can't set headers, and the token itself stays out of URLs and logs
+TICKET_ENDPOINTS = {"order_events_stream", "admin_order_events_stream"}
+
 def require_auth(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        token = request.headers.get("Authorization", "").replace("Bearer ", "")
-        if not token:
-            return err("Missing token", 401)
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            g.user_id = payload["sub"]
-            g.role    = payload["role"]
-        except jwt.ExpiredSignatureError:
-            return err("Token expired", 401)
-        except jwt.InvalidTokenError:
-            return err("Invalid token", 401)
+        identity = g.get("batch_auth")   # /api/batch checked the token once for all its items
+        if identity is None:
+            token  = request.headers.get("Authorization", "").replace("Bearer ", "")
+            ticket = request.args.get("ticket", "") if request.endpoint in TICKET_ENDPOINTS else ""
+            if not token and not ticket:
+                return err("Missing token", 401)
+            try:
+                identity = verify_token(token) if token else verify_stream_ticket(ticket)
+            except AuthError as e:
+                return err(str(e), 401)
+        elif isinstance(identity, AuthError):
+            return err(str(identity), 401)
+        g.user_id, g.role = identity
         return f(*args, **kwargs)
     return wrapper
 
@@ -333,25 +1703,38 @@ def require_admin(f):
         return f(*args, **kwargs)
     return wrapper
 
+# Columns a product carries in API responses, in response order. Product
+# queries select these by name, never `*`, so new table columns stay internal.
+PRODUCT_FIELDS  = ("id", "name", "description", "category_id", "emoji", "brand", "weight", "price",
+                   "mrp", "discount", "stock", "rating", "review_count", "is_active", "created_at")
+PRODUCT_COLUMNS = ", ".join(PRODUCT_FIELDS)
+
 def product_row(p):
-    """Format a product row for API response"""
-    return {
-        "id":          p["id"],
-        "name":        p["name"],
-        "description": p["description"],
-        "category_id": p["category_id"],
-        "emoji":       p["emoji"],
-        "brand":       p["brand"],
-        "weight":      p["weight"],
-        "price":       p["price"],
-        "mrp":         p["mrp"],
-        "discount":    p["discount"],
-        "stock":       p["stock"],
-        "rating":      p["rating"],
-        "review_count":p["review_count"],
-        "is_active":   bool(p["is_active"]),
-        "created_at":  p["created_at"],
-    }
+    """Format a product row for API response. Rows from query() are fresh dicts, so in place."""
+    if "is_active" in p:
+        p["is_active"] = bool(p["is_active"])
+    return p
+
+def product_fields():
+    """Columns asked for with ?fields=name,price (id always included); all by default.
+
+    None if a name isn't a product field.
+    """
+    raw = request.args.get("fields", "").strip()
+    if not raw:
+        return PRODUCT_FIELDS
+    wanted = {f.strip() for f in raw.split(",")} - {""}
+    if not wanted <= set(PRODUCT_FIELDS):
+        return None
+    return tuple(f for f in PRODUCT_FIELDS if f in wanted or f == "id")
+
+def project(rows, fields):
+    """Sparse copies of cached product rows; the cached rows themselves stay whole."""
+    if fields is PRODUCT_FIELDS:
+        return rows
+    return [{f: r[f] for f in fields} for r in rows]
+
+FIELDS_ERROR = "Unknown field in fields=; allowed: " + ", ".join(PRODUCT_FIELDS)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # AUTH ROUTES
@@ -372,11 +1755,17 @@ def register():
     if query("SELECT 1 FROM users WHERE email=?", (email,), one=True):
         return err("Email already registered")
 
-    uid = _id()
-    query("INSERT INTO users VALUES (?,?,?,?,?,?,?,?)",
-          (uid, name, email, phone, _hash(password), "user", "", _now()))
+    # Hash before taking the write lock - it's the slow part
+    pw_hash = hash_password(password)
+    with transaction():
+        if query("SELECT 1 FROM users WHERE email=?", (email,), one=True):
+            return err("Email already registered")
+
+        uid = _id()
+        execute("INSERT INTO users (id,name,email,phone,password,role,avatar,created_at) VALUES (?,?,?,?,?,?,?,?)",
+                (uid, name, email, phone, pw_hash, "user", "", _now()))
 
-    user = query("SELECT * FROM users WHERE id=?", (uid,), one=True)
+        user = query("SELECT * FROM users WHERE id=?", (uid,), one=True)
     token = make_token(uid, "user")
     return ok({"token": token, "user": _safe_user(user)}, "Account created", code=201)
 
@@ -387,12 +1776,17 @@ def login():
     email    = (d.get("email") or "").strip().lower()
     password = d.get("password") or ""
 
-    user = query("SELECT * FROM users WHERE email=? AND password=?",
-                 (email, _hash(password)), one=True)
-    if not user:
+    user = query("SELECT * FROM users WHERE email=?", (email,), one=True)
+    # unknown emails cost the same scrypt call, so timing doesn't reveal which emails have accounts
+    matches, stale = verify_password(password, user["password"] if user else DUMMY_HASH)
+    if not matches or not user:
         return err("Invalid email or password", 401)
+    if stale:
+        # Upgrade legacy / outdated hashes while we have the plaintext
+        execute("UPDATE users SET password=? WHERE id=? AND password=?",
+                (hash_password(password), user["id"], user["password"]))
 
-    token = make_token(user["id"], user["role"])
+    token = make_token(user["id"], user["role"], user["tokens_after"])
     return ok({"token": token, "user": _safe_user(user)})
 
 
@@ -406,7 +1800,7 @@ def me():
 
 
 def _safe_user(u):
-    return {k: v for k, v in u.items() if k != "password"}
+    return {k: v for k, v in u.items() if k not in ("password", "tokens_after")}
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # USER ROUTES
@@ -420,7 +1814,7 @@ def update_profile():
     phone = (d.get("phone") or "").strip()
     if not name:
         return err("Name is required")
-    query("UPDATE users SET name=?, phone=? WHERE id=?", (name, phone, g.user_id))
+    execute("UPDATE users SET name=?, phone=? WHERE id=?", (name, phone, g.user_id))
     user = query("SELECT * FROM users WHERE id=?", (g.user_id,), one=True)
     return ok(_safe_user(user))
 
@@ -433,12 +1827,18 @@ def change_password():
     new_pw  = d.get("new_password") or ""
     if len(new_pw) < 6:
         return err("New password must be at least 6 characters")
-    user = query("SELECT * FROM users WHERE id=? AND password=?",
-                 (g.user_id, _hash(old_pw)), one=True)
-    if not user:
+    user = query("SELECT * FROM users WHERE id=?", (g.user_id,), one=True)
+    if not user or not verify_password(old_pw, user["password"])[0]:
         return err("Old password is incorrect", 401)
-    query("UPDATE users SET password=? WHERE id=?", (_hash(new_pw), g.user_id))
-    return ok(msg="Password changed")
+    pw_hash = hash_password(new_pw)
+    with transaction():
+        # Conditional on the hash we verified, so a concurrent change can't be overwritten
+        if not execute("UPDATE users SET password=? WHERE id=? AND password=?",
+                       (pw_hash, g.user_id, user["password"])).rowcount:
+            return err("Password was changed concurrently, please retry", 409)
+        # Sign out every other session; this one continues with a fresh token
+        cutoff = revoke_tokens(g.user_id)
+    return ok({"token": make_token(g.user_id, user["role"], cutoff)}, "Password changed")
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # ADDRESSES
@@ -458,25 +1858,27 @@ def add_address():
         if not d.get(f):
             return err(f"{f} is required")
     aid = _id()
-    # If first address, make it default
-    existing = query("SELECT COUNT(*) as c FROM addresses WHERE user_id=?", (g.user_id,), one=True)
-    is_default = 1 if existing["c"] == 0 else 0
-    query("INSERT INTO addresses VALUES (?,?,?,?,?,?,?,?,?)",
-          (aid, g.user_id, d.get("label","Home"), d["line1"], d["city"],
-           d["state"], d["pincode"], is_default, _now()))
-    return ok(query("SELECT * FROM addresses WHERE id=?", (aid,), one=True))
+    with transaction():
+        # If first address, make it default
+        existing = query("SELECT COUNT(*) as c FROM addresses WHERE user_id=?", (g.user_id,), one=True)
+        is_default = 1 if existing["c"] == 0 else 0
+        execute("INSERT INTO addresses VALUES (?,?,?,?,?,?,?,?,?)",
+                (aid, g.user_id, d.get("label","Home"), d["line1"], d["city"],
+                 d["state"], d["pincode"], is_default, _now()))
+        return ok(query("SELECT * FROM addresses WHERE id=?", (aid,), one=True))
 
 @app.route("/api/addresses/<aid>", methods=["DELETE"])
 @require_auth
 def delete_address(aid):
-    query("DELETE FROM addresses WHERE id=? AND user_id=?", (aid, g.user_id))
+    execute("DELETE FROM addresses WHERE id=? AND user_id=?", (aid, g.user_id))
     return ok(msg="Address deleted")
 
 @app.route("/api/addresses/<aid>/default", methods=["PUT"])
 @require_auth
 def set_default_address(aid):
-    query("UPDATE addresses SET is_default=0 WHERE user_id=?", (g.user_id,))
-    query("UPDATE addresses SET is_default=1 WHERE id=? AND user_id=?", (aid, g.user_id))
+    with transaction():
+        execute("UPDATE addresses SET is_default=0 WHERE user_id=?", (g.user_id,))
+        execute("UPDATE addresses SET is_default=1 WHERE id=? AND user_id=?", (aid, g.user_id))
     return ok(msg="Default address set")
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -485,88 +1887,699 @@ def set_default_address(aid):
 
 @app.route("/api/categories", methods=["GET"])
 def get_categories():
-    rows = query("SELECT * FROM categories ORDER BY sort_order")
+    rows = catalog_cache.get_or_load(
+        "categories", lambda: query("SELECT * FROM categories ORDER BY sort_order"),
+        tags=("categories",))
     return ok(rows)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # PRODUCTS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# sort option -> (column, direction); `id` breaks ties so cursors are stable.
+# "relevance" ranks by BM25 score and only applies to full-text searches.
+PRODUCT_SORTS = {
+    "relevance":  ("score", "ASC"),
+    "price_asc":  ("price", "ASC"),
+    "price_desc": ("price", "DESC"),
+    "rating":     ("rating", "DESC"),
+    "discount":   ("discount", "DESC"),
+    "newest":     ("created_at", "DESC"),
+    "default":    ("review_count", "DESC"),
+}
+
+def product_filter(sort, category=None, search="", match=None):
+    """FROM and WHERE of a product list: (source, where, params).
+
+    get_products and check-query-plans both build on this, so the plan check
+    sees the statements the route runs.
+    """
+    source = "products"
+    where  = "WHERE is_active=1"
+    params = []
+    if sort == "relevance":
+        source = ("products JOIN (SELECT rowid AS fts_rowid, bm25(products_fts, ?, ?, ?) AS score"
+                  " FROM products_fts WHERE products_fts MATCH ?) ON fts_rowid = products.rowid")
+        params += [*SEARCH_WEIGHTS, match]
+    elif match:
+        where += " AND rowid IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)"
+        params.append(match)
+    elif search:
+        where += " AND (name LIKE ? OR brand LIKE ? OR description LIKE ?)"
+        params += [f"%{search}%", f"%{search}%", f"%{search}%"]
+    if category:
+        where += " AND category_id=?";  params.append(category)
+    return source, where, params
+
+def product_count_sql(source, where, capped=False):
+    """COUNT(*) of a product list; `capped` stops at a LIMIT bound as the last parameter."""
+    if capped:
+        return f"SELECT COUNT(*) as c FROM (SELECT 1 FROM {source} {where} LIMIT ?)"
+    return f"SELECT COUNT(*) as c FROM {source} {where}"
+
+def product_page_sql(columns, sort, source, where, params, last=None, per_page=50, offset=None):
+    """One page in PRODUCT_SORTS[sort] order, after the keyset values `last` or at `offset`."""
+    col, direction = PRODUCT_SORTS[sort]
+    sql    = f"SELECT {columns} FROM {source} {where}"
+    params = list(params)
+    if last:
+        sql += f" AND ({col}, id) {'<' if direction == 'DESC' else '>'} (?, ?)"
+        params += last
+    sql += f" ORDER BY {col} {direction}, id {direction} LIMIT ?"
+    params.append(per_page + 1)
+    if offset is not None:
+        sql += " OFFSET ?"
+        params.append(offset)
+    return sql, params
+
 @app.route("/api/products", methods=["GET"])
 def get_products():
+    """List products.
+
+    Two pagination modes: `page`/`per_page` (OFFSET) or `cursor` (keyset,
+    constant cost at any depth). Every page carries a `next_cursor`.
+    `count=exact|approx|none` controls how `total` is computed.
+    `fields=id,name,price` selects only those columns.
+    """
     category = request.args.get("category")
     search   = request.args.get("search", "").strip()
     sort     = request.args.get("sort", "default")
     page     = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 50))
-    offset   = (page - 1) * per_page
+    per_page = min(max(int(request.args.get("per_page", 50)), 1), 200)
+    cursor   = request.args.get("cursor")
+    count    = request.args.get("count", "exact")
+    fields   = product_fields()
+    match    = fts_query(search) if search and SEARCH_FTS else None
+    if fields is None:
+        return err(FIELDS_ERROR)
+    if sort not in PRODUCT_SORTS or (sort == "relevance" and not match):
+        sort = "default"
+    col, direction = PRODUCT_SORTS[sort]
+    source, where, params = product_filter(sort, category, search, match)
+
+    extra = {}
+    if count == "none":
+        total = None
+    elif count == "approx":
+        c = query(product_count_sql(source, where, capped=True), params + [COUNT_CAP + 1], one=True)["c"]
+        total = min(c, COUNT_CAP)
+        extra["total_approx"] = c > COUNT_CAP
+    else:
+        total = query(product_count_sql(source, where), params, one=True)["c"]
+
+    # the sort column is needed for next_cursor even when not asked for
+    hidden = () if col in fields else (col,)
+    last   = None
+    if cursor:
+        last = decode_cursor(cursor, 3)
+        if not last or last[0] != sort:
+            return err("Invalid cursor")
+        last = last[1:]
+        page = None
+    sql, params = product_page_sql(", ".join(fields + hidden), sort, source, where, params, last, per_page,
+                                   offset=None if page is None else (page - 1) * per_page)
 
-    sql    = "SELECT * FROM products WHERE is_active=1"
-    params = []
+    rows = query(sql, params)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(sort, rows[-1][col], rows[-1]["id"])
+    for r in rows:
+        product_row(r)
+        for c in hidden:
+            del r[c]
+    return ok(rows, total=total, page=page, per_page=per_page,
+              next_cursor=next_cursor, **extra)
 
-    if category:
-        sql += " AND category_id=?";  params.append(category)
-    if search:
-        sql += " AND (name LIKE ? OR brand LIKE ? OR description LIKE ?)"
-        params += [f"%{search}%", f"%{search}%", f"%{search}%"]
 
-    sort_map = {
-        "price_asc":  "price ASC",
-        "price_desc": "price DESC",
-        "rating":     "rating DESC",
-        "discount":   "discount DESC",
-        "newest":     "created_at DESC",
-        "default":    "review_count DESC",
-    }
-    sql += f" ORDER BY {sort_map.get(sort, 'review_count DESC')}"
+@app.route("/api/products/<pid>", methods=["GET"])
+def get_product(pid):
+    data = cached_product(pid)
+    if not data:
+        return err("Product not found", 404)
+    return ok(data)
 
-    total = len(query(sql, params))
-    sql  += f" LIMIT {per_page} OFFSET {offset}"
-    rows  = query(sql, params)
-    return ok([product_row(r) for r in rows], total=total, page=page, per_page=per_page)
 
+def cached_product(pid):
+    return catalog_cache.get_or_load(f"product:{pid}", lambda: _load_product(pid),
+                                     tags=(f"product:{pid}",))
 
-@app.route("/api/products/<pid>", methods=["GET"])
-def get_product(pid):
-    p = query("SELECT * FROM products WHERE id=? AND is_active=1", (pid,), one=True)
+
+def _load_product(pid):
+    p = query(f"SELECT {PRODUCT_COLUMNS}, stars_1, stars_2, stars_3, stars_4, stars_5"
+              " FROM products WHERE id=? AND is_active=1", (pid,), one=True)
     if not p:
-        return err("Product not found", 404)
+        return None
     cat  = query("SELECT * FROM categories WHERE id=?", (p["category_id"],), one=True)
-    revs = query("SELECT * FROM reviews WHERE product_id=? ORDER BY created_at DESC LIMIT 20", (pid,))
+    revs, next_cursor = review_page(pid)
     data = product_row(p)
+    data["rating_histogram"] = {str(n): data.pop(f"stars_{n}") for n in range(1, 6)}
     data["category"] = cat
     data["reviews"]  = revs
-    return ok(data)
+    data["reviews_next_cursor"] = next_cursor   # more via GET /api/products/<id>/reviews?cursor=
+    return data
+
 
+FEATURED_SQL = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE is_active=1 AND discount>=15 ORDER BY discount DESC LIMIT 8"
+TRENDING_SQL = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE is_active=1 ORDER BY review_count DESC LIMIT 12"
 
 @app.route("/api/products/featured", methods=["GET"])
 def featured_products():
-    rows = query("SELECT * FROM products WHERE is_active=1 AND discount>=15 ORDER BY discount DESC LIMIT 8")
-    return ok([product_row(r) for r in rows])
+    fields = product_fields()
+    if fields is None:
+        return err(FIELDS_ERROR)
+    rows = catalog_cache.get_or_load("featured", lambda: [product_row(r) for r in query(FEATURED_SQL)],
+                                     tags=("product-lists",))
+    return ok(project(rows, fields))
 
 
 @app.route("/api/products/trending", methods=["GET"])
 def trending_products():
-    rows = query("SELECT * FROM products WHERE is_active=1 ORDER BY review_count DESC LIMIT 12")
-    return ok([product_row(r) for r in rows])
+    fields = product_fields()
+    if fields is None:
+        return err(FIELDS_ERROR)
+    rows = catalog_cache.get_or_load("trending", lambda: [product_row(r) for r in query(TRENDING_SQL)],
+                                     tags=("product-lists",))
+    return ok(project(rows, fields))
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # CART (server-side per user)
 # ═══════════════════════════════════════════════════════════════════════════════
+# Routes go through `cart_store` (CART_STORE). Every store deals in lines -
+# {id, product_id, qty, added_at} - and keeps the cart table's item ids, so
+# /api/cart/<item_id> means the same thing whichever one is configured.
+
+class CartError(Exception):
+    """A cart change the store refused; the message is for the user."""
+
+class SqlCartStore:
+    """Reads and writes the cart table directly, in the request's connection."""
+
+    def lines(self, user_id):
+        return query("SELECT id, product_id, qty, added_at FROM cart WHERE user_id=? ORDER BY added_at DESC",
+                     (user_id,))
+
+    def add(self, user_id, pid, qty, stock):
+        with transaction():
+            existing = query("SELECT id, qty FROM cart WHERE user_id=? AND product_id=?", (user_id, pid), one=True)
+            if existing:
+                new_qty = existing["qty"] + qty
+                if new_qty > stock:
+                    raise CartError(f"Only {stock} in stock")
+                execute("UPDATE cart SET qty=? WHERE id=?", (new_qty, existing["id"]))
+            else:
+                execute("INSERT INTO cart VALUES (?,?,?,?,?)", (_id(), user_id, pid, qty, _now()))
+
+    def set_qty(self, user_id, item_id, qty):
+        execute("UPDATE cart SET qty=? WHERE id=? AND user_id=?", (qty, item_id, user_id))
+
+    def remove(self, user_id, item_id):
+        execute("DELETE FROM cart WHERE id=? AND user_id=?", (item_id, user_id))
+
+    def clear(self, user_id):
+        execute("DELETE FROM cart WHERE user_id=?", (user_id,))
+
+    def merge(self, user_id, items):
+        """Add (product_id, qty) pairs, e.g. a guest cart after login."""
+        with transaction():
+            for pid, qty in items:
+                existing = query("SELECT id, qty FROM cart WHERE user_id=? AND product_id=?", (user_id, pid), one=True)
+                if existing:
+                    execute("UPDATE cart SET qty=? WHERE id=?", (existing["qty"] + qty, existing["id"]))
+                else:
+                    execute("INSERT OR IGNORE INTO cart VALUES (?,?,?,?,?)", (_id(), user_id, pid, qty, _now()))
+
+    def checked_out(self, user_id, lines):
+        pass   # checkout() deleted the rows in its own transaction
+
+    def flush(self):
+        return 0
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"backend": "sql"}
+
+
+class MemoryCartStore:
+    """Carts served from memory and written behind to the cart table.
+
+    A user's cart is loaded from the table on first use; after that reads and
+    changes never touch the database. Changed ("dirty") carts are written back
+    by a background thread every `flush_interval` seconds, all of them in one
+    transaction. Each change is also appended to `<journal>.<pid>.ndjson`
+    until it has been flushed: if the process dies first, the next one to
+    start replays the journal into the table. A cart the table refuses (say,
+    a product deleted since it was added) is set aside in
+    `<journal>.rejected.ndjson` rather than retried forever. Beyond
+    `max_carts`, the least recently used clean carts are dropped. State is
+    per process.
+    """
+
+    def __init__(self, path, flush_interval=1.0, journal="", max_carts=50000):
+        self.path           = path
+        self.flush_interval = flush_interval
+        self.journal        = journal
+        self.max_carts      = max_carts
+        self._lock          = threading.Lock()
+        self._flush_lock    = threading.Lock()
+        self._start_lock    = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid    = os.getpid()
+        self._carts  = OrderedDict()   # user_id -> {"v": version, "lines": {product_id: [id, qty, added_at]}}
+        self._dirty  = set()
+        self._rdb    = None
+        self._wdb    = None
+        self._fd     = None
+        self._thread = None
+        self._stop   = threading.Event()
+        self._stats  = {"loads": 0, "evictions": 0, "flushes": 0, "flushed_carts": 0,
+                        "flush_errors": 0, "flush_time": 0.0, "recovered_carts": 0, "rejected_carts": 0}
+
+    def _begin(self):
+        """start() on first use in this process. Not under _lock."""
+        if self._thread is None or self._pid != os.getpid():
+            self.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=DB_POOL_TIMEOUT, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _cart(self, user_id):
+        cart = self._carts.get(user_id)
+        if cart is not None:
+            self._carts.move_to_end(user_id)
+            return cart
+        if self._rdb is None:
+            self._rdb = self._connect()
+        rows = self._rdb.execute("SELECT product_id, id, qty, added_at FROM cart WHERE user_id=?",
+                                 (user_id,)).fetchall()
+        cart = self._carts[user_id] = {"v": 0, "lines": {r[0]: list(r[1:]) for r in rows}}
+        self._stats["loads"] += 1
+        if len(self._carts) > self.max_carts:
+            victim = next((u for u in self._carts if u not in self._dirty), None)
+            if victim is not None and victim != user_id:
+                del self._carts[victim]
+                self._stats["evictions"] += 1
+        return cart
+
+    def _changed(self, user_id, cart):
+        cart["v"] += 1
+        self._dirty.add(user_id)
+        if self.journal:
+            if self._fd is None:
+                self._fd = os.open(self._journal_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            os.write(self._fd, self._entry(user_id))
+
+    def _entry(self, user_id):
+        lines = [[pid, *line] for pid, line in self._carts[user_id]["lines"].items()]
+        return (json.dumps([user_id, lines]) + "\n").encode()
+
+    def _journal_path(self, pid=None):
+        return f"{self.journal}.{pid or os.getpid()}.ndjson"
+
+    def _find(self, cart, item_id):
+        return next((pid for pid, line in cart["lines"].items() if line[0] == item_id), None)
+
+    def lines(self, user_id):
+        self._begin()
+        with self._lock:
+            cart  = self._cart(user_id)
+            lines = [{"id": i, "product_id": pid, "qty": qty, "added_at": at}
+                     for pid, (i, qty, at) in cart["lines"].items()]
+        lines.sort(key=lambda l: l["added_at"], reverse=True)
+        return lines
+
+    def add(self, user_id, pid, qty, stock):
+        self._begin()
+        with self._lock:
+            cart = self._cart(user_id)
+            line = cart["lines"].get(pid)
+            if line:
+                if line[1] + qty > stock:
+                    raise CartError(f"Only {stock} in stock")
+                line[1] += qty
+            else:
+                cart["lines"][pid] = [_id(), qty, _now()]
+            self._changed(user_id, cart)
+
+    def set_qty(self, user_id, item_id, qty):
+        self._begin()
+        with self._lock:
+            cart = self._cart(user_id)
+            pid  = self._find(cart, item_id)
+            if pid is not None:
+                cart["lines"][pid][1] = qty
+                self._changed(user_id, cart)
+
+    def remove(self, user_id, item_id):
+        self._begin()
+        with self._lock:
+            cart = self._cart(user_id)
+            pid  = self._find(cart, item_id)
+            if pid is not None:
+                del cart["lines"][pid]
+                self._changed(user_id, cart)
+
+    def clear(self, user_id):
+        self._begin()
+        with self._lock:
+            cart = self._cart(user_id)
+            if cart["lines"]:
+                cart["lines"].clear()
+                self._changed(user_id, cart)
+
+    def merge(self, user_id, items):
+        """Add (product_id, qty) pairs, e.g. a guest cart after login."""
+        self._begin()
+        with self._lock:
+            cart = self._cart(user_id)
+            for pid, qty in items:
+                line = cart["lines"].get(pid)
+                if line:
+                    line[1] += qty
+                else:
+                    cart["lines"][pid] = [_id(), qty, _now()]
+            self._changed(user_id, cart)
+
+    def checked_out(self, user_id, lines):
+        """Take ordered lines out of the cart once the order has committed.
+
+        Anything added since checkout read the cart stays. The cart is marked
+        dirty either way: a flush that snapshotted it before the order could
+        have written the old lines back after checkout deleted them.
+        """
+        self._begin()
+        with self._lock:
+            cart = self._cart(user_id)
+            for ordered in lines:
+                line = cart["lines"].get(ordered["product_id"])
+                if line and line[0] == ordered["id"]:
+                    line[1] -= ordered["qty"]
+                    if line[1] <= 0:
+                        del cart["lines"][ordered["product_id"]]
+            self._changed(user_id, cart)
+
+    def flush(self):
+        """Write every dirty cart back in one transaction; returns how many."""
+        self._begin()
+        with self._flush_lock:
+            with self._lock:
+                snapshot = {u: (self._carts[u]["v"],
+                                [(i, u, pid, qty, at) for pid, (i, qty, at) in self._carts[u]["lines"].items()])
+                            for u in self._dirty}
+            if not snapshot:
+                return 0
+            start = time.perf_counter()
+            try:
+                if self._wdb is None:
+                    self._wdb = self._connect()
+                rejected = self._write_carts(self._wdb, {u: rows for u, (_, rows) in snapshot.items()})
+            except sqlite3.Error as e:
+                with self._lock:
+                    self._stats["flush_errors"] += 1
+                app.logger.warning("Cart flush of %d cart(s) failed, will retry: %s", len(snapshot), e)
+                return 0
+            with self._lock:
+                for u, (version, _) in snapshot.items():
+                    if self._carts[u]["v"] == version:   # dirty carts are never evicted
+                        self._dirty.discard(u)
+                self._compact()
+                self._stats["flushes"]       += 1
+                self._stats["flushed_carts"] += len(snapshot) - len(rejected)
+                self._stats["flush_time"]    += time.perf_counter() - start
+            return len(snapshot) - len(rejected)
+
+    @staticmethod
+    def _write(db, carts):
+        """Replace each user's rows with their cart's lines, in one transaction."""
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("DELETE FROM cart WHERE user_id=?", [(u,) for u in carts])
+            db.executemany("INSERT INTO cart VALUES (?,?,?,?,?)", [row for rows in carts.values() for row in rows])
+            db.execute("COMMIT")
+        except BaseException:
+            db.rollback()
+            raise
+
+    def _write_carts(self, db, carts):
+        """_write() carts together or, if one breaks a constraint, one by one.
+
+        Carts that fail on their own are set aside and their user ids returned.
+        OperationalError (locked, disk full) has nothing to do with any one
+        cart, so it propagates and the caller retries everything later.
+        """
+        try:
+            self._write(db, carts)
+            return set()
+        except sqlite3.OperationalError:
+            raise
+        except sqlite3.Error:
+            pass
+        rejected = set()
+        for user_id, rows in carts.items():
+            try:
+                self._write(db, {user_id: rows})
+            except sqlite3.OperationalError:
+                raise
+            except sqlite3.Error as e:
+                self._reject(user_id, rows, e)
+                rejected.add(user_id)
+        return rejected
+
+    def _reject(self, user_id, rows, error):
+        app.logger.error("Cart of user %s can't be written back, set aside: %s", user_id, error)
+        if self.journal:
+            entry = [user_id, [[pid, i, qty, at] for i, _, pid, qty, at in rows]]
+            with open(f"{self.journal}.rejected.ndjson", "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        with self._lock:
+            self._stats["rejected_carts"] += 1
+
+    def _compact(self):
+        """After a flush the journal only needs the carts still dirty. Under _lock."""
+        if self._fd is None:
+            return
+        if not self._dirty:
+            os.ftruncate(self._fd, 0)
+            return
+        path = self._journal_path()
+        with open(path + ".tmp", "wb") as f:
+            for u in self._dirty:
+                f.write(self._entry(u))
+        os.replace(path + ".tmp", path)
+        os.close(self._fd)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _recover(self):
+        """Replay journals whose process is gone (crashed or killed before flushing).
+
+        A journal that can't be replayed is logged and renamed to `.failed`, so
+        it neither stops the store from starting nor gets replayed again.
+        """
+        if not self.journal:
+            return
+        for path in glob.glob(glob.escape(self.journal) + ".*.ndjson"):
+            pid = path[len(self.journal) + 1:-len(".ndjson")]
+            if not pid.isdigit() or (int(pid) != os.getpid() and _pid_alive(int(pid))):
+                continue
+            try:
+                recovered = self._replay(path)
+            except Exception:
+                app.logger.exception("Cart journal %s can't be replayed, moving it to %s.failed", path, path)
+                try:
+                    os.replace(path, path + ".failed")
+                except OSError:
+                    app.logger.exception("Cart journal %s can't be moved aside", path)
+                continue
+            with self._lock:
+                self._stats["recovered_carts"] += recovered
+
+    def _replay(self, path):
+        """Write one journal's carts to the table, then delete it; returns how many were written."""
+        carts = {}
+        with open(path) as f:
+            for line in f:
+                try:
+                    user_id, lines = json.loads(line)
+                except ValueError:
+                    continue   # torn final write
+                carts[user_id] = [(i, user_id, pid_, qty, at) for pid_, i, qty, at in lines]
+        recovered = 0
+        if carts:
+            db = self._connect()
+            try:
+                recovered = len(carts) - len(self._write_carts(db, carts))
+            finally:
+                db.close()
+            app.logger.warning("Recovered %d unflushed cart(s) from %s", recovered, path)
+        os.unlink(path)
+        return recovered
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                app.logger.exception("Cart flush failed")
+
+    def start(self):
+        """Replay orphaned journals and start the flusher, once per process.
+
+        The first cart call does this if nothing did before. It runs outside
+        _lock, and a journal that fails to replay is set aside, so cart calls
+        aren't held by it or failed by it.
+        """
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._reset()   # forked: the parent's carts, connections and journal aren't ours
+            if self._thread is not None:
+                return
+            self._recover()
+            self._thread = threading.Thread(target=self._run, name="cart-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self):
+        """Stop the flusher and write everything back (on process exit)."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            if self._fd is not None and not self._dirty:
+                os.close(self._fd)
+                self._fd = None
+                os.unlink(self._journal_path())
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats, backend="memory", pid=os.getpid(), carts=len(self._carts),
+                     dirty=len(self._dirty), max_carts=self.max_carts,
+                     flush_interval=self.flush_interval, journal=bool(self.journal))
+        s["avg_flush_ms"] = round(s["flush_time"] / s["flushes"] * 1000, 3) if s["flushes"] else 0.0
+        s["flush_time"]   = round(s["flush_time"], 6)
+        return s
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return pid > 0
+
+
+class CartManager(BaseManager):
+    pass
+
+_hosted_store = None
+_hosted_lock  = threading.Lock()
+
+def _hosted_cart_store():
+    """The manager process's single MemoryCartStore; every worker's proxy refers to it."""
+    global _hosted_store
+    with _hosted_lock:
+        if _hosted_store is None:
+            _hosted_store = MemoryCartStore(DB_PATH, CART_FLUSH_INTERVAL, CART_JOURNAL, CART_MEMORY_MAX)
+        return _hosted_store
+
+CartManager.register("store", callable=_hosted_cart_store)
+
+class SharedCartStore:
+    """One MemoryCartStore for every worker process, hosted by a manager process.
+
+    start() it in the master before forking (start.py does) and each worker
+    reaches it through a proxy over a local socket, so all workers see the
+    same carts. Without start() it starts on first use, shared only with
+    processes forked after that. With CART_MANAGER set it never starts one
+    and connects to that address instead: workers that weren't forked from
+    the master (uvicorn's) find the store that way.
+    """
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._manager = None
+        self._owner   = None
+        self._proxy   = None
+        self._pid     = None
+
+    def start(self):
+        with self._lock:
+            if self._manager is None and not CART_MANAGER:
+                # spawn, as for KDFPool: the server process runs threads of its own
+                self._manager = CartManager(ctx=multiprocessing.get_context("spawn"))
+                self._manager.start()
+                self._owner = os.getpid()
+
+    def _store(self):
+        if self._pid != os.getpid():
+            self.start()
+            with self._lock:
+                if self._pid != os.getpid():
+                    if CART_MANAGER:
+                        client = CartManager(CART_MANAGER, authkey=bytes.fromhex(CART_MANAGER_KEY))
+                    else:
+                        client = CartManager(self._manager.address)   # workers inherit the master's authkey
+                    client.connect()
+                    self._proxy = client.store()
+                    self._pid   = os.getpid()
+        return self._proxy
+
+    def __getattr__(self, name):
+        if name in ("lines", "add", "set_qty", "remove", "clear", "merge", "checked_out", "flush"):
+            return getattr(self._store(), name)
+        raise AttributeError(name)
+
+    def environ(self):
+        """CART_MANAGER/CART_MANAGER_KEY pointing other processes at this store (after start())."""
+        return {"CART_MANAGER": self._manager.address,
+                "CART_MANAGER_KEY": multiprocessing.current_process().authkey.hex()}
+
+    def close(self):
+        """Stop the manager, which flushes its carts; only in the process that started it."""
+        if self._manager is not None and self._owner == os.getpid():
+            self._manager.shutdown()
+            self._manager = None
+
+    def stats(self):
+        return dict(self._store().stats(), backend="shared")
+
+def make_cart_store(kind):
+    if kind == "sql":
+        return SqlCartStore()
+    if kind == "memory":
+        return MemoryCartStore(DB_PATH, CART_FLUSH_INTERVAL, CART_JOURNAL, CART_MEMORY_MAX)
+    if kind == "shared":
+        return SharedCartStore()
+    raise RuntimeError(f"CART_STORE must be sql, memory or shared, not {kind!r}")
+
+cart_store = make_cart_store(CART_STORE)
+
+def cart_items(lines):
+    """Cart lines joined with their products' current details, in line order."""
+    if not lines:
+        return []
+    ids      = list({l["product_id"] for l in lines})
+    products = {p["product_id"]: p for p in query(f"""
+        SELECT id as product_id, name, emoji, weight, price, mrp, discount, stock, brand
+        FROM products WHERE id IN ({",".join("?" * len(ids))})
+    """, ids)}
+    return [dict(l, **products[l["product_id"]]) for l in lines if l["product_id"] in products]
+
 
 @app.route("/api/cart", methods=["GET"])
 @require_auth
 def get_cart():
-    rows = query("""
-        SELECT c.id, c.qty, c.added_at,
-               p.id as product_id, p.name, p.emoji, p.weight,
-               p.price, p.mrp, p.discount, p.stock, p.brand
-        FROM cart c
-        JOIN products p ON c.product_id = p.id
-        WHERE c.user_id=?
-        ORDER BY c.added_at DESC
-    """, (g.user_id,))
-    items = [dict(r) for r in rows]
+    items = cart_items(cart_store.lines(g.user_id))
     subtotal = sum(r["price"] * r["qty"] for r in items)
     delivery = 0 if subtotal >= 299 else 49
     discount = round(subtotal * 0.05)
@@ -588,18 +2601,13 @@ def add_to_cart():
     qty    = int(d.get("qty", 1))
     if not pid:
         return err("product_id required")
-    p = query("SELECT * FROM products WHERE id=? AND is_active=1", (pid,), one=True)
+    p = cached_product(pid)   # the stock check is advisory; checkout() claims stock for real
     if not p:
         return err("Product not found", 404)
-    existing = query("SELECT * FROM cart WHERE user_id=? AND product_id=?", (g.user_id, pid), one=True)
-    if existing:
-        new_qty = existing["qty"] + qty
-        if new_qty > p["stock"]:
-            return err(f"Only {p['stock']} in stock")
-        query("UPDATE cart SET qty=? WHERE id=?", (new_qty, existing["id"]))
-    else:
-        query("INSERT INTO cart VALUES (?,?,?,?,?)",
-              (_id(), g.user_id, pid, qty, _now()))
+    try:
+        cart_store.add(g.user_id, pid, qty, p["stock"])
+    except CartError as e:
+        return err(str(e))
     return ok(msg="Added to cart")
 
 
@@ -610,21 +2618,21 @@ def update_cart(item_id):
     qty = int(d.get("qty", 1))
     if qty < 1:
         return err("qty must be >= 1")
-    query("UPDATE cart SET qty=? WHERE id=? AND user_id=?", (qty, item_id, g.user_id))
+    cart_store.set_qty(g.user_id, item_id, qty)
     return ok(msg="Updated")
 
 
 @app.route("/api/cart/<item_id>", methods=["DELETE"])
 @require_auth
 def remove_from_cart(item_id):
-    query("DELETE FROM cart WHERE id=? AND user_id=?", (item_id, g.user_id))
+    cart_store.remove(g.user_id, item_id)
     return ok(msg="Removed")
 
 
 @app.route("/api/cart/clear", methods=["DELETE"])
 @require_auth
 def clear_cart():
-    query("DELETE FROM cart WHERE user_id=?", (g.user_id,))
+    cart_store.clear(g.user_id)
     return ok(msg="Cart cleared")
 
 
@@ -632,17 +2640,14 @@ def clear_cart():
 @require_auth
 def sync_cart():
     """Sync guest cart to server after login"""
-    items = (request.json or {}).get("items", [])
-    for item in items:
-        pid = item.get("product_id")
-        qty = int(item.get("qty", 1))
-        if not pid:
-            continue
-        existing = query("SELECT * FROM cart WHERE user_id=? AND product_id=?", (g.user_id, pid), one=True)
-        if existing:
-            query("UPDATE cart SET qty=? WHERE id=?", (existing["qty"] + qty, existing["id"]))
-        else:
-            query("INSERT OR IGNORE INTO cart VALUES (?,?,?,?,?)", (_id(), g.user_id, pid, qty, _now()))
+    items = [(i.get("product_id"), int(i.get("qty", 1))) for i in (request.json or {}).get("items", [])]
+    items = [(pid, qty) for pid, qty in items if pid]
+    if items:
+        ids   = list({pid for pid, _ in items})
+        known = {r["id"] for r in query(f"SELECT id FROM products WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        items = [(pid, qty) for pid, qty in items if pid in known]
+    if items:
+        cart_store.merge(g.user_id, items)
     return ok(msg="Synced")
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -666,18 +2671,77 @@ def get_wishlist():
 @app.route("/api/wishlist/<pid>", methods=["POST"])
 @require_auth
 def toggle_wishlist(pid):
-    existing = query("SELECT id FROM wishlist WHERE user_id=? AND product_id=?", (g.user_id, pid), one=True)
-    if existing:
-        query("DELETE FROM wishlist WHERE id=?", (existing["id"],))
-        return ok({"wishlisted": False}, "Removed from wishlist")
-    else:
-        query("INSERT INTO wishlist VALUES (?,?,?,?)", (_id(), g.user_id, pid, _now()))
-        return ok({"wishlisted": True}, "Added to wishlist")
+    with transaction():
+        existing = query("SELECT id FROM wishlist WHERE user_id=? AND product_id=?", (g.user_id, pid), one=True)
+        if existing:
+            execute("DELETE FROM wishlist WHERE id=?", (existing["id"],))
+            return ok({"wishlisted": False}, "Removed from wishlist")
+        else:
+            execute("INSERT INTO wishlist VALUES (?,?,?,?)", (_id(), g.user_id, pid, _now()))
+            return ok({"wishlisted": True}, "Added to wishlist")
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # REVIEWS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Orders for GET /api/products/<id>/reviews: key columns and direction, with id
+# breaking ties. Each is an index range scan (idx_reviews_product_created/_rating).
+REVIEW_SORTS = {
+    "newest":  (("created_at",), "DESC"),
+    "oldest":  (("created_at",), "ASC"),
+    "highest": (("rating", "created_at"), "DESC"),
+    "lowest":  (("rating", "created_at"), "ASC"),
+}
+
+def review_page_sql(pid, sort="newest", last=None, per_page=20):
+    """SELECT for one page of a product's reviews in REVIEW_SORTS[sort] order, after keyset values `last`."""
+    cols, direction = REVIEW_SORTS[sort]
+    keys   = cols + ("id",)
+    sql    = "SELECT * FROM reviews WHERE product_id=?"
+    params = [pid]
+    if last:
+        sql += f" AND ({', '.join(keys)}) {'<' if direction == 'DESC' else '>'} ({', '.join('?' * len(keys))})"
+        params += last
+    sql += " ORDER BY " + ", ".join(f"{k} {direction}" for k in keys) + " LIMIT ?"
+    params.append(per_page + 1)
+    return sql, params
+
+def review_page(pid, sort="newest", per_page=20, cursor=None):
+    """One keyset page of a product's reviews: (rows, next_cursor), or None for a bad cursor."""
+    keys = REVIEW_SORTS[sort][0] + ("id",)
+    last = None
+    if cursor:
+        last = decode_cursor(cursor, len(keys) + 1)
+        if not last or last[0] != sort:
+            return None
+        last = last[1:]
+
+    rows = query(*review_page_sql(pid, sort, last, per_page))
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(sort, *(rows[-1][k] for k in keys))
+    return rows, next_cursor
+
+
+@app.route("/api/products/<pid>/reviews", methods=["GET"])
+def get_reviews(pid):
+    """A product's reviews, ?sort=newest|oldest|highest|lowest, paged with ?cursor=next_cursor."""
+    sort     = request.args.get("sort", "newest")
+    per_page = int_arg("per_page", 20, 1, 100)
+    if per_page is None:
+        return err("per_page must be an integer")
+    if sort not in REVIEW_SORTS:
+        sort = "newest"
+    if not cached_product(pid):
+        return err("Product not found", 404)
+    page = review_page(pid, sort, per_page, request.args.get("cursor"))
+    if page is None:
+        return err("Invalid cursor")
+    rows, next_cursor = page
+    return ok(rows, sort=sort, per_page=per_page, next_cursor=next_cursor)
+
+
 @app.route("/api/products/<pid>/reviews", methods=["POST"])
 @require_auth
 def add_review(pid):
@@ -688,15 +2752,14 @@ def add_review(pid):
         return err("Comment is required")
     if not (1 <= rating <= 5):
         return err("Rating must be 1-5")
-    user = query("SELECT name FROM users WHERE id=?", (g.user_id,), one=True)
-    rid  = _id()
-    query("INSERT INTO reviews VALUES (?,?,?,?,?,?,?)",
-          (rid, pid, g.user_id, user["name"], rating, comment, _now()))
-    # Update product rating
-    avg = query("SELECT AVG(rating) as a, COUNT(*) as c FROM reviews WHERE product_id=?", (pid,), one=True)
-    query("UPDATE products SET rating=?, review_count=? WHERE id=?",
-          (round(avg["a"], 1), avg["c"], pid))
-    return ok(query("SELECT * FROM reviews WHERE id=?", (rid,), one=True))
+    rid = _id()
+    with transaction():
+        user = query("SELECT name FROM users WHERE id=?", (g.user_id,), one=True)
+        # reviews_rating_ai updates the product's rating, count and histogram in this transaction
+        execute("INSERT INTO reviews VALUES (?,?,?,?,?,?,?)",
+                (rid, pid, g.user_id, user["name"], rating, comment, _now()))
+        invalidate_products(pid)
+        return ok(query("SELECT * FROM reviews WHERE id=?", (rid,), one=True))
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # COUPONS
@@ -743,73 +2806,91 @@ def place_order():
         if not addr.get(f):
             return err(f"Address {f} is required")
 
-    # Get cart
-    cart_items = query("""
-        SELECT c.qty, p.id as product_id, p.name, p.emoji, p.weight,
-               p.price, p.stock
-        FROM cart c JOIN products p ON c.product_id=p.id
-        WHERE c.user_id=?
-    """, (g.user_id,))
-
-    if not cart_items:
-        return err("Cart is empty")
-
-    # Check stock
-    for item in cart_items:
-        if item["qty"] > item["stock"]:
-            return err(f"Only {item['stock']} units of {item['name']} available")
-
-    subtotal     = sum(i["price"] * i["qty"] for i in cart_items)
-    delivery_fee = 0 if subtotal >= 299 else 49
-    discount     = round(subtotal * 0.05)
-
-    # Apply coupon
-    coupon_discount = 0
-    if coupon:
-        c = query("SELECT * FROM coupons WHERE code=? AND is_active=1", (coupon.upper(),), one=True)
-        if c and subtotal >= c["min_order"]:
-            if c["type"] == "percent":
-                coupon_discount = round(subtotal * c["value"] / 100)
-            else:
-                coupon_discount = c["value"]
-            query("UPDATE coupons SET used_count=used_count+1 WHERE id=?", (c["id"],))
-
-    total_discount = discount + coupon_discount
-    total = subtotal + delivery_fee - total_discount
-
-    oid = "ORD" + secrets.token_hex(4).upper()
-    query("""INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-          (oid, g.user_id, addr["line1"], addr["city"], addr["pincode"], addr["phone"],
-           subtotal, delivery_fee, total_discount, total, payment,
-           "paid" if payment != "cod" else "pending",
-           "confirmed", notes, _now(), _now()))
-
-    for item in cart_items:
-        query("INSERT INTO order_items VALUES (?,?,?,?,?,?,?,?)",
-              (_id(), oid, item["product_id"], item["name"], item["emoji"],
-               item["weight"], item["price"], item["qty"]))
-        # Decrement stock
-        query("UPDATE products SET stock=stock-? WHERE id=?", (item["qty"], item["product_id"]))
-
-    # Clear cart
-    query("DELETE FROM cart WHERE user_id=?", (g.user_id,))
+    try:
+        oid = checkout(g.user_id, addr, payment, coupon, notes)
+    except CheckoutError as e:
+        return err(str(e), e.code)
 
     order = _get_full_order(oid)
     return ok(order, "Order placed successfully", code=201)
 
 
+class CheckoutError(Exception):
+    def __init__(self, msg, code=400):
+        super().__init__(msg)
+        self.code = code
+
+def checkout(user_id, addr, payment, coupon, notes):
+    """Turn the user's cart into an order in one write transaction.
+
+    The cart comes from cart_store, so with a write-behind store it includes
+    changes not flushed yet; its lines leave the store once the order commits.
+
+    Stock and coupon uses are claimed with conditional UPDATEs, so the
+    database, not a Python check, decides who gets the last unit. Any
+    shortfall raises CheckoutError and rolls the whole order back.
+    """
+    with transaction():
+        lines = cart_store.lines(user_id)
+        items = cart_items(lines)
+
+        if not items:
+            raise CheckoutError("Cart is empty")
+
+        for item in items:
+            if item["qty"] > item["stock"]:
+                raise CheckoutError(f"Only {item['stock']} units of {item['name']} available", 409)
+
+        subtotal     = sum(i["price"] * i["qty"] for i in items)
+        delivery_fee = 0 if subtotal >= 299 else 49
+        discount     = round(subtotal * 0.05)
+
+        coupon_discount = 0
+        if coupon:
+            c = query("SELECT * FROM coupons WHERE code=? AND is_active=1", (coupon.upper(),), one=True)
+            if c and subtotal >= c["min_order"]:
+                claimed = execute("""UPDATE coupons SET used_count=used_count+1
+                                     WHERE id=? AND (max_uses IS NULL OR max_uses=0 OR used_count<max_uses)""",
+                                  (c["id"],))
+                if claimed.rowcount != 1:
+                    raise CheckoutError("Coupon usage limit reached", 409)
+                if c["type"] == "percent":
+                    coupon_discount = round(subtotal * c["value"] / 100)
+                else:
+                    coupon_discount = c["value"]
+
+        total_discount = discount + coupon_discount
+        total = subtotal + delivery_fee - total_discount
+
+        taken = executemany("UPDATE products SET stock=stock-? WHERE id=? AND stock>=?",
+                            [(i["qty"], i["product_id"], i["qty"]) for i in items])
+        if taken.rowcount != len(items):
+            raise CheckoutError("Some items just went out of stock", 409)
+
+        oid = "ORD" + secrets.token_hex(4).upper()
+        execute("""INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
+                (oid, user_id, addr["line1"], addr["city"], addr["pincode"], addr["phone"],
+                 subtotal, delivery_fee, total_discount, total, payment,
+                 "paid" if payment != "cod" else "pending",
+                 "confirmed", notes, _now(), _now()))
+        executemany("INSERT INTO order_items VALUES (?,?,?,?,?,?,?,?)",
+                    [(_id(), oid, i["product_id"], i["name"], i["emoji"],
+                      i["weight"], i["price"], i["qty"]) for i in items])
+
+        execute("DELETE FROM cart WHERE user_id=?", (user_id,))   # rows a write-behind store already flushed
+        after_commit(lambda: cart_store.checked_out(user_id, lines))
+        after_commit(order_events.poke)
+        invalidate_products(*(i["product_id"] for i in items))
+    return oid
+
+
 @app.route("/api/orders", methods=["GET"])
 @require_auth
 def get_orders():
-    rows = query("""
-        SELECT * FROM orders WHERE user_id=?
-        ORDER BY created_at DESC
-    """, (g.user_id,))
-    result = []
-    for row in rows:
-        items = query("SELECT * FROM order_items WHERE order_id=?", (row["id"],))
-        result.append({**dict(row), "items": items})
-    return ok(result)
+    orders, next_cursor = order_page(ORDERS_SELECT, ["o.user_id=?"], [g.user_id])
+    if orders is None:
+        return err(next_cursor)
+    return ok(orders, next_cursor=next_cursor)
 
 
 @app.route("/api/orders/<oid>", methods=["GET"])
@@ -830,6 +2911,362 @@ def _get_full_order(oid):
     items = query("SELECT * FROM order_items WHERE order_id=?", (oid,))
     return {**o, "items": items}
 
+
+ORDER_PAGE_MAX      = 100
+ORDERS_SELECT       = "SELECT * FROM orders o"
+ADMIN_ORDERS_SELECT = ("SELECT o.*, u.name as user_name, u.email as user_email"
+                       " FROM orders o JOIN users u ON o.user_id=u.id")
+
+def attach_items(orders):
+    """Load the items of a page of orders in one query."""
+    if not orders:
+        return orders
+    by_id = {}
+    for o in orders:
+        o["items"] = []
+        by_id[o["id"]] = o
+    rows = query(f"SELECT * FROM order_items WHERE order_id IN ({','.join('?' * len(by_id))})",
+                 list(by_id))
+    for r in rows:
+        by_id[r["order_id"]]["items"].append(r)
+    return orders
+
+def _ts_bound(value, end=False):
+    """ISO date/timestamp -> created_at bound. A bare `to` date covers that whole day."""
+    if len(value) == 10:
+        day = datetime.strptime(value, "%Y-%m-%d") + timedelta(days=1 if end else 0)
+        return day.date().isoformat()
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).isoformat()
+
+def order_page_sql(select, where, params, status=None, since=None, until=None, last=None, limit=50):
+    """SELECT for one newest-first page of orders (aliased `o`), filtered and after keyset values `last`."""
+    where  = list(where)
+    params = list(params)
+    if status:
+        where.append("o.status=?");  params.append(status)
+    if since:
+        where.append("o.created_at >= ?");  params.append(since)
+    if until:
+        where.append("o.created_at < ?");   params.append(until)
+    if last:
+        where.append("(o.created_at, o.id) < (?, ?)");  params += last
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY o.created_at DESC, o.id DESC LIMIT ?"
+    return sql, params + [limit + 1]
+
+def order_page(select, where, params):
+    """Newest-first, keyset-paginated page of orders (aliased `o`) with items attached.
+
+    Applies ?status=, ?from=, ?to=, ?cursor= and ?limit= from the query string.
+    Returns (orders, next_cursor), or (None, error message).
+    """
+    args  = request.args
+    limit = int_arg("limit", 50, 1, ORDER_PAGE_MAX)
+    if limit is None:
+        return None, "limit must be an integer"
+    try:
+        since = _ts_bound(args["from"]) if args.get("from") else None
+        until = _ts_bound(args["to"], end=True) if args.get("to") else None
+    except ValueError:
+        return None, "from/to must be ISO dates"
+    last = None
+    if args.get("cursor"):
+        last = decode_cursor(args["cursor"], 2)
+        if not last:
+            return None, "Invalid cursor"
+
+    rows = query(*order_page_sql(select, where, params, args.get("status"), since, until, last, limit))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return attach_items(rows), next_cursor
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ORDER EVENTS (server-sent events)
+# ═══════════════════════════════════════════════════════════════════════════════
+# GET /api/orders/events streams the signed-in user's order events and
+# GET /api/admin/orders/events every order's, as text/event-stream:
+#
+#     id: 42
+#     event: order.status
+#     data: {"type": "order.status", "order_id": "ORD1A2B3C4D", "status": "packed", ...}
+#
+# Events come from the order_events table (see SCHEMA_ORDER_EVENTS). One
+# OrderEvents broker per worker process tails it on a thread - woken at once
+# after this process's own order writes, every ORDER_EVENTS_POLL seconds for
+# other workers' - and fans new rows out to its open streams, so a stream costs
+# a queue (and, outside asgi.py, a thread), not a query. A reconnecting client sends Last-Event-ID
+# (or ?last_event_id=) and gets what it missed from the in-memory buffer, or
+# from the table further back; past what the table keeps it gets a `resync`
+# event and should reload its list. Browsers open streams with ?ticket= from
+# POST /api/orders/events/ticket, good for ORDER_EVENTS_TICKET_TTL seconds and
+# nothing but these streams, so the long-lived token never appears in a URL.
+
+class StreamsFull(ServerBusy):
+    pass
+
+class OrderEvent:
+    __slots__ = ("seq", "user_id", "frame")
+
+    def __init__(self, row):
+        data = {"type": row["type"], "order_id": row["order_id"], "user_id": row["user_id"],
+                "status": row["status"], "total": row["total"], "at": row["created_at"]}
+        self.seq     = row["seq"]
+        self.user_id = row["user_id"]
+        self.frame   = f"id: {self.seq}\nevent: {row['type']}\ndata: {json.dumps(data)}\n\n"   # rendered once for every stream
+
+class Subscription:
+    """One open stream: a bounded queue of frames, filtered to one user (None: all).
+
+    `notify`, if set, is called after every put; asgi.py uses it to wake the
+    event loop instead of parking a thread on the queue.
+    """
+    __slots__ = ("user_id", "queue", "dropped", "notify")
+
+    def __init__(self, user_id, size=256):
+        self.user_id = user_id
+        self.queue   = queue.Queue(size)
+        self.dropped = False
+        self.notify  = None
+
+    def wants(self, event):
+        return self.user_id is None or self.user_id == event.user_id
+
+    def put(self, frame):
+        """Queue a frame (raises queue.Full) and wake whoever waits for it."""
+        try:
+            self.queue.put_nowait(frame)
+        finally:
+            if self.notify:
+                self.notify()
+
+class OrderEvents:
+    """Per-process pub/sub over the order_events table.
+
+    Started by the first subscriber in each process (after a fork, the
+    child starts its own). A subscriber whose queue fills up is dropped;
+    its stream ends and the client resumes from its Last-Event-ID.
+    """
+    COLUMNS = "seq, type, order_id, user_id, status, total, created_at"
+
+    def __init__(self, path, poll=0.5, buffer=1000, max_streams=4):
+        self.path        = path
+        self.poll        = poll
+        self.buffer_size = buffer
+        self.max_streams = max_streams
+        self._lock       = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid    = os.getpid()
+        self._buffer = deque(maxlen=self.buffer_size)
+        self._subs   = set()
+        self._wake   = threading.Event()
+        self._thread = None
+        self._db     = None
+        self._last   = 0
+        self._stats  = {"published": 0, "streams_opened": 0, "rejected": 0, "dropped": 0}
+
+    def _start(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.row_factory = sqlite3.Row
+            rows = self._db.execute(f"SELECT {self.COLUMNS} FROM order_events ORDER BY seq DESC LIMIT ?",
+                                    (self.buffer_size,)).fetchall()
+            self._buffer.extend(OrderEvent(r) for r in reversed(rows))
+            self._last   = rows[0]["seq"] if rows else 0
+            self._thread = threading.Thread(target=self._run, daemon=True, name="order-events")
+            self._thread.start()
+
+    def poke(self):
+        """Check for new events now (after this process committed one)."""
+        self._wake.set()
+
+    def subscribe(self, user_id=None, after=None):
+        """Open a stream. Returns (subscription, buffered frames after `after`, first buffered seq)."""
+        with self._lock:
+            self._start()
+            if len(self._subs) >= self.max_streams:
+                self._stats["rejected"] += 1
+                raise StreamsFull("Too many open event streams")
+            sub = Subscription(user_id)
+            self._subs.add(sub)
+            self._stats["streams_opened"] += 1
+            backlog = [e.frame for e in self._buffer if after is not None and e.seq > after and sub.wants(e)]
+            first   = self._buffer[0].seq if self._buffer else self._last + 1
+            return sub, backlog, first
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def close(self):
+        """End every open stream now (worker shutdown), so they don't hold it up."""
+        with self._lock:
+            for sub in self._subs:
+                sub.dropped = True
+                try:
+                    sub.put(": closing\n\n")   # wakes a stream waiting on its queue
+                except queue.Full:
+                    pass   # it has frames to drain first, then sees `dropped`
+            self._subs.clear()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            try:
+                rows = self._db.execute(f"SELECT {self.COLUMNS} FROM order_events WHERE seq > ? ORDER BY seq",
+                                        (self._last,)).fetchall()
+            except sqlite3.Error:
+                app.logger.exception("order events: poll failed")
+                continue
+            if rows:
+                self._publish([OrderEvent(r) for r in rows])
+
+    def _publish(self, events):
+        with self._lock:
+            for event in events:
+                self._buffer.append(event)
+                self._last = event.seq
+                for sub in list(self._subs):
+                    if not sub.wants(event):
+                        continue
+                    try:
+                        sub.put(event.frame)
+                    except queue.Full:
+                        sub.dropped = True
+                        self._subs.discard(sub)
+                        self._stats["dropped"] += 1
+            self._stats["published"] += len(events)
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s.update(streams=len(self._subs), max_streams=self.max_streams, buffered=len(self._buffer),
+                     last_seq=self._last, running=self._thread is not None and self._pid == os.getpid())
+        return s
+
+order_events = OrderEvents(DB_PATH, ORDER_EVENTS_POLL, ORDER_EVENTS_BUFFER, ORDER_EVENTS_MAX_STREAMS)
+
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+
+@app.route("/api/orders/events", methods=["GET"])
+@require_auth
+def order_events_stream():
+    return event_stream(g.user_id)
+
+
+@app.route("/api/admin/orders/events", methods=["GET"])
+@require_admin
+def admin_order_events_stream():
+    return event_stream(None)
+
+
+@app.route("/api/orders/events/ticket", methods=["POST"])
+@require_auth
+def order_events_ticket():
+    """A ticket for opening a stream with EventSource, which can't send the Authorization header."""
+    return ok({"ticket": make_stream_ticket(g.user_id, g.role), "expires_in": ORDER_EVENTS_TICKET_TTL})
+
+
+@app.route("/api/admin/orders/events/stats", methods=["GET"])
+@require_admin
+def admin_order_events_stats():
+    return ok(order_events.stats())
+
+
+def event_stream(user_id):
+    """text/event-stream response for one user's order events (None: everyone's)."""
+    after = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        return err("Last-Event-ID must be an event id")
+
+    sub, frames, first = order_events.subscribe(user_id, after)
+    try:
+        if after is not None and after < first - 1:
+            # older than the buffer: replay from the table, if it still has them
+            oldest = query("SELECT MIN(seq) AS seq FROM order_events", one=True)["seq"]
+            where, params = "seq > ? AND seq < ?", [after, first]
+            if user_id is not None:
+                where += " AND user_id=?";  params.append(user_id)
+            rows   = query(f"SELECT {OrderEvents.COLUMNS} FROM order_events WHERE {where} ORDER BY seq", params)
+            frames = ([RESYNC_FRAME] if oldest is None or oldest > after + 1 else []) + \
+                     [OrderEvent(r).frame for r in rows] + frames
+    except BaseException:
+        order_events.unsubscribe(sub)
+        raise
+    stream   = EventStream(sub, frames)
+    response = app.response_class(stream, mimetype="text/event-stream",
+                                  headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(stream.close)   # also if the body never starts
+    request.environ["urmart.event_stream"] = stream   # asgi.py serves it from the event loop
+    return response
+
+class EventStream:
+    """Body of an event-stream response: a retry hint, replayed frames, then live ones.
+
+    A WSGI server iterates it, which parks the request thread on the
+    subscription between frames. asgi.py instead calls poll() from the
+    event loop whenever sub.notify fires or wait() runs out, so there an
+    idle stream holds no thread at all.
+    """
+
+    def __init__(self, sub, frames):
+        self.sub      = sub
+        self.pending  = deque(["retry: 3000\n\n", *frames])   # also gets the headers out before the first event
+        self.deadline = time.monotonic() + ORDER_EVENTS_STREAM_TTL
+        self.ping_at  = time.monotonic() + ORDER_EVENTS_PING
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        frame = self.poll(block=True)
+        if frame is None:
+            raise StopIteration
+        return frame
+
+    def wait(self):
+        """Seconds until poll() has something to send even without an event: a ping, or the end."""
+        return max(0.0, min(self.ping_at, self.deadline) - time.monotonic())
+
+    def poll(self, block=False):
+        """The next frame; "" if there is none yet (only when not blocking); None once the stream is over."""
+        if self.pending:
+            return self.pending.popleft()
+        while True:
+            try:
+                frame = self.sub.queue.get(block=block and not self.sub.dropped, timeout=self.wait())
+            except queue.Empty:
+                now = time.monotonic()
+                if self.sub.dropped or now >= self.deadline:
+                    # dropped: what it got is gap-free, so it resumes from there;
+                    # past the TTL: the client reconnects with Last-Event-ID
+                    self.close()
+                    return None
+                if now < self.ping_at:
+                    if not block:
+                        return ""
+                    continue
+                frame = ": ping\n\n"
+            self.ping_at = time.monotonic() + ORDER_EVENTS_PING
+            return frame
+
+    def close(self):
+        self.sub.notify = None
+        order_events.unsubscribe(self.sub)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # ADMIN — USERS
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -847,7 +3284,7 @@ def admin_users():
 @app.route("/api/admin/products", methods=["GET"])
 @require_admin
 def admin_products():
-    rows = query("SELECT * FROM products ORDER BY created_at DESC")
+    rows = query(f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY created_at DESC")
     return ok([product_row(r) for r in rows])
 
 
@@ -859,7 +3296,7 @@ def admin_add_product():
         if not d.get(str(f)):
             return err(f"{f} is required")
     pid = _id()
-    query("""INSERT INTO products
+    execute("""INSERT INTO products
         (id,name,description,category_id,emoji,brand,weight,price,mrp,discount,stock,rating,review_count,is_active,created_at)
         VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)""",
         (pid, d["name"], d.get("description",""), d["category_id"],
@@ -867,31 +3304,35 @@ def admin_add_product():
          float(d["price"]), float(d["mrp"]),
          int(d.get("discount",0)), int(d.get("stock",100)),
          float(d.get("rating",4.0)), 0, 1, _now()))
-    return ok(product_row(query("SELECT * FROM products WHERE id=?", (pid,), one=True)), code=201)
+    invalidate_products(pid)
+    return ok(product_row(query(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id=?", (pid,), one=True)), code=201)
 
 
 @app.route("/api/admin/products/<pid>", methods=["PUT"])
 @require_admin
 def admin_update_product(pid):
     d = request.json or {}
-    p = query("SELECT * FROM products WHERE id=?", (pid,), one=True)
-    if not p:
-        return err("Not found", 404)
-    query("""UPDATE products SET name=?,description=?,category_id=?,emoji=?,brand=?,
-             weight=?,price=?,mrp=?,discount=?,stock=?,is_active=? WHERE id=?""",
-          (d.get("name",p["name"]), d.get("description",p["description"]),
-           d.get("category_id",p["category_id"]), d.get("emoji",p["emoji"]),
-           d.get("brand",p["brand"]), d.get("weight",p["weight"]),
-           float(d.get("price",p["price"])), float(d.get("mrp",p["mrp"])),
-           int(d.get("discount",p["discount"])), int(d.get("stock",p["stock"])),
-           int(d.get("is_active",p["is_active"])), pid))
-    return ok(product_row(query("SELECT * FROM products WHERE id=?", (pid,), one=True)))
+    with transaction():
+        p = query("SELECT * FROM products WHERE id=?", (pid,), one=True)
+        if not p:
+            return err("Not found", 404)
+        execute("""UPDATE products SET name=?,description=?,category_id=?,emoji=?,brand=?,
+                   weight=?,price=?,mrp=?,discount=?,stock=?,is_active=? WHERE id=?""",
+                (d.get("name",p["name"]), d.get("description",p["description"]),
+                 d.get("category_id",p["category_id"]), d.get("emoji",p["emoji"]),
+                 d.get("brand",p["brand"]), d.get("weight",p["weight"]),
+                 float(d.get("price",p["price"])), float(d.get("mrp",p["mrp"])),
+                 int(d.get("discount",p["discount"])), int(d.get("stock",p["stock"])),
+                 int(d.get("is_active",p["is_active"])), pid))
+        invalidate_products(pid)
+        return ok(product_row(query(f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id=?", (pid,), one=True)))
 
 
 @app.route("/api/admin/products/<pid>", methods=["DELETE"])
 @require_admin
 def admin_delete_product(pid):
-    query("UPDATE products SET is_active=0 WHERE id=?", (pid,))
+    execute("UPDATE products SET is_active=0 WHERE id=?", (pid,))
+    invalidate_products(pid)
     return ok(msg="Product deactivated")
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -901,18 +3342,10 @@ def admin_delete_product(pid):
 @app.route("/api/admin/orders", methods=["GET"])
 @require_admin
 def admin_orders():
-    status = request.args.get("status")
-    sql    = "SELECT o.*, u.name as user_name, u.email as user_email FROM orders o JOIN users u ON o.user_id=u.id"
-    params = []
-    if status:
-        sql += " WHERE o.status=?"; params.append(status)
-    sql += " ORDER BY o.created_at DESC"
-    rows = query(sql, params)
-    result = []
-    for row in rows:
-        items = query("SELECT * FROM order_items WHERE order_id=?", (row["id"],))
-        result.append({**dict(row), "items": items})
-    return ok(result)
+    orders, next_cursor = order_page(ADMIN_ORDERS_SELECT, [], [])
+    if orders is None:
+        return err(next_cursor)
+    return ok(orders, next_cursor=next_cursor)
 
 
 @app.route("/api/admin/orders/<oid>/status", methods=["PUT"])
@@ -923,46 +3356,736 @@ def admin_update_order_status(oid):
     valid  = ["confirmed","packed","out_for_delivery","delivered","cancelled"]
     if status not in valid:
         return err(f"Status must be one of: {valid}")
-    query("UPDATE orders SET status=?, updated_at=? WHERE id=?", (status, _now(), oid))
+    execute("UPDATE orders SET status=?, updated_at=? WHERE id=?", (status, _now(), oid))
+    order_events.poke()
     return ok(msg=f"Order status updated to {status}")
 
 
+@app.route("/api/admin/kdf", methods=["GET"])
+@require_admin
+def admin_kdf():
+    return ok(kdf_pool.stats())
+
+
+@app.route("/api/admin/metrics", methods=["GET"])
+@require_admin
+def admin_metrics():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/admin/cart-store", methods=["GET"])
+@require_admin
+def admin_cart_store():
+    return ok(cart_store.stats())
+
+@app.route("/api/admin/db/pool", methods=["GET"])
+@require_admin
+def admin_db_pool():
+    return ok({"read": read_pool.stats(), "write": write_pool.stats()})
+
+
+STATS_SERIES_MAX = 366   # days
+
+@app.route("/api/admin/cache", methods=["GET"])
+@require_admin
+def admin_cache():
+    return ok(catalog_cache.info())
+
+
+@app.route("/api/admin/cache", methods=["DELETE"])
+@require_admin
+def admin_clear_cache():
+    catalog_cache.clear()
+    return ok(msg="Catalog cache cleared")
+
+
 @app.route("/api/admin/stats", methods=["GET"])
 @require_admin
 def admin_stats():
-    users     = query("SELECT COUNT(*) as c FROM users WHERE role='user'", one=True)["c"]
-    orders    = query("SELECT COUNT(*) as c FROM orders", one=True)["c"]
-    revenue   = query("SELECT COALESCE(SUM(total),0) as s FROM orders WHERE status!='cancelled'", one=True)["s"]
-    products  = query("SELECT COUNT(*) as c FROM products WHERE is_active=1", one=True)["c"]
+    """Dashboard, served from the rollup tables.
+
+    `series` holds per-day orders/revenue/status counts for ?from=&to=
+    (YYYY-MM-DD, inclusive; defaults to the last 30 days).
+    """
+    try:
+        end   = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") \
+                else datetime.now(timezone.utc).date()
+        start = datetime.strptime(request.args["from"], "%Y-%m-%d").date() if request.args.get("from") \
+                else end - timedelta(days=29)
+    except ValueError:
+        return err("from/to must be YYYY-MM-DD dates")
+    if start > end or (end - start).days >= STATS_SERIES_MAX:
+        return err(f"Date range must be 1-{STATS_SERIES_MAX} days")
+
+    counters  = {r["name"]: r["value"] for r in query("SELECT name, value FROM stats_counters")}
+    by_status = query("SELECT status, orders as count, revenue FROM stats_status WHERE orders > 0")
     recent    = query("""
         SELECT o.*, u.name as user_name FROM orders o JOIN users u ON o.user_id=u.id
         ORDER BY o.created_at DESC LIMIT 5
     """)
     top_prods = query("""
-        SELECT p.name, p.emoji, SUM(oi.qty) as sold
-        FROM order_items oi JOIN products p ON oi.product_id=p.id
-        GROUP BY p.id ORDER BY sold DESC LIMIT 5
-    """)
-    by_status = query("""
-        SELECT status, COUNT(*) as count FROM orders GROUP BY status
+        SELECT p.name, p.emoji, s.units as sold
+        FROM stats_product_sales s JOIN products p ON s.product_id=p.id
+        ORDER BY s.units DESC LIMIT 5
     """)
+
+    series = {}
+    for r in query("SELECT * FROM stats_daily WHERE day BETWEEN ? AND ? AND orders > 0 ORDER BY day",
+                   (start.isoformat(), end.isoformat())):
+        day = series.setdefault(r["day"], {"day": r["day"], "orders": 0, "revenue": 0.0, "by_status": {}})
+        day["orders"] += r["orders"]
+        day["by_status"][r["status"]] = r["orders"]
+        if r["status"] != "cancelled":
+            day["revenue"] = round(day["revenue"] + r["revenue"], 2)
+
     return ok({
-        "users": users, "orders": orders, "revenue": revenue,
-        "products": products, "recent_orders": recent,
-        "top_products": top_prods, "orders_by_status": by_status,
+        "users":    counters.get("users", 0),
+        "orders":   sum(r["count"] for r in by_status),
+        "revenue":  round(sum(r.pop("revenue") for r in by_status if r["status"] != "cancelled"), 2),
+        "products": counters.get("products", 0),
+        "recent_orders": recent, "top_products": top_prods,
+        "orders_by_status": [{"status": r["status"], "count": r["count"]} for r in by_status],
+        "series": list(series.values()), "from": start.isoformat(), "to": end.isoformat(),
     })
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# BATCH
+# ═══════════════════════════════════════════════════════════════════════════════
+# Sub-requests go through the normal routes and hooks, each in its own app
+# context. The token is verified once for the whole batch. Items run in order;
+# runs of consecutive GETs are dispatched concurrently, and a write waits for
+# everything before it. Items that run alone share the batch's read connection;
+# concurrent ones each borrow one from the pool, after the batch has given its
+# own back, so a batch never holds more than BATCH_THREADS connections.
+
+batch_pool = ThreadPoolExecutor(BATCH_THREADS, thread_name_prefix="batch") if BATCH_THREADS > 1 else None
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    items = (request.json or {}).get("requests")
+    if not isinstance(items, list) or not items:
+        return err("requests must be a non-empty list")
+    if len(items) > BATCH_MAX_ITEMS:
+        return err(f"At most {BATCH_MAX_ITEMS} requests per batch")
+    for item in items:
+        problem = _batch_item_error(item)
+        if problem:
+            return err(problem)
+
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
+    auth  = None
+    if token:
+        try:
+            auth = verify_token(token)
+        except AuthError as e:
+            auth = e
+    shared = {"auth": auth, "headers": {k: v for k, v in request.headers if k in ("Authorization", "Accept-Language")},
+              "trace": g.trace_id, "remote": request.remote_addr}
+
+    results, i = [None] * len(items), 0
+    while i < len(items):
+        j = i
+        while j < len(items) and items[j].get("method", "GET").upper() == "GET":
+            j += 1
+        if j - i > 1 and batch_pool:
+            db = g.pop("db", None)   # hand back the read connection first; each item borrows its own
+            if db:
+                read_pool.release(db)
+            for k, result in zip(range(i, j), batch_pool.map(lambda it: _run_subrequest(it, shared), items[i:j])):
+                results[k] = result
+        else:
+            j = max(j, i + 1)
+            for k in range(i, j):
+                results[k] = _run_subrequest(items[k], shared, db=get_db())
+        i = j
+    return ok(results)
+
+def _batch_item_error(item):
+    if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+        return "Each request needs a path"
+    if not item["path"].startswith("/api/") or item["path"].split("?")[0].rstrip("/") == "/api/batch":
+        return f"Not batchable: {item['path']}"
+    if str(item.get("method", "GET")).upper() not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+        return f"Unsupported method: {item.get('method')}"
+    return None
+
+def _run_subrequest(item, shared, db=None):
+    """Dispatch one item through the app; returns {"status", "body"}."""
+    builder = EnvironBuilder(
+        path=item["path"], method=str(item.get("method", "GET")).upper(),
+        query_string=item.get("query"), json=item.get("body"),
+        headers={**shared["headers"], "X-Trace-Id": shared["trace"]},
+        environ_overrides={"REMOTE_ADDR": shared["remote"] or ""})
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+    with app.app_context():   # a fresh g: the item's own timers, counters and transaction
+        g.batch_auth = shared["auth"]
+        if db is not None:
+            g.db = db
+        try:
+            with app.request_context(environ):
+                try:
+                    response = app.full_dispatch_request()
+                except Exception as e:
+                    response = app.make_response(app.handle_exception(e))
+        finally:
+            if db is not None:
+                g.pop("db", None)   # the batch's connection; the batch request releases it
+    if response.is_streamed:
+        response.close()
+        return {"status": 400, "body": {"success": False, "message": "Streaming endpoints can't be batched"}}
+    body = response.get_json(silent=True)
+    return {"status": response.status_code,
+            "body": body if body is not None else response.get_data(as_text=True)}
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SERVE FRONTEND
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# The build directory is indexed once (one stat per file at startup, none per
+# request); STATIC_WATCH > 0 re-scans it every that many seconds. Content-hashed
+# assets are cached for a year as immutable, index.html (also the SPA fallback,
+# kept in memory) must revalidate, everything else gets STATIC_MAX_AGE. ETags,
+# If-None-Match and single byte ranges are handled here; file bodies go out
+# through socket.sendfile() under start.py's production server.
+
+HASHED_ASSET_RE = re.compile(r"(^|/)_next/static/|[.-][0-9a-f]{8,}\.\w+$")
+IMMUTABLE       = "public, max-age=31536000, immutable"
+
+class StaticFile:
+    __slots__ = ("path", "size", "mtime", "etag", "mimetype", "cache", "variants", "body")
+
+    def __init__(self, path, st, url_path):
+        self.path     = path
+        self.size     = st.st_size
+        self.mtime    = st.st_mtime
+        self.etag     = f"{st.st_size:x}-{st.st_mtime_ns:x}"
+        self.mimetype = mimetypes.guess_type(url_path)[0] or "application/octet-stream"
+        self.variants = {}     # encoding -> StaticFile of the .gz/.br twin
+        self.body     = None   # bytes, for index.html only
+        if url_path == "index.html" or url_path.endswith(".html"):
+            self.cache = "no-cache"
+        elif HASHED_ASSET_RE.search(url_path):
+            self.cache = IMMUTABLE
+        else:
+            self.cache = f"public, max-age={STATIC_MAX_AGE}"
+
+class FileBody:
+    """A file (slice) as a response body. Given the server's sendfile hook, the
+    bytes go from the page cache to the socket without passing through Python."""
+
+    def __init__(self, path, offset, length, sendfile=None):
+        self.path     = path
+        self.offset   = offset
+        self.length   = length
+        self.sendfile = sendfile
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            if self.sendfile:
+                yield b""   # makes the server send the status line and headers first
+                self.sendfile(f, self.offset, self.length)
+                return
+            f.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = f.read(min(remaining, 256 * 1024))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+class StaticFiles:
+    def __init__(self, root, watch=0):
+        self.root   = os.path.abspath(root)
+        self.watch  = watch
+        self.files  = {}
+        self._pid   = None
+        self._stamp = None
+        self.scan()
+
+    def _walk(self):
+        for dirpath, dirs, names in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith(".") and d != "node_modules"]
+            for name in names:
+                full = os.path.join(dirpath, name)
+                yield os.path.relpath(full, self.root).replace(os.sep, "/"), full
+
+    def scan(self):
+        files, twins, stamp = {}, [], []
+        for url_path, full in self._walk():
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            stamp.append((url_path, st.st_size, st.st_mtime_ns))
+            for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+                if url_path.endswith(ext):
+                    twins.append((url_path[:-len(ext)], encoding, full, st))
+                    break
+            else:
+                files[url_path] = StaticFile(full, st, url_path)
+        for url_path, encoding, full, st in twins:
+            if url_path in files:
+                twin = StaticFile(full, st, url_path)
+                twin.etag += "-" + encoding
+                files[url_path].variants[encoding] = twin
+        index = files.get("index.html")
+        if index:
+            for entry in [index, *index.variants.values()]:
+                with open(entry.path, "rb") as f:
+                    entry.body = f.read()
+        self.files, self._stamp = files, stamp   # swapped whole, so readers never see half a scan
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch)
+            stamp = []
+            for url_path, full in self._walk():
+                try:
+                    st = os.stat(full)
+                except OSError:   # removed mid-build; the next tick sees the result
+                    continue
+                stamp.append((url_path, st.st_size, st.st_mtime_ns))
+            if stamp != self._stamp:
+                try:
+                    self.scan()
+                except OSError:   # index.html went away between walk and read; keep serving the old table
+                    pass
+
+    def get(self, path):
+        # threads don't survive fork(), so each worker starts its own watcher
+        if self.watch and self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._watch, daemon=True, name="static-watch").start()
+        return self.files.get(path)
+
+    def response(self, path):
+        entry = self.get(path) or self.get("index.html")   # unknown paths are SPA routes
+        if entry is None:
+            return err("Not found", 404)
+        rng = request.range if request.headers.get("Range") else None
+        if rng and "If-Range" in request.headers and request.if_range.etag != entry.etag:
+            rng = None   # the client's copy is stale; send it all
+        sent = entry
+        if entry.variants and not rng:
+            for encoding in ("br", "gzip"):
+                if encoding in entry.variants and request.accept_encodings[encoding]:
+                    sent = entry.variants[encoding]
+                    break
+
+        headers = {"ETag": f'"{sent.etag}"', "Cache-Control": sent.cache,
+                   "Last-Modified": http_date(sent.mtime), "Accept-Ranges": "bytes"}
+        if entry.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if sent is not entry:
+            headers["Content-Encoding"] = next(e for e, v in entry.variants.items() if v is sent)
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(sent.etag)
+        else:
+            fresh = bool(request.if_modified_since) and int(sent.mtime) <= request.if_modified_since.timestamp()
+        if fresh:
+            return app.response_class(status=304, headers=headers)
+
+        start, length, status = 0, sent.size, 200
+        if rng:
+            span = rng.range_for_length(sent.size)
+            if span is None and len(rng.ranges) == 1:
+                return app.response_class(status=416, headers={"Content-Range": f"bytes */{sent.size}"})
+            if span:
+                start, length, status = span[0], span[1] - span[0], 206
+                headers["Content-Range"] = f"bytes {span[0]}-{span[1] - 1}/{sent.size}"
+
+        if sent.body is not None:
+            body = sent.body[start:start + length]
+        else:
+            body = FileBody(sent.path, start, length, request.environ.get("urmart.sendfile"))
+        response = app.response_class(body, status=status, mimetype=entry.mimetype,
+                                      headers=headers, direct_passthrough=True)
+        response.headers["Content-Length"] = str(length)
+        return response
+
+static_files = StaticFiles(FRONTEND, STATIC_WATCH)
+
 @app.route("/", defaults={"path": ""})
 @app.route("/<path:path>")
 def serve_frontend(path):
-    full = os.path.join(FRONTEND, path)
-    if path and os.path.exists(full):
-        return send_from_directory(FRONTEND, path)
-    return send_from_directory(FRONTEND, "index.html")
+    if path.startswith("api/"):
+        return err("Not found", 404)
+    return static_files.response(path)
+
+# ─── CLI (flask --app app <command>) ──────────────────────────────────────────
+@app.cli.command("seed")
+def seed_command():
+    """Load the demo admin, catalogue and coupons (no-op once done)."""
+    print("Demo data loaded" if seed_db() else "Already seeded")
+
+@app.cli.command("compress-static")
+@click.argument("root", required=False)
+def compress_static_command(root):
+    """Write .gz/.br twins of the frontend build's text assets (FRONTEND_DIR by default)."""
+    root = root or FRONTEND
+    print(f"Precompressed {precompress_static(root)} file(s) under {root}"
+          + ("" if brotli else " (gzip only: pip install brotli for .br)"))
+
+@app.cli.command("rebuild-search")
+def rebuild_search_command():
+    """Rebuild the product full-text search index."""
+    db = sqlite3.connect(DB_PATH)
+    if not db.execute("SELECT 1 FROM sqlite_master WHERE name='products_fts'").fetchone():
+        raise SystemExit("Full-text search is unavailable (SQLite built without FTS5)")
+    rebuild_search(db)
+    db.close()
+    print("Search index rebuilt")
+
+@app.cli.command("backfill-stats")
+def backfill_stats_command():
+    """Recompute the dashboard rollups from orders, users and products."""
+    db = sqlite3.connect(DB_PATH, isolation_level=None)
+    db.execute("BEGIN IMMEDIATE")
+    backfill_stats(db)
+    db.execute("COMMIT")
+    db.close()
+    print("Dashboard stats rebuilt")
+
+# ─── Synthetic data ───────────────────────────────────────────────────────────
+# `flask --app app generate-data` fills a database with a production-sized,
+# reproducible catalogue and order history. Rows are bulk-inserted with
+# executemany in large transactions while secondary indexes and triggers are
+# dropped; those are rebuilt once at the end, followed by the search index and
+# the dashboard rollups. Run it with the server stopped.
+
+GEN_WORDS = {
+    "fruits":    (["Fresh", "Organic", "Farm", "Ripe", "Hand-picked"], ["Apples", "Bananas", "Spinach", "Tomatoes", "Mangoes", "Carrots"]),
+    "dairy":     (["Full Cream", "Toned", "Farm", "Organic", "Greek"],  ["Milk", "Curd", "Paneer", "Butter", "Cheese", "Eggs"]),
+    "bakery":    (["Whole Wheat", "Multigrain", "Butter", "Fresh", "Soft"], ["Bread", "Buns", "Cookies", "Rusk", "Croissant", "Cake"]),
+    "snacks":    (["Masala", "Salted", "Spicy", "Baked", "Classic"],   ["Chips", "Namkeen", "Nuts", "Popcorn", "Crackers", "Bhujia"]),
+    "beverages": (["Cold", "Green", "Masala", "Instant", "Sparkling"], ["Tea", "Coffee", "Juice", "Soda", "Lassi", "Water"]),
+    "meat":      (["Fresh", "Boneless", "Farm", "Marinated", "Frozen"], ["Chicken", "Mutton", "Fish", "Prawns", "Eggs", "Sausages"]),
+}
+GEN_BRANDS   = ["Amul", "Britannia", "Haldiram", "Tata", "Nestle", "Mother Dairy", "Farm Fresh", "Licious", "Paper Boat", "ITC"]
+GEN_STATUSES = (["delivered", "out_for_delivery", "packed", "confirmed", "cancelled"], [70, 5, 5, 10, 10])
+GEN_RATINGS  = ([1, 2, 3, 4, 5], [4, 4, 10, 32, 50])
+
+def _zipf(n, s):
+    """Cumulative weights for rank-1..n popularity ~ 1/rank^s (for rng.choices)."""
+    total, cum = 0.0, []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** s
+        cum.append(total)
+    return cum
+
+@contextmanager
+def deferred_indexes(db, tables):
+    """Drop secondary indexes and triggers on `tables`; recreate them on exit."""
+    marks = ",".join("?" * len(tables))
+    saved = db.execute(f"""SELECT type, name, sql FROM sqlite_master
+                           WHERE type IN ('index','trigger') AND sql IS NOT NULL
+                             AND tbl_name IN ({marks})""", tables).fetchall()
+    for kind, name, _ in saved:
+        db.execute(f'DROP {kind.upper()} "{name}"')
+    try:
+        yield
+    finally:
+        # indexes first, so triggers are recreated against a complete schema
+        for _, _, sql in sorted(saved, key=lambda r: r[0] != "index"):
+            db.execute(sql)
+
+def generate_data(db, users, products, orders, reviews, seed=42, items=3, batch=100_000, log=print):
+    """Bulk-insert a deterministic synthetic dataset. Returns rows written per table."""
+    rng    = random.Random(seed)
+    now    = datetime.now(timezone.utc)
+    tag    = f"g{seed}"
+    counts = {}
+    if db.execute("SELECT 1 FROM users WHERE id=?", (f"{tag}u0",)).fetchone():
+        raise ValueError(f"seed {seed} was already generated into this database; pick another --seed")
+
+    cats      = [r[0] for r in db.execute("SELECT id FROM categories ORDER BY sort_order")]
+    cat_emoji = dict(db.execute("SELECT id, emoji FROM categories"))
+
+    def stamp(days):
+        return (now - timedelta(seconds=rng.randrange(days * 86400))).isoformat()
+
+    def bulk(table, sql, rows, total, side=None):
+        """executemany `rows` in chunks of `batch`, committing every 10 chunks.
+        `side` = (table, sql, buffer) is flushed alongside each chunk."""
+        start, done, chunk = time.perf_counter(), 0, []
+
+        def flush():
+            db.executemany(sql, chunk)
+            if side:
+                db.executemany(side[1], side[2])
+                counts[side[0]] = counts.get(side[0], 0) + len(side[2])
+                side[2].clear()
+
+        db.execute("BEGIN")
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= batch:
+                flush()
+                done += len(chunk)
+                chunk.clear()
+                if done % (batch * 10) == 0:
+                    db.execute("COMMIT")
+                    db.execute("BEGIN")
+                    log(f"  {table:<12} {done:>11,} / {total:,}")
+        flush()
+        done += len(chunk)
+        db.execute("COMMIT")
+        took = time.perf_counter() - start
+        counts[table] = done
+        extra = f" (+{counts[side[0]]:,} {side[0]})" if side else ""
+        log(f"  {table:<12} {done:>11,} rows{extra} in {took:6.1f}s")
+
+    def user_rows():
+        password = hash_password("password123", inline=True)   # one shared hash; scrypt per row would take hours
+        for i in range(users):
+            yield (f"{tag}u{i}", f"Shopper {i}", f"{tag}.shopper{i}@example.com",
+                   f"9{rng.randrange(10**9):09d}", password, stamp(730))
+
+    catalog = []   # (name, emoji, weight, price) per generated product, for order lines
+    def product_rows():
+        for i in range(products):
+            cat = cats[i % len(cats)]
+            adjs, nouns = GEN_WORDS.get(cat, (["Daily"], ["Essentials"]))
+            name   = f"{rng.choice(adjs)} {rng.choice(nouns)} {i}"
+            weight = rng.choice(("250g", "500g", "1kg", "1L", "6 pcs", "200ml"))
+            mrp    = float(rng.randrange(20, 1500))
+            off    = rng.choice((0, 0, 5, 10, 15, 20, 30))
+            price  = round(mrp * (100 - off) / 100)
+            catalog.append((name, cat_emoji[cat], weight, price))
+            yield (f"{tag}p{i}", name, "", cat, cat_emoji[cat], rng.choice(GEN_BRANDS), weight,
+                   price, mrp, off, rng.randrange(0, 500), 4.0, 0, int(rng.random() > 0.02), stamp(1095))
+
+    # popularity: a few products and repeat shoppers dominate, like real traffic
+    product_cum = _zipf(products, 1.05)
+    user_cum    = _zipf(users, 0.8)
+    item_rows   = []
+
+    def order_rows():
+        statuses, status_w = GEN_STATUSES
+        for i in range(orders):
+            oid   = f"{tag}o{i}"
+            lines = rng.choices(range(products), cum_weights=product_cum, k=rng.randint(1, items * 2 - 1))
+            subtotal = 0
+            for j, p in enumerate(dict.fromkeys(lines)):
+                name, emoji, weight, price = catalog[p]
+                qty = rng.randint(1, 3)
+                subtotal += price * qty
+                item_rows.append((f"{oid}i{j}", oid, f"{tag}p{p}", name, emoji, weight, price, qty))
+            fee    = 0 if subtotal >= 299 else 49
+            disc   = round(subtotal * 0.05)
+            status = rng.choices(statuses, status_w)[0]
+            ts     = stamp(365)
+            uid    = rng.choices(range(users), cum_weights=user_cum)[0]
+            yield (oid, f"{tag}u{uid}", f"{i} Market Road", "Pune", "411001", "9000000000",
+                   subtotal, fee, disc, subtotal + fee - disc, rng.choice(("cod", "upi", "card")),
+                   "pending" if status == "confirmed" else "paid", status, "", ts, ts)
+
+    def review_rows():
+        ratings, rating_w = GEN_RATINGS
+        for i in range(reviews):
+            p = rng.choices(range(products), cum_weights=product_cum)[0]
+            u = rng.randrange(users)
+            yield (f"{tag}r{i}", f"{tag}p{p}", f"{tag}u{u}", f"Shopper {u}",
+                   rng.choices(ratings, rating_w)[0], "Generated review", stamp(365))
+
+    with deferred_indexes(db, ("users", "products", "orders", "order_items", "reviews")):
+        bulk("users", """INSERT INTO users (id,name,email,phone,password,role,avatar,created_at)
+                         VALUES (?,?,?,?,?,'user','',?)""", user_rows(), users)
+        bulk("products", f"INSERT INTO products ({PRODUCT_COLUMNS}) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+             product_rows(), products)
+        if users and products:
+            bulk("orders", "INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", order_rows(), orders,
+                 side=("order_items", "INSERT INTO order_items VALUES (?,?,?,?,?,?,?,?)", item_rows))
+            bulk("reviews", "INSERT INTO reviews VALUES (?,?,?,?,?,?,?)", review_rows(), reviews)
+        log("  rebuilding indexes and triggers...")
+
+    db.execute("BEGIN")
+    backfill_ratings(db, f"{tag}p")   # the rating triggers were off during the bulk insert
+    backfill_stats(db)
+    db.execute("COMMIT")
+    if SEARCH_FTS:
+        rebuild_search(db)
+    return counts
+
+@app.cli.command("generate-data")
+@click.option("--users",    default=100_000, show_default=True)
+@click.option("--products", default=20_000,  show_default=True)
+@click.option("--orders",   default=500_000, show_default=True)
+@click.option("--reviews",  default=200_000, show_default=True)
+@click.option("--items",    default=3, show_default=True, help="Average line items per order.")
+@click.option("--seed",     default=42, show_default=True, help="Same seed, same data.")
+@click.option("--batch",    default=100_000, show_default=True, help="Rows per executemany call.")
+def generate_data_command(users, products, orders, reviews, items, seed, batch):
+    """Bulk-load a large deterministic synthetic dataset into URMART_DB."""
+    seed_db()   # generated products use the seeded categories
+    db = sqlite3.connect(DB_PATH, isolation_level=None)
+    db.execute("PRAGMA synchronous=OFF")
+    db.execute("PRAGMA cache_size=-262144")   # 256 MiB
+    db.execute("PRAGMA temp_store=MEMORY")
+    start = time.perf_counter()
+    try:
+        counts = generate_data(db, users, products, orders, reviews, seed, items, batch)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.close()
+    print(f"Generated {sum(counts.values()):,} rows in {time.perf_counter() - start:.1f}s")
+
+# Representative route queries. check-query-plans and tests/test_query_plans.py
+# fail if any of them needs a full table scan; add new hot-path queries here
+# when routes change.
+# Single-row lookups and fixed statements, as their routes run them. Paged
+# lists are added by plan_checks() from the builders their routes use.
+PLAN_LOOKUPS = [
+    ("login",              "SELECT * FROM users WHERE email=?", ("a@b.c",)),
+    ("get_addresses",      "SELECT * FROM addresses WHERE user_id=? ORDER BY is_default DESC", ("u",)),
+    ("get_categories",     "SELECT * FROM categories ORDER BY sort_order", ()),
+    ("get_product",        f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id=? AND is_active=1", ("p1",)),
+    ("featured_products",  FEATURED_SQL, ()),
+    ("trending_products",  TRENDING_SQL, ()),
+    ("get_cart",           "SELECT id, product_id, qty, added_at FROM cart WHERE user_id=? ORDER BY added_at DESC",
+     ("u",)),
+    ("cart products",      "SELECT id, name, price, stock FROM products WHERE id IN (?,?)", ("p1", "p2")),
+    ("get_wishlist",
+     "SELECT p.id, w.added_at FROM wishlist w JOIN products p ON w.product_id = p.id"
+     " WHERE w.user_id=? ORDER BY w.added_at DESC", ("u",)),
+    ("apply_coupon",       "SELECT * FROM coupons WHERE code=? AND is_active=1", ("SAVE50",)),
+    ("order items",        "SELECT * FROM order_items WHERE order_id IN (?,?,?)", ("a", "b", "c")),
+    ("get_order",          "SELECT * FROM orders WHERE id=?", ("o",)),
+    ("admin_users",        "SELECT id,name,email,phone,role,created_at FROM users ORDER BY created_at DESC", ()),
+    ("admin_products",     f"SELECT {PRODUCT_COLUMNS} FROM products ORDER BY created_at DESC", ()),
+    ("admin_stats top",
+     "SELECT p.name, s.units FROM stats_product_sales s JOIN products p ON s.product_id=p.id"
+     " ORDER BY s.units DESC LIMIT 5", ()),
+    ("admin_stats series",
+     "SELECT * FROM stats_daily WHERE day BETWEEN ? AND ? AND orders > 0 ORDER BY day", ("2026-01-01", "2026-01-31")),
+    ("admin_stats recent",
+     "SELECT o.*, u.name as user_name FROM orders o JOIN users u ON o.user_id=u.id"
+     " ORDER BY o.created_at DESC LIMIT 5", ()),
+    ("order events replay", f"SELECT {OrderEvents.COLUMNS} FROM order_events WHERE seq > ? AND seq < ? ORDER BY seq",
+     (1, 100)),
+]
+
+def plan_checks():
+    """(name, sql, params, sort_ok) for every statement check-query-plans explains.
+
+    Paged lists are built by their routes' own builders in every sort, with
+    and without each filter, first page and cursor page. `sort_ok` marks the
+    search orderings, which sort only the matching rows (bm25 score can't be
+    indexed); everywhere else a temp b-tree sort fails the check.
+    """
+    checks = [(name, sql, params, False) for name, sql, params in PLAN_LOOKUPS]
+    columns = ", ".join(PRODUCT_FIELDS)
+    for sort, (col, _) in PRODUCT_SORTS.items():
+        if sort == "relevance":
+            continue
+        for category in (None, "fruits"):
+            source, where, params = product_filter(sort, category)
+            label = f"get_products {sort}" + (" category" if category else "")
+            checks.append((label, *product_page_sql(columns, sort, source, where, params, offset=0), False))
+            checks.append((label + " cursor",
+                           *product_page_sql(columns, sort, source, where, params, last=(1, "p1")), False))
+    for category in (None, "fruits"):
+        source, where, params = product_filter("default", category)
+        label = "get_products count" + (" category" if category else "")
+        checks.append((label, product_count_sql(source, where), params, False))
+        checks.append((label + " approx", product_count_sql(source, where, capped=True), params + [COUNT_CAP + 1], False))
+    searches = [("like", "milk", None, "default", False)]
+    if SEARCH_FTS:
+        searches += [("fts", "milk", fts_query("milk"), "default", True),
+                     ("relevance", "milk", fts_query("milk"), "relevance", True)]
+    for label, search, match, sort, sort_ok in searches:
+        source, where, params = product_filter(sort, None, search, match)
+        checks.append((f"get_products search {label}",
+                       *product_page_sql(columns, sort, source, where, params, offset=0), sort_ok))
+        checks.append((f"get_products search {label} count", product_count_sql(source, where), params, False))
+    for sort, (cols, _) in REVIEW_SORTS.items():
+        checks.append((f"get_reviews {sort}", *review_page_sql("p1", sort), False))
+        checks.append((f"get_reviews {sort} cursor",
+                       *review_page_sql("p1", sort, last=(3,) * (len(cols) - 1) + ("2030", "r")), False))
+    filters = [("", {}), (" cursor", {"last": ("2030-01-01", "o")}),
+               (" status", {"status": "confirmed"}),
+               (" range", {"since": "2026-01-01", "until": "2026-02-01"}),
+               (" status range", {"status": "confirmed", "since": "2026-01-01", "until": "2026-02-01"})]
+    for label, kwargs in filters:
+        checks.append(("get_orders" + label,
+                       *order_page_sql(ORDERS_SELECT, ["o.user_id=?"], ["u"], **kwargs), False))
+        checks.append(("admin_orders" + label, *order_page_sql(ADMIN_ORDERS_SELECT, [], [], **kwargs), False))
+    return checks
+
+def plan_problems(db, sql, params=(), sort_ok=False):
+    """What EXPLAIN QUERY PLAN says is wrong with a statement: full table scans and temp b-tree sorts."""
+    problems = []
+    for row in db.execute("EXPLAIN QUERY PLAN " + sql, params):
+        detail = row[3]
+        m = re.match(r"SCAN (\w+)(.*)", detail)
+        if m and "USING" not in m.group(2) and "VIRTUAL TABLE" not in m.group(2) \
+                and m.group(1) != "CONSTANT":
+            problems.append(f"scan {m.group(1)}")
+        elif detail.startswith("USE TEMP B-TREE") and not sort_ok:
+            problems.append(detail.lower().replace("use ", ""))
+    return problems
+
+def query_plan_report(path=None):
+    """[(name, problems)] for every plan_checks() statement, on the database at `path`."""
+    db = sqlite3.connect(path or DB_PATH)
+    try:
+        return [(name, plan_problems(db, sql, params, sort_ok)) for name, sql, params, sort_ok in plan_checks()]
+    finally:
+        db.close()
+
+@app.cli.command("check-query-plans")
+def check_query_plans_command():
+    """Fail if any route query needs a full table scan or sorts in a temp b-tree."""
+    report = query_plan_report()
+    for name, problems in report:
+        print(f"{'FAIL' if problems else 'ok':4}  {name}{'  -> ' + '; '.join(problems) if problems else ''}")
+    failed = sum(bool(problems) for _, problems in report)
+    if failed:
+        raise SystemExit(f"{failed} route quer{'y needs' if failed == 1 else 'ies need'} a full scan or a sort")
+
+@app.cli.command("slow-queries")
+@click.option("--top",   default=10, show_default=True, help="Statements to show.")
+@click.option("--by",    type=click.Choice(["total", "max", "count"]), default="total", show_default=True)
+@click.option("--route", default=None, help="Only entries from routes containing this text.")
+@click.option("--path",  default=SLOW_QUERY_LOG, show_default=True, help="Log file (rotated backups are read too).")
+def slow_queries_command(top, by, route, path):
+    """Rank the statements in the slow query log."""
+    groups = {}
+    for file in SlowQueryLog(path, 0, SLOW_QUERY_BACKUPS).files():
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue   # a line cut short by rotation or a crash
+                if route and route not in (e.get("route") or ""):
+                    continue
+                s = groups.setdefault(e["fp"], {"sql": e["sql"], "ms": [], "rows": 0,
+                                                "routes": set(), "worst": e})
+                s["ms"].append(e["ms"])
+                s["rows"] += e["rows"] if e["rows"] > 0 else 0
+                s["routes"].add(e.get("route") or "-")
+                if e["ms"] > s["worst"]["ms"]:
+                    s["worst"] = e
+    if not groups:
+        raise SystemExit(f"No slow queries logged in {path}")
+
+    key = {"total": lambda s: sum(s["ms"]), "max": lambda s: max(s["ms"]), "count": lambda s: len(s["ms"])}[by]
+    ranked = sorted(groups.values(), key=key, reverse=True)[:top]
+    for i, s in enumerate(ranked, 1):
+        ms = sorted(s["ms"])
+        print(f"#{i}  {len(ms)}x  total {sum(ms):.1f} ms  p50 {ms[len(ms) // 2]:.1f}  "
+              f"max {ms[-1]:.1f} ms  avg rows {s['rows'] / len(ms):.0f}")
+        print(f"    {s['sql']}")
+        print(f"    routes: {', '.join(sorted(s['routes']))}")
+        print(f"    slowest: trace {s['worst']['trace']}  params {s['worst']['params']}")
+        for step in s["worst"]["plan"]:
+            print(f"      {step}")
+        print()
 
 # ─── Boot ─────────────────────────────────────────────────────────────────────
 init_db()
@@ -973,4 +4096,5 @@ if __name__ == "__main__":
     print("  http://localhost:3000")
     print("  Admin: admin@urmart.com / admin123")
     print("═"*50 + "\n")
+    seed_db()   # dev convenience; production seeds explicitly with `flask --app app seed`
     app.run(debug=True, port=5000, host="0.0.0.0")
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+UR MART — ASGI entry point.
+
+    uvicorn asgi:application --port 5000      # or: python start.py --asgi
+    python asgi.py --check                    # route-by-route parity with the WSGI app (temp database)
+
+Serves the same Flask app, routes and ok()/err() envelope as app.py. Request
+bodies are read and responses written on the event loop, so slow uploads and
+idle keep-alive clients cost a coroutine rather than a thread; only the Flask
+handler itself, with its SQLite work, runs on a bounded thread executor. When
+ASGI_MAX_PENDING requests are already queued for a thread, new ones get a 503
+straight away instead of waiting behind them. Order event streams only borrow a
+thread to open; after that the event loop feeds them, so they are capped by
+ASGI_MAX_STREAMS rather than by threads.
+"""
+
+import asyncio, io, json, os, sys, tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+if __name__ == "__main__" and "--check" in sys.argv:
+    # the check registers users, places orders and edits products: never on the real database
+    os.environ.setdefault("URMART_DB", os.path.join(tempfile.mkdtemp(), "parity.db"))
+
+from app import app, order_events
+
+ASGI_THREADS     = int(os.environ.get("ASGI_THREADS", 32))
+ASGI_MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", 1024))
+ASGI_MAX_BODY    = int(os.environ.get("ASGI_MAX_BODY", 8 * 1024 * 1024))
+ASGI_MAX_STREAMS = int(os.environ.get("ASGI_MAX_STREAMS", 1000))   # open order event streams per process
+
+_DONE = object()
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class WSGIAdapter:
+    """Runs a WSGI app under ASGI with a bounded executor for the app call."""
+
+    def __init__(self, wsgi_app, threads=32, max_pending=1024, max_body=8 * 1024 * 1024):
+        self.wsgi_app    = wsgi_app
+        self.threads     = threads
+        self.max_pending = max_pending
+        self.max_body    = max_body
+        self.pending     = 0   # only touched on the event loop, so no lock
+        self.rejected    = 0
+        self.executor    = ThreadPoolExecutor(threads, thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return  # no websockets; the server closes the connection
+
+        try:
+            body = await self.read_body(receive)
+        except BodyTooLarge:
+            return await self.send_error(send, 413, "Request body too large")
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return await self.send_error(send, 503, "Server busy, please retry")
+
+        loop    = asyncio.get_running_loop()
+        environ = self.environ(scope, body)
+        self.pending += 1
+        try:
+            status, headers, result, first = await loop.run_in_executor(self.executor, self.start, environ)
+        finally:
+            self.pending -= 1
+
+        try:
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            stream = environ.get("urmart.event_stream")
+            chunk  = first
+            while chunk is not _DONE:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if stream is not None:
+                    await self.send_events(stream, receive, send)
+                    break
+                # streamed responses pull further chunks off the loop too
+                chunk = await loop.run_in_executor(self.executor, next, result, _DONE)
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                await loop.run_in_executor(self.executor, result.close)
+
+    async def send_events(self, stream, receive, send):
+        """Feed an app.EventStream from the loop until it ends or the client goes."""
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def notify():   # called on the broker's thread
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass    # loop already closed
+
+        stream.sub.notify = notify
+        gone = asyncio.ensure_future(self.disconnected(receive))
+        try:
+            while not gone.done():
+                wake.clear()   # before poll(), so a frame queued after it still wakes us
+                frame = stream.poll()
+                if frame is None:
+                    return
+                if frame:
+                    await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+                    continue
+                woken = asyncio.ensure_future(wake.wait())
+                await asyncio.wait((woken, gone), timeout=stream.wait(), return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+        finally:
+            gone.cancel()
+            stream.sub.notify = None
+
+    @staticmethod
+    async def disconnected(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_body:
+                raise BodyTooLarge()
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+    def start(self, environ):
+        """Call the app (on an executor thread) up to its first body chunk."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"]  = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1"))
+                                   for k, v in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        it     = iter(result)
+        first  = next(it, _DONE)  # start_response may be deferred to here
+        return response["status"], response["headers"], _Chunks(it, result), first
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        path   = scope.get("root_path", "") + scope["path"]
+        env = {
+            "REQUEST_METHOD":    scope["method"],
+            "SCRIPT_NAME":       scope.get("root_path", "").encode().decode("latin-1"),
+            "PATH_INFO":         path[len(scope.get("root_path", "")):].encode().decode("latin-1"),
+            "QUERY_STRING":      scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME":       str(server[0]),
+            "SERVER_PORT":       str(server[1] or 80),
+            "SERVER_PROTOCOL":   "HTTP/" + scope.get("http_version", "1.1"),
+            "REMOTE_ADDR":       client[0],
+            "REMOTE_PORT":       str(client[1]),
+            "CONTENT_LENGTH":    str(len(body)),
+            "wsgi.version":      (1, 0),
+            "wsgi.url_scheme":   scope.get("scheme", "http"),
+            "wsgi.input":        io.BytesIO(body),
+            "wsgi.errors":       sys.stderr,
+            "wsgi.multithread":  True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once":     False,
+            "asgi.scope":        scope,
+        }
+        for name, value in scope.get("headers", []):
+            name, value = name.decode("latin-1"), value.decode("latin-1")
+            if name == "content-type":
+                env["CONTENT_TYPE"] = value
+                continue
+            if name == "content-length":
+                continue
+            key = "HTTP_" + name.upper().replace("-", "_")
+            env[key] = env[key] + "," + value if key in env else value
+        return env
+
+    @staticmethod
+    async def send_error(send, status, msg):
+        body = json.dumps({"success": False, "message": msg}).encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self):
+        return {"threads": self.threads, "pending": self.pending,
+                "max_pending": self.max_pending, "rejected": self.rejected}
+
+
+class _Chunks:
+    """The rest of a WSGI body iterable; keeps close() on the original."""
+
+    def __init__(self, it, result):
+        self._it     = it
+        self._result = result
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._it)
+
+    def close(self):
+        if hasattr(self._result, "close"):
+            self._result.close()
+
+
+application = WSGIAdapter(app, ASGI_THREADS, ASGI_MAX_PENDING, ASGI_MAX_BODY)
+order_events.max_streams = ASGI_MAX_STREAMS   # idle streams cost a queue here, not a thread
+
+
+# ─── Parity check ─────────────────────────────────────────────────────────────
+# Every route is called through the Flask test client and through the ASGI
+# adapter in turn, against the same database. Reads must match byte for byte;
+# writes, which mint ids and timestamps, must match in status and JSON shape.
+# The cases write to the database, so only run them against a throwaway one:
+# tests/test_asgi_parity.py and `python asgi.py --check` both do.
+
+async def _asgi_request(method, path, body=None, headers=None):
+    path, _, qs = path.partition("?")
+    raw   = json.dumps(body).encode() if body is not None else b""
+    hdrs  = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if body is not None:
+        hdrs.append((b"content-type", b"application/json"))
+    scope = {"type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+             "path": path, "root_path": "", "query_string": qs.encode(), "headers": hdrs,
+             "server": ("localhost", 5000), "client": ("127.0.0.1", 40000)}
+    sent  = [{"type": "http.request", "body": raw, "more_body": False}]
+    out   = {"body": b""}
+
+    async def receive():
+        return sent.pop() if sent else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+        else:
+            out["body"] += message.get("body", b"")
+
+    await application(scope, receive, send)
+    return out["status"], out["body"]
+
+
+def _shape(value):
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shape(value[0])] if value else []
+    return type(value).__name__
+
+
+def parity_results():
+    """([(label, wsgi status, asgi status, wsgi body, asgi body, same)], routes not exercised)."""
+    import itertools, secrets
+    import app as urmart
+
+    urmart.seed_db()
+    wsgi    = app.test_client()
+    seq     = itertools.count()
+    admin   = {"Authorization": "Bearer " + urmart.make_token("admin", "admin")}
+    email   = f"parity-{secrets.token_hex(4)}@example.com"
+    r       = wsgi.post("/api/auth/register", json={"name": "Parity", "email": email,
+                                                    "password": "parity123", "phone": "9000000000"})
+    user    = {"Authorization": "Bearer " + r.get_json()["data"]["token"]}
+    address = {"line1": "1 Parity Rd", "city": "Pune", "state": "MH", "pincode": "411001",
+               "phone": "9000000000"}
+
+    def new_address():
+        return wsgi.post("/api/addresses", json=address, headers=user).get_json()["data"]["id"]
+
+    def new_cart_item():
+        wsgi.post("/api/cart", json={"product_id": "p2", "qty": 1}, headers=user)
+        return wsgi.get("/api/cart", headers=user).get_json()["data"]["items"][0]["id"]
+
+    def new_product():
+        return wsgi.post("/api/admin/products", headers=admin, json={
+            "name": "Parity", "category_id": "dairy", "price": 10, "mrp": 12, "emoji": "🧪",
+        }).get_json()["data"]["id"]
+
+    def checkout_body():
+        wsgi.post("/api/cart", json={"product_id": "p3", "qty": 1}, headers=user)
+        return {"address": address}
+
+    def new_order():
+        wsgi.post("/api/cart", json={"product_id": "p3", "qty": 1}, headers=user)
+        return wsgi.post("/api/orders", json={"address": address}, headers=user).get_json()["data"]["id"]
+
+    order = new_order()
+
+    # (method, path or fn -> path, body, headers, exact)
+    cases = [
+        ("POST",   "/api/auth/register", lambda: {"name": "P", "password": "parity123",
+                                                  "email": f"parity-{secrets.token_hex(4)}@example.com"}, None, False),
+        ("POST",   "/api/auth/register", {"email": email}, None, True),
+        ("POST",   "/api/auth/login", {"email": email, "password": "wrong"}, None, True),
+        ("GET",    "/api/auth/me", None, user, True),
+        ("GET",    "/api/auth/me", None, None, True),
+        ("PUT",    "/api/users/profile", {"name": "Parity", "phone": "9000000000"}, user, True),
+        ("PUT",    "/api/users/change-password", {"old_password": "nope", "new_password": "parity456"}, user, True),
+        ("GET",    "/api/addresses", None, user, True),
+        ("POST",   "/api/addresses", address, user, False),
+        ("DELETE", lambda: f"/api/addresses/{new_address()}", None, user, True),
+        ("PUT",    lambda: f"/api/addresses/{new_address()}/default", None, user, True),
+        ("GET",    "/api/categories", None, None, True),
+        ("GET",    "/api/products", None, None, True),
+        ("GET",    "/api/products?search=milk&sort=relevance&count=exact", None, None, True),
+        ("GET",    "/api/products?category=dairy&per_page=3&sort=price_asc", None, None, True),
+        ("GET",    "/api/products/p1", None, None, True),
+        ("GET",    "/api/products/nope", None, None, True),
+        ("GET",    "/api/products/featured", None, None, True),
+        ("GET",    "/api/products/trending", None, None, True),
+        ("POST",   "/api/cart", {"product_id": "p1", "qty": 1}, user, False),
+        ("GET",    "/api/cart", None, user, True),
+        ("PUT",    lambda: f"/api/cart/{new_cart_item()}", {"qty": 2}, user, True),
+        ("DELETE", lambda: f"/api/cart/{new_cart_item()}", None, user, True),
+        ("POST",   "/api/cart/sync", {"items": [{"product_id": "p4", "qty": 1}]}, user, True),
+        ("DELETE", "/api/cart/clear", None, user, True),
+        ("POST",   lambda: f"/api/wishlist/p{5 + next(seq)}", None, user, True),
+        ("GET",    "/api/wishlist", None, user, True),
+        ("GET",    "/api/products/p1/reviews?sort=highest&per_page=5", None, None, True),
+        ("POST",   "/api/products/p1/reviews", {"rating": 4, "comment": "Parity"}, user, False),
+        ("POST",   "/api/products/p1/reviews", {"rating": 9, "comment": "Parity"}, user, True),
+        ("POST",   "/api/coupons/apply", {"code": "SAVE50", "subtotal": 500}, user, True),
+        ("POST",   "/api/orders", checkout_body, user, False),   # cart refilled for each side
+        ("POST",   "/api/orders", {"address": address}, user, True),    # cart now empty: the 400
+        ("GET",    "/api/orders", None, user, True),
+        ("GET",    f"/api/orders/{order}", None, user, True),
+        ("GET",    "/api/admin/users", None, admin, True),
+        ("GET",    "/api/admin/users", None, user, True),
+        ("GET",    "/api/admin/products", None, admin, True),
+        ("POST",   "/api/admin/products", {"name": "Parity", "category_id": "dairy", "price": 10,
+                                           "mrp": 12, "emoji": "🧪"}, admin, False),
+        ("PUT",    "/api/admin/products/p2", {"stock": 500}, admin, True),
+        ("DELETE", lambda: f"/api/admin/products/{new_product()}", None, admin, True),
+        ("GET",    "/api/admin/orders?limit=5", None, admin, True),
+        ("POST",   "/api/orders/events/ticket", None, user, False),  # tickets carry their issue time
+        ("POST",   "/api/orders/events/ticket", None, None, True),
+        ("GET",    "/api/orders/events", None, None, True),          # streams never end; check the guards
+        ("GET",    "/api/orders/events?ticket=nope", None, None, True),
+        ("GET",    "/api/admin/orders/events", None, user, True),
+        ("GET",    "/api/admin/orders/events/stats", None, admin, False),
+        ("PUT",    lambda: f"/api/admin/orders/{new_order()}/status", {"status": "packed"}, admin, False),
+        ("GET",    "/api/admin/kdf", None, admin, False),
+        ("GET",    "/api/admin/metrics", None, user, True),   # text body varies; check the guard
+        ("GET",    "/api/admin/cart-store", None, admin, False),
+        ("GET",    "/api/admin/db/pool", None, admin, False),
+        ("GET",    "/api/admin/cache", None, admin, False),
+        ("DELETE", "/api/admin/cache", None, admin, True),
+        ("GET",    "/api/admin/stats", None, admin, True),
+        ("POST",   "/api/batch", {"requests": [{"path": "/api/categories"}, {"path": "/api/cart"},
+                                       {"path": "/api/products/p1"}]}, user, False),
+        ("GET",    "/", None, None, True),
+        ("GET",    "/favicon.ico", None, None, True),
+        ("GET",    "/api/nope", None, None, True),
+    ]
+
+    adapter, covered, results = app.url_map.bind("localhost"), set(), []
+    loop = asyncio.new_event_loop()
+    for method, path, body, headers, exact in cases:
+        pair = []
+        for via in ("wsgi", "asgi"):
+            p = path() if callable(path) else path
+            b = body() if callable(body) else body
+            try:
+                covered.add(adapter.match(p.partition("?")[0], method=method)[0])
+            except Exception:
+                pass
+            if via == "wsgi":
+                r = wsgi.open(p, method=method, json=b, headers=headers or {})
+                pair.append((r.status_code, r.data))
+            else:
+                pair.append(loop.run_until_complete(_asgi_request(method, p, b, headers)))
+        (ws, wb), (as_, ab) = pair
+        if exact:
+            same = ws == as_ and wb == ab
+        else:
+            same = ws == as_ and _shape(json.loads(wb)) == _shape(json.loads(ab))
+        label = f"{method:<6} {path if isinstance(path, str) else '<fresh>'}"
+        results.append((label, ws, as_, wb[:200], ab[:200], same))
+    loop.close()
+    return results, {r.endpoint for r in app.url_map.iter_rules()} - covered
+
+
+def check_parity():
+    results, missing = parity_results()
+    for label, ws, as_, wb, ab, same in results:
+        print(f"  {'ok ' if same else 'DIFF'} {ws} {label}")
+    failures = [r for r in results if not r[-1]]
+    for label, ws, as_, wb, ab, _ in failures:
+        print(f"\n  {label}: wsgi {ws} vs asgi {as_}\n    {wb!r}\n    {ab!r}")
+    if missing:
+        print(f"\n  routes not exercised: {', '.join(sorted(missing))}")
+    print(f"\n{len(results) - len(failures)}/{len(results)} cases match")
+    return not failures and not missing
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        sys.exit(0 if check_parity() else 1)
+    print(__doc__)
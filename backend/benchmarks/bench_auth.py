@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Per-request auth overhead: token verification with and without the verified-token cache.
+
+    python benchmarks/bench_auth.py [-n 20000]
+
+Runs against a throwaway database; nothing touches urmart.db.
+"""
+
+import argparse, os, sys, tempfile, time
+
+os.environ.setdefault("URMART_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import app as urmart
+
+urmart.seed_db()
+
+
+def bench(label, fn, n):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    per_call = (time.perf_counter() - start) / n
+    print(f"  {label:<38} {per_call * 1e6:9.2f} µs/req")
+    return per_call
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", type=int, default=20000, help="iterations per case")
+    n = ap.parse_args().n
+
+    token   = urmart.make_token("admin", "admin")
+    headers = {"Authorization": f"Bearer {token}"}
+    client  = urmart.app.test_client()
+
+    print(f"\nAuth overhead ({n} iterations)\n")
+    with urmart.app.test_request_context(headers=headers):
+        bench("jwt.decode only (old require_auth)",
+              lambda: jwt.decode(token, urmart.SECRET_KEY, algorithms=["HS256"]), n)
+
+        cache = urmart.token_cache
+        urmart.token_cache = urmart.TTLCache(0)
+        cold = bench("verify_token, cache disabled", lambda: urmart.verify_token(token), n)
+        urmart.token_cache = cache
+        warm = bench("verify_token, cache warm", lambda: urmart.verify_token(token), n)
+
+    urmart.token_cache = urmart.TTLCache(0)
+    full_cold = bench("GET /api/auth/me, cache disabled",
+                      lambda: client.get("/api/auth/me", headers=headers), n // 10)
+    urmart.token_cache = cache
+    full_warm = bench("GET /api/auth/me, cache warm",
+                      lambda: client.get("/api/auth/me", headers=headers), n // 10)
+
+    print(f"\n  verification speed-up: {cold / warm:.1f}x"
+          f"   (saves {(full_cold - full_warm) * 1e6:.1f} µs per request end to end)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Checkout under contention: oversell check and throughput vs the old pipeline.
+
+    python benchmarks/bench_checkout.py [-u 60] [-c 12] [--stock 25]
+
+Every buyer has the same scarce product in their cart and they all check out
+at once, through the new pipeline and through the legacy one (Python stock
+check, one auto-commit per statement) for comparison. The no-oversell
+invariant itself is enforced by tests/test_checkout.py. Runs against a throwaway
+database; nothing touches urmart.db.
+"""
+
+import argparse, os, secrets, sqlite3, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("URMART_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as urmart
+
+urmart.seed_db()
+
+PRODUCT = "p1"
+COUPON  = "BENCHCAP"
+ADDRESS = {"line1": "1 Bench St", "city": "Pune", "pincode": "411001", "phone": "9000000000"}
+
+
+def connect():
+    db = sqlite3.connect(urmart.DB_PATH, isolation_level=None, timeout=30,
+                         check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def setup(users, stock, coupon_uses):
+    """Fresh buyers, each with one unit of PRODUCT in the cart."""
+    db  = connect()
+    now = urmart._now()
+    db.execute("BEGIN")
+    db.execute("UPDATE products SET stock=? WHERE id=?", (stock, PRODUCT))
+    db.execute("DELETE FROM coupons WHERE code=?", (COUPON,))
+    db.execute("INSERT INTO coupons VALUES (?,?,?,?,?,?,?,?,?)",
+               ("bench", COUPON, "flat", 1, 0, coupon_uses, 0, None, 1))
+    uids = []
+    for _ in range(users):
+        uid = "bench-" + secrets.token_hex(6)
+        db.execute("""INSERT INTO users (id,name,email,phone,password,role,avatar,created_at)
+                      VALUES (?,?,?,?,?,?,?,?)""",
+                   (uid, "Buyer", f"{uid}@bench.local", "", "x", "customer", "", now))
+        db.execute("INSERT INTO cart VALUES (?,?,?,?,?)", (urmart._id(), uid, PRODUCT, 1, now))
+        uids.append(uid)
+    db.execute("COMMIT")
+    db.close()
+    urmart.catalog_cache.clear()
+    return uids
+
+
+def legacy_checkout(db, uid):
+    """The pre-transaction place_order(): check in Python, then auto-commit each write."""
+    items = db.execute("""SELECT c.qty, p.id as product_id, p.name, p.emoji, p.weight, p.price, p.stock
+                          FROM cart c JOIN products p ON c.product_id=p.id
+                          WHERE c.user_id=?""", (uid,)).fetchall()
+    if not items:
+        return 400
+    for item in items:
+        if item["qty"] > item["stock"]:
+            return 400
+    subtotal = sum(i["price"] * i["qty"] for i in items)
+    c = db.execute("SELECT * FROM coupons WHERE code=? AND is_active=1", (COUPON,)).fetchone()
+    if c:
+        db.execute("UPDATE coupons SET used_count=used_count+1 WHERE id=?", (c["id"],))
+    oid = "ORD" + secrets.token_hex(4).upper()
+    db.execute("INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+               (oid, uid, ADDRESS["line1"], ADDRESS["city"], ADDRESS["pincode"], ADDRESS["phone"],
+                subtotal, 0, 0, subtotal, "cod", "pending", "confirmed", "", urmart._now(), urmart._now()))
+    for item in items:
+        db.execute("INSERT INTO order_items VALUES (?,?,?,?,?,?,?,?)",
+                   (urmart._id(), oid, item["product_id"], item["name"], item["emoji"],
+                    item["weight"], item["price"], item["qty"]))
+        db.execute("UPDATE products SET stock=stock-? WHERE id=?", (item["qty"], item["product_id"]))
+    db.execute("DELETE FROM cart WHERE user_id=?", (uid,))
+    return 201
+
+
+def run(label, uids, concurrency, stock, coupon_uses, checkout):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        codes = list(ex.map(checkout, uids))
+    elapsed = time.perf_counter() - start
+
+    db = connect()
+    left = db.execute("SELECT stock FROM products WHERE id=?", (PRODUCT,)).fetchone()[0]
+    used = db.execute("SELECT used_count FROM coupons WHERE code=?", (COUPON,)).fetchone()[0]
+    sold = db.execute("SELECT COALESCE(SUM(qty),0) FROM order_items oi JOIN orders o ON o.id=oi.order_id "
+                      "WHERE oi.product_id=? AND o.user_id IN (%s)" % ",".join("?" * len(uids)),
+                      (PRODUCT, *uids)).fetchone()[0]
+    db.close()
+
+    placed = codes.count(201)
+    sound  = sold == stock - left and left >= 0 and sold <= stock and used <= coupon_uses
+    print(f"  {label:<8} {placed:>6} {len(codes) - placed:>8} {sold:>5} {left:>6} {used:>5}"
+          f" {placed / elapsed:>11.1f}   {'ok' if sound else 'OVERSOLD'}")
+    return sound
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-u", type=int, default=60, help="buyers per run")
+    ap.add_argument("-c", type=int, default=12, help="concurrent checkouts")
+    ap.add_argument("--stock", type=int, default=25, help="units of the contested product")
+    ap.add_argument("--coupon-uses", type=int, default=10, help="max_uses of the contested coupon")
+    args = ap.parse_args()
+
+    local = threading.local()
+
+    def new_checkout(uid):
+        with urmart.app.app_context():
+            try:
+                urmart.checkout(uid, ADDRESS, "cod", COUPON, "")
+            except urmart.CheckoutError as e:
+                if "Coupon" not in str(e):
+                    return e.code
+                # coupon exhausted: retry without it, as the storefront would
+                try:
+                    urmart.checkout(uid, ADDRESS, "cod", "", "")
+                except urmart.CheckoutError as e:
+                    return e.code
+            except urmart.ServerBusy:
+                return 503
+        return 201
+
+    def old_checkout(uid):
+        if not hasattr(local, "db"):
+            local.db = connect()
+        try:
+            return legacy_checkout(local.db, uid)
+        except sqlite3.OperationalError:
+            return 503
+
+    print(f"\nCheckout storm: {args.u} buyers, {args.c} concurrent, "
+          f"{args.stock} units, coupon capped at {args.coupon_uses}\n")
+    print(f"  {'pipeline':<8} {'placed':>6} {'rejected':>8} {'sold':>5} {'stock':>6} {'coupon':>5}"
+          f" {'orders/s':>11}   invariant")
+    uids = setup(args.u, args.stock, args.coupon_uses)
+    legacy = run("legacy", uids, args.c, args.stock, args.coupon_uses, old_checkout)
+    uids = setup(args.u, args.stock, args.coupon_uses)
+    atomic = run("atomic", uids, args.c, args.stock, args.coupon_uses, new_checkout)
+
+    # Uncontended throughput: plenty of stock, no coupon cap to hit
+    print()
+    uids = setup(args.u, args.u * 2, args.u * 2)
+    run("legacy", uids, args.c, args.u * 2, args.u * 2, old_checkout)
+    uids = setup(args.u, args.u * 2, args.u * 2)
+    run("atomic", uids, args.c, args.u * 2, args.u * 2, new_checkout)
+    print()
+
+    if not atomic:
+        sys.exit("atomic checkout oversold")
+    if legacy:
+        print("  (legacy happened not to oversell this run; raise -c or -u to provoke it)\n")
+
+
+if __name__ == "__main__":
+    main()
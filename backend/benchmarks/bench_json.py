@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Product grid payload: full rows vs ?fields= projection, stdlib JSON vs orjson.
+
+    python benchmarks/bench_json.py [-n 2000]
+
+Times GET /api/products?per_page=50 end to end through the Flask test client
+and, separately, encoding that response's data alone (best of 5 runs each).
+Generated products get a seed-catalogue-sized description so `description`
+weighs what it does in production. Runs against a throwaway database;
+nothing touches urmart.db.
+"""
+
+import argparse, os, sqlite3, sys, tempfile, time
+
+os.environ.setdefault("URMART_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+import app as urmart
+
+urmart.seed_db()
+
+# What a product card renders (frontend/lib/api.ts CARD_FIELDS)
+CARD_FIELDS = "name,emoji,brand,weight,price,mrp,discount,stock,rating,review_count"
+
+
+def setup(products):
+    db = sqlite3.connect(urmart.DB_PATH, isolation_level=None)
+    if db.execute("SELECT COUNT(*) FROM products").fetchone()[0] < products:
+        urmart.generate_data(db, users=10, products=products, orders=0, reviews=0, seed=7, log=lambda *_: None)
+        avg = db.execute("SELECT CAST(AVG(LENGTH(description)) AS INT) FROM products"
+                         " WHERE description != ''").fetchone()[0]
+        db.execute("UPDATE products SET description=? WHERE description=''", ("Fresh and tasty. " * (avg // 17),))
+    db.close()
+
+
+def bench(fn, n, repeat=5):
+    """Best of `repeat` runs, in µs per call."""
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(n // repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / (n // repeat))
+    return best * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", type=int, default=2000, help="requests per case")
+    n = ap.parse_args().n
+
+    setup(200)
+    client    = urmart.app.test_client()
+    providers = [("stdlib", DefaultJSONProvider(urmart.app))]
+    if urmart.orjson is not None:
+        providers.append(("orjson", urmart.OrjsonProvider(urmart.app)))
+    else:
+        print("\n  (orjson not installed: pip install orjson to compare)")
+
+    print(f"\nGET /api/products?per_page=50, {n} requests per case\n")
+    print(f"  {'fields':<8} {'encoder':<8} {'bytes':>7} {'request µs':>11} {'encode µs':>10}")
+    for label, fields in (("all", ""), ("card", CARD_FIELDS)):
+        url = "/api/products?per_page=50&count=none" + (f"&fields={fields}" if fields else "")
+        for name, provider in providers:
+            urmart.app.json = provider
+            body = client.get(url).get_data()
+            data = client.get(url).get_json()
+            request_us = bench(lambda: client.get(url), n)
+            encode_us  = bench(lambda: provider.dumps(data), n * 5)
+            print(f"  {label:<8} {name:<8} {len(body):>7} {request_us:>11.1f} {encode_us:>10.1f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
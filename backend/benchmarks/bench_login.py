@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Login throughput under concurrency: scrypt inline vs in the KDF process pool.
+
+    python benchmarks/bench_login.py [-c 16] [-n 96] [--workers 2]
+
+While the login storm runs, a probe thread keeps requesting /api/categories
+so the cost of KDF work on unrelated requests is visible too. Runs against
+a throwaway database; nothing touches urmart.db.
+"""
+
+import argparse, os, statistics, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("URMART_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as urmart
+
+urmart.seed_db()
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+
+def storm(concurrency, n):
+    creds  = {"email": "admin@urmart.com", "password": "admin123"}
+    local  = threading.local()
+    probes, stop = [], threading.Event()
+
+    def login(_):
+        if not hasattr(local, "client"):
+            local.client = urmart.app.test_client()
+        start = time.perf_counter()
+        r = local.client.post("/api/auth/login", json=creds)
+        return time.perf_counter() - start, r.status_code
+
+    def probe():
+        client = urmart.app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/api/categories")
+            probes.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    prober = threading.Thread(target=probe)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        results = list(ex.map(login, range(n)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    times = [t for t, status in results if status == 200]
+    return {
+        "ok":       len(times),
+        "busy":     sum(1 for _, status in results if status == 503),
+        "rps":      len(times) / elapsed,
+        "p50":      pct(times, 0.50) if times else 0.0,
+        "p95":      pct(times, 0.95) if times else 0.0,
+        "probe50":  pct(probes, 0.50) if probes else 0.0,
+        "probe95":  pct(probes, 0.95) if probes else 0.0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-c", type=int, default=16, help="concurrent clients")
+    ap.add_argument("-n", type=int, default=96, help="logins per mode")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="KDF processes")
+    ap.add_argument("--max-queue", type=int, default=64, help="KDF queue limit")
+    args = ap.parse_args()
+
+    print(f"\nLogin storm: {args.n} logins, {args.c} concurrent, "
+          f"{args.workers} KDF worker(s), {os.cpu_count()} CPU(s)\n")
+    print(f"  {'mode':<8} {'ok':>4} {'503':>4} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8}"
+          f"   {'probe p50':>9} {'probe p95':>9}")
+    for mode in ("inline", "process"):
+        urmart.kdf_pool = urmart.KDFPool(mode, args.workers, args.max_queue)
+        if mode == "process":
+            urmart.kdf_pool.run(pow, 2, 2)  # start the workers outside the timed run
+        r = storm(args.c, args.n)
+        print(f"  {mode:<8} {r['ok']:>4} {r['busy']:>4} {r['rps']:>9.1f} {r['p50']:>8.1f} {r['p95']:>8.1f}"
+              f"   {r['probe50']:>9.2f} {r['probe95']:>9.2f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
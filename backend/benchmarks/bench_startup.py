@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cold start: time from a fresh Python process to its first served request.
+
+    python benchmarks/bench_startup.py [-r 5] [--server]
+
+Each run is a new interpreter, as when an autoscaler adds a worker. Reported
+separately: third-party imports, importing app.py (init_db() included), and the
+first request. "first boot" runs against a new database (migrations plus seed);
+"warm db" against one that is already current, which is the common case.
+--server also times `start.py --workers 1` until it answers over HTTP.
+Runs against throwaway databases; nothing touches urmart.db.
+"""
+
+import argparse, json, os, socket, statistics, subprocess, sys, tempfile, time, urllib.request
+
+HERE    = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(HERE)
+ROOT    = os.path.dirname(BACKEND)
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import flask, jwt, click
+t1 = time.perf_counter()
+import app
+t2 = time.perf_counter()
+if "--seed" in sys.argv:
+    app.seed_db()
+t3 = time.perf_counter()
+r = app.app.test_client().get("/api/categories")
+t4 = time.perf_counter()
+assert r.status_code == 200, r.status_code
+print(json.dumps({"deps": t1 - t0, "app": t2 - t1, "seed": t3 - t2, "request": t4 - t3}))
+"""
+
+
+def child(db, seed):
+    env = dict(os.environ, URMART_DB=db)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD] + (["--seed"] if seed else []),
+                         cwd=BACKEND, env=env, capture_output=True, text=True, check=True).stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+def server(db):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env   = dict(os.environ, URMART_DB=db)
+    start = time.perf_counter()
+    proc  = subprocess.Popen([sys.executable, os.path.join(ROOT, "start.py"), "--workers", "1",
+                              "--bind", f"127.0.0.1:{port}"], env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/categories", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                if proc.poll() is not None:
+                    raise SystemExit("start.py exited before serving")
+                time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def report(label, runs):
+    keys = ("deps", "app", "seed", "request", "total")
+    med  = {k: statistics.median(r[k] for r in runs) * 1000 for k in keys}
+    print(f"  {label:<12}" + "".join(f" {med[k]:>9.1f}" for k in keys))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-r", type=int, default=5, help="runs per case (median reported)")
+    ap.add_argument("--server", action="store_true", help="also time start.py to first HTTP response")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    print(f"\nCold start, median of {args.r} fresh processes (ms)\n")
+    print(f"  {'case':<12} {'deps':>9} {'app.py':>9} {'seed':>9} {'1st req':>9} {'total':>9}")
+    fresh = [child(os.path.join(tmp, f"fresh{i}.db"), seed=True) for i in range(args.r)]
+    report("first boot", fresh)
+    warm_db = os.path.join(tmp, "fresh0.db")
+    report("warm db", [child(warm_db, seed=False) for _ in range(args.r)])
+
+    if args.server:
+        times = [server(warm_db) for _ in range(args.r)]
+        print(f"\n  start.py --workers 1 to first HTTP 200: {statistics.median(times) * 1000:.1f} ms")
+    print()
+
+
+if __name__ == "__main__":
+    main()
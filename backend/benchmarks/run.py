@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Mixed-traffic benchmark for the hot API paths.
+
+    python benchmarks/run.py                          # in-process, Flask test client
+    python benchmarks/run.py --url http://localhost:5000 -c 16 -n 5000
+    python benchmarks/run.py --save main              # write baselines/main.json
+    python benchmarks/run.py --compare main           # diff against it, exit 1 on regression
+
+Traffic is a weighted mix of browse, search, product detail, home lists, cart
+changes, checkout and the admin dashboard. Each route reports p50/p95/p99
+latency, throughput and SQL statements per request (X-SQL-Queries; in --url
+mode start the server with SQL_STATS=1 to get them).
+
+In-process runs use a throwaway database. --url runs register shoppers and
+place real orders, so point them at a disposable server.
+"""
+
+import argparse, json, os, platform, random, sqlite3, subprocess, sys, tempfile, threading, time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+HERE      = os.path.dirname(os.path.abspath(__file__))
+BASELINES = os.path.join(HERE, "baselines")
+ADDRESS   = {"line1": "1 Bench St", "city": "Pune", "pincode": "411001", "phone": "9000000000"}
+
+# (weight, scenario) — see Session for what each one requests
+MIX = [
+    (30, "browse"),
+    (15, "search"),
+    (20, "product"),
+    (8,  "home"),
+    (15, "cart"),
+    (5,  "checkout"),
+    (7,  "admin"),
+]
+
+
+# ─── Transports ───────────────────────────────────────────────────────────────
+
+class TestClientTransport:
+    """Calls the app in-process; measures the framework and SQL, not the network."""
+
+    def __init__(self):
+        os.environ.setdefault("URMART_DB", os.path.join(tempfile.mkdtemp(), "bench.db"))
+        sys.path.insert(0, os.path.dirname(HERE))
+        import app as urmart
+        urmart.seed_db()
+        urmart.SQL_STATS = True
+        self.app   = urmart.app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, token=None):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        r = self.local.client.open(path, method=method, json=body, headers=headers)
+        return r.status_code, r.get_json(silent=True), r.headers.get("X-SQL-Queries")
+
+
+class HTTPTransport:
+    """Talks to a running server over keep-alive connections, one per thread."""
+
+    def __init__(self, url):
+        from urllib.parse import urlsplit
+        u = urlsplit(url)
+        self.host, self.port = u.hostname, u.port or 80
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, token=None):
+        import http.client
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        data = json.dumps(body).encode() if body is not None else None
+        for attempt in (1, 2):
+            conn = getattr(self.local, "conn", None) or http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.local.conn = conn
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                r   = conn.getresponse()
+                raw = r.read()
+                if r.getheader("Connection", "").lower() == "close" or r.version == 10:
+                    conn.close()
+                    self.local.conn = None
+                try:
+                    payload = json.loads(raw) if raw else None
+                except ValueError:
+                    payload = None
+                return r.status, payload, r.getheader("X-SQL-Queries")
+            except (ConnectionError, http.client.HTTPException):
+                conn.close()
+                self.local.conn = None
+                if attempt == 2:
+                    raise
+
+
+# ─── Traffic ──────────────────────────────────────────────────────────────────
+
+class Session:
+    """One simulated shopper: a token, an RNG, and the scenarios it can run."""
+
+    def __init__(self, bench, token, rng):
+        self.bench = bench
+        self.token = token
+        self.rng   = rng
+
+    def call(self, label, method, path, body=None, token=None):
+        return self.bench.call(label, method, path, body, token)
+
+    def browse(self):
+        b = self.bench
+        if self.rng.random() < 0.5:
+            self.call("GET /api/products", "GET", f"/api/products?page={self.rng.randint(1, 3)}&per_page=20")
+        else:
+            cat  = self.rng.choice(b.categories)
+            sort = self.rng.choice(["", "&sort=price_asc", "&sort=rating", "&sort=discount"])
+            self.call("GET /api/products?category", "GET", f"/api/products?category={cat}{sort}")
+
+    def search(self):
+        term = self.rng.choice(self.bench.terms)
+        self.call("GET /api/products?search", "GET", f"/api/products?search={term}&sort=relevance")
+
+    def product(self):
+        self.call("GET /api/products/<pid>", "GET", f"/api/products/{self.rng.choice(self.bench.products)}")
+
+    def home(self):
+        self.call("GET /api/categories", "GET", "/api/categories")
+        self.call("GET /api/products/featured", "GET", "/api/products/featured")
+        self.call("GET /api/products/trending", "GET", "/api/products/trending")
+
+    def cart(self):
+        pid = self.rng.choice(self.bench.products)
+        self.call("POST /api/cart", "POST", "/api/cart", {"product_id": pid, "qty": 1}, self.token)
+        _, body = self.call("GET /api/cart", "GET", "/api/cart", token=self.token)
+        items = ((body or {}).get("data") or {}).get("items") or []
+        if items:
+            item = self.rng.choice(items)
+            if self.rng.random() < 0.5:
+                self.call("PUT /api/cart/<id>", "PUT", f"/api/cart/{item['id']}", {"qty": 2}, self.token)
+            else:
+                self.call("DELETE /api/cart/<id>", "DELETE", f"/api/cart/{item['id']}", token=self.token)
+
+    def checkout(self):
+        pid = self.rng.choice(self.bench.products)
+        self.call("POST /api/cart", "POST", "/api/cart", {"product_id": pid, "qty": 1}, self.token)
+        self.call("POST /api/orders", "POST", "/api/orders", {"address": ADDRESS}, self.token)
+        self.call("GET /api/orders", "GET", "/api/orders", token=self.token)
+
+    def admin(self):
+        t = self.bench.admin_token
+        self.call("GET /api/admin/stats", "GET", "/api/admin/stats", token=t)
+        self.call("GET /api/admin/orders", "GET", "/api/admin/orders?limit=50", token=t)
+
+
+class Bench:
+    def __init__(self, transport, seed):
+        self.t       = transport
+        self.seed    = seed
+        self.lock    = threading.Lock()
+        self.samples = defaultdict(list)   # label -> [seconds]
+        self.sql     = defaultdict(list)   # label -> [statements]
+        self.errors  = defaultdict(int)
+        self.record  = True
+
+    def call(self, label, method, path, body=None, token=None):
+        start = time.perf_counter()
+        status, payload, sql = self.t.request(method, path, body, token)
+        took = time.perf_counter() - start
+        if self.record:
+            with self.lock:
+                self.samples[label].append(took)
+                if sql is not None:
+                    self.sql[label].append(int(sql))
+                if status >= 400 and not (status == 409 and label == "POST /api/orders"):
+                    self.errors[label] += 1
+        return status, payload
+
+    def setup(self, shoppers, admin_email, admin_password):
+        rng = random.Random(self.seed)
+        _, body, _ = self.t.request("POST", "/api/auth/login", {"email": admin_email, "password": admin_password})
+        if not body or not body.get("success"):
+            sys.exit(f"[!] admin login failed: {body}")
+        self.admin_token = body["data"]["token"]
+
+        # plenty of stock so checkout measures the happy path
+        _, body, _ = self.t.request("GET", "/api/admin/products", token=self.admin_token)
+        for p in body["data"]:
+            if p["stock"] < 100000:
+                self.t.request("PUT", f"/api/admin/products/{p['id']}", {"stock": 100000}, self.admin_token)
+        products = [p for p in body["data"] if p.get("is_active", 1)]
+        self.products   = [p["id"] for p in products]
+        self.terms      = sorted({w.lower() for p in products for w in p["name"].split() if len(w) > 3})
+        _, body, _ = self.t.request("GET", "/api/categories")
+        self.categories = [c["id"] for c in body["data"]]
+
+        run_id = f"{int(time.time())}{rng.randrange(10**6)}"
+        self.sessions = []
+        for i in range(shoppers):
+            _, body, _ = self.t.request("POST", "/api/auth/register", {
+                "name": f"Bench {i}", "email": f"bench-{run_id}-{i}@example.com",
+                "password": "bench-pass-123", "phone": "9000000000"})
+            self.sessions.append(Session(self, body["data"]["token"], random.Random(self.seed + i)))
+
+    def run(self, n, concurrency, warmup):
+        scenarios = [name for _, name in MIX]
+        weights   = [w for w, _ in MIX]
+
+        def worker(i):
+            s    = self.sessions[i % len(self.sessions)]
+            pick = random.Random(self.seed * 7919 + i)
+            for _ in range(n // concurrency + (i < n % concurrency)):
+                getattr(s, pick.choices(scenarios, weights)[0])()
+
+        if warmup:
+            self.record = False
+            for s in self.sessions:
+                for name in scenarios:
+                    getattr(s, name)()
+            self.record = True
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as ex:
+            list(ex.map(worker, range(concurrency)))
+        return time.perf_counter() - start
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000 if samples else 0.0
+
+
+def summarize(bench, elapsed):
+    routes = {}
+    for label, samples in sorted(bench.samples.items()):
+        sql = bench.sql.get(label)
+        routes[label] = {
+            "count":  len(samples),
+            "errors": bench.errors.get(label, 0),
+            "p50":    round(pct(samples, 0.50), 3),
+            "p95":    round(pct(samples, 0.95), 3),
+            "p99":    round(pct(samples, 0.99), 3),
+            "rps":    round(len(samples) / elapsed, 1),
+            "sql":    round(sum(sql) / len(sql), 2) if sql else None,
+        }
+    total = sum(r["count"] for r in routes.values())
+    return {"elapsed": round(elapsed, 3), "requests": total, "rps": round(total / elapsed, 1),
+            "routes": routes}
+
+
+def print_report(result):
+    print(f"\n  {'route':<30} {'n':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f" {'req/s':>8} {'sql':>5}")
+    for label, r in result["routes"].items():
+        sql = "-" if r["sql"] is None else f"{r['sql']:g}"
+        print(f"  {label:<30} {r['count']:>6} {r['errors']:>4} {r['p50']:>8.2f} {r['p95']:>8.2f}"
+              f" {r['p99']:>8.2f} {r['rps']:>8.1f} {sql:>5}")
+    print(f"\n  {result['requests']} requests in {result['elapsed']:.2f}s = {result['rps']:.1f} req/s\n")
+
+
+def compare(result, baseline, threshold, floor):
+    """Flag routes whose p95 grew by more than threshold% (and floor ms) or that issue more SQL."""
+    print(f"  vs baseline {baseline['meta'].get('name')} ({baseline['meta'].get('git', '?')}, "
+          f"{baseline['meta'].get('mode')})\n")
+    print(f"  {'route':<30} {'p50 Δ':>8} {'p95 Δ':>8} {'sql':>11}")
+    regressions = []
+    for label, r in result["routes"].items():
+        old = baseline["routes"].get(label)
+        if not old:
+            print(f"  {label:<30} {'new':>8}")
+            continue
+        d50 = (r["p50"] - old["p50"]) / old["p50"] * 100 if old["p50"] else 0.0
+        d95 = (r["p95"] - old["p95"]) / old["p95"] * 100 if old["p95"] else 0.0
+        sql = "" if r["sql"] is None or old["sql"] is None else f"{old['sql']:g} → {r['sql']:g}"
+        slow = d95 > threshold and r["p95"] - old["p95"] > floor
+        more = r["sql"] is not None and old["sql"] is not None and r["sql"] > old["sql"] + 0.01
+        flag = "  REGRESSION" if slow or more else ""
+        print(f"  {label:<30} {d50:>+7.1f}% {d95:>+7.1f}% {sql:>11}{flag}")
+        if flag:
+            regressions.append(label)
+    print()
+    return regressions
+
+
+def git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "?"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", help="benchmark a running server instead of the in-process test client")
+    ap.add_argument("-n", type=int, default=2000, help="scenarios to run")
+    ap.add_argument("-c", type=int, default=1, help="concurrent shoppers")
+    ap.add_argument("--shoppers", type=int, default=8, help="registered users to spread traffic over")
+    ap.add_argument("--seed", type=int, default=1, help="RNG seed for the traffic mix")
+    ap.add_argument("--no-warmup", action="store_true", help="skip one untimed pass of every scenario")
+    ap.add_argument("--admin", default="admin@urmart.com:admin123", help="EMAIL:PASSWORD of an admin")
+    ap.add_argument("--save", metavar="NAME", help="save results as benchmarks/baselines/NAME.json")
+    ap.add_argument("--compare", metavar="NAME", help="compare with a saved baseline (name or path)")
+    ap.add_argument("--threshold", type=float, default=15, help="allowed p95 slowdown in %%")
+    ap.add_argument("--floor", type=float, default=0.5, help="ignore p95 changes smaller than this many ms")
+    ap.add_argument("--json", action="store_true", help="print the raw result as JSON")
+    args = ap.parse_args()
+
+    transport = HTTPTransport(args.url) if args.url else TestClientTransport()
+    bench     = Bench(transport, args.seed)
+    email, _, password = args.admin.partition(":")
+    bench.setup(max(args.shoppers, args.c), email, password)
+
+    mode = args.url or "test-client"
+    print(f"\nMixed traffic: {args.n} scenarios, {args.c} concurrent, seed {args.seed}, {mode}")
+    elapsed = bench.run(args.n, args.c, warmup=not args.no_warmup)
+    result  = summarize(bench, elapsed)
+    result["meta"] = {"name": args.save, "mode": mode, "n": args.n, "c": args.c, "seed": args.seed,
+                      "git": git_rev(), "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                      "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                      "machine": f"{platform.machine()}, {os.cpu_count()} cpus"}
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+    if args.save:
+        os.makedirs(BASELINES, exist_ok=True)
+        path = os.path.join(BASELINES, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"  baseline saved to {os.path.relpath(path)}\n")
+
+    if args.compare:
+        path = args.compare if args.compare.endswith(".json") else os.path.join(BASELINES, f"{args.compare}.json")
+        with open(path) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("mode") != result["meta"]["mode"]:
+            print("  [!] baseline was recorded in a different mode; numbers are not comparable\n")
+        if compare(result, baseline, args.threshold, args.floor):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Tests run on a throwaway database; nothing touches urmart.db.
+
+app reads its configuration and brings the schema up to date when it is
+first imported, so the environment is set here, before any test imports it.
+
+    cd backend && pip install -r requirements-dev.txt && python -m pytest
+"""
+
+import os, sys, tempfile
+
+import pytest
+
+TMP = tempfile.mkdtemp(prefix="urmart-tests-")
+os.environ["URMART_DB"]    = os.path.join(TMP, "test.db")
+os.environ["CART_JOURNAL"] = os.path.join(TMP, "cart_journal")
+os.environ["SLOW_QUERY_MS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def urmart():
+    """The app module, on the test database, with the demo data loaded."""
+    import app
+    app.seed_db()
+    return app
+
+
+@pytest.fixture
+def client(urmart):
+    return urmart.app.test_client()
+
+
+@pytest.fixture
+def admin(urmart):
+    return {"Authorization": "Bearer " + urmart.make_token("admin", "admin")}
@@ -0,0 +1,21 @@
+"""Every route answers the same through asgi.py as through the Flask app."""
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def parity(urmart):
+    import asgi
+    return asgi.parity_results()
+
+
+def test_responses_match(parity):
+    results, _ = parity
+    diffs = [f"{label}: wsgi {ws} {wb!r} vs asgi {as_} {ab!r}"
+             for label, ws, as_, wb, ab, same in results if not same]
+    assert not diffs, "\n".join(diffs)
+
+
+def test_every_route_exercised(parity):
+    _, missing = parity
+    assert not missing, f"routes not exercised: {', '.join(sorted(missing))}"
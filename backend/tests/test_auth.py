@@ -0,0 +1,37 @@
+"""A password change revokes older tokens at once, even ones issued the same second."""
+
+import secrets
+
+
+def register(client):
+    email = f"auth-{secrets.token_hex(6)}@test.local"
+    r = client.post("/api/auth/register", json={"name": "Auth", "email": email, "password": "secret1"})
+    assert r.status_code == 200
+    return email, r.get_json()["data"]["token"]
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_change_password_revokes_same_second_tokens(client):
+    email, first = register(client)
+    second = client.post("/api/auth/login", json={"email": email, "password": "secret1"}).get_json()["data"]["token"]
+    assert client.get("/api/auth/me", headers=bearer(second)).status_code == 200   # warm the token cache
+
+    r = client.put("/api/users/change-password", headers=bearer(first),
+                   json={"old_password": "secret1", "new_password": "secret2"})
+    assert r.status_code == 200
+    fresh = r.get_json()["data"]["token"]
+
+    assert client.get("/api/auth/me", headers=bearer(first)).status_code == 401
+    assert client.get("/api/auth/me", headers=bearer(second)).status_code == 401
+    assert client.get("/api/auth/me", headers=bearer(fresh)).status_code == 200
+
+
+def test_login_after_revocation_is_accepted(client):
+    email, first = register(client)
+    client.put("/api/users/change-password", headers=bearer(first),
+               json={"old_password": "secret1", "new_password": "secret2"})
+    token = client.post("/api/auth/login", json={"email": email, "password": "secret2"}).get_json()["data"]["token"]
+    assert client.get("/api/auth/me", headers=bearer(token)).status_code == 200
@@ -0,0 +1,76 @@
+"""The write-behind cart store sets bad carts and journals aside instead of retrying them forever."""
+
+import json, secrets, sqlite3, subprocess, sys
+
+import pytest
+
+
+@pytest.fixture
+def store(urmart, tmp_path):
+    s = urmart.MemoryCartStore(urmart.DB_PATH, flush_interval=3600, journal=str(tmp_path / "cart_journal"))
+    yield s
+    s.close()
+
+
+def new_user(urmart):
+    uid = "cart-" + secrets.token_hex(6)
+    db  = sqlite3.connect(urmart.DB_PATH)
+    db.execute("INSERT INTO users (id,name,email,phone,password,role,avatar,created_at) VALUES (?,?,?,?,?,?,?,?)",
+               (uid, "Cart", f"{uid}@test.local", "", "x", "user", "", urmart._now()))
+    db.commit()
+    db.close()
+    return uid
+
+
+def table_cart(urmart, uid):
+    db = sqlite3.connect(urmart.DB_PATH)
+    rows = db.execute("SELECT product_id, qty FROM cart WHERE user_id=?", (uid,)).fetchall()
+    db.close()
+    return rows
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", ""])
+    proc.wait()
+    return proc.pid
+
+
+def test_flush_sets_aside_a_cart_the_table_refuses(urmart, store):
+    good, bad = new_user(urmart), new_user(urmart)
+    store.add(good, "p1", 2, 99)
+    store.add(bad, "no-such-product", 1, 99)
+
+    assert store.flush() == 1
+    assert table_cart(urmart, good) == [("p1", 2)]
+    stats = store.stats()
+    assert (stats["dirty"], stats["rejected_carts"]) == (0, 1)
+    with open(store.journal + ".rejected.ndjson") as f:
+        assert [json.loads(line)[0] for line in f] == [bad]
+    assert store.flush() == 0   # not retried
+
+
+def test_recovery_writes_good_carts_and_rejects_bad_ones(urmart, store):
+    good, bad = new_user(urmart), new_user(urmart)
+    path = f"{store.journal}.{dead_pid()}.ndjson"
+    with open(path, "w") as f:
+        f.write(json.dumps([good, [["p2", "line-" + secrets.token_hex(4), 3, urmart._now()]]]) + "\n")
+        f.write(json.dumps([bad, [["no-such-product", "line-" + secrets.token_hex(4), 1, urmart._now()]]]) + "\n")
+
+    store.start()
+    assert table_cart(urmart, good) == [("p2", 3)]
+    assert store.stats()["recovered_carts"] == 1
+    assert store.stats()["rejected_carts"] == 1
+
+
+def test_unreadable_journal_is_moved_aside_and_carts_still_work(urmart, store):
+    uid  = new_user(urmart)
+    path = f"{store.journal}.{dead_pid()}.ndjson"
+    with open(path, "w") as f:
+        f.write(json.dumps([uid, [["p3"]]]) + "\n")   # a line of the wrong shape
+
+    store.add(uid, "p3", 1, 99)
+    assert [l["product_id"] for l in store.lines(uid)] == ["p3"]
+    with open(path + ".failed") as f:
+        assert f.read()
+    assert store._thread.is_alive()
+    assert store.flush() == 1
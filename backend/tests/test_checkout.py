@@ -0,0 +1,58 @@
+"""Concurrent checkouts never sell more than the stock or the coupon's uses."""
+
+import secrets, sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+PRODUCT = "p7"
+COUPON  = "RACECAP"
+ADDRESS = {"line1": "1 Race St", "city": "Pune", "pincode": "411001", "phone": "9000000000"}
+
+
+def setup(urmart, buyers, stock, max_uses):
+    """`buyers` new users with one unit of PRODUCT each in their cart; their tokens."""
+    db  = sqlite3.connect(urmart.DB_PATH, isolation_level=None)
+    now = urmart._now()
+    db.execute("BEGIN")
+    db.execute("UPDATE products SET stock=? WHERE id=?", (stock, PRODUCT))
+    db.execute("DELETE FROM coupons WHERE code=?", (COUPON,))
+    db.execute("INSERT INTO coupons VALUES (?,?,?,?,?,?,?,?,?)", ("race", COUPON, "flat", 1, 0, max_uses, 0, None, 1))
+    tokens = []
+    for _ in range(buyers):
+        uid = "race-" + secrets.token_hex(6)
+        db.execute("INSERT INTO users (id,name,email,phone,password,role,avatar,created_at) VALUES (?,?,?,?,?,?,?,?)",
+                   (uid, "Buyer", f"{uid}@test.local", "", "x", "customer", "", now))
+        db.execute("INSERT INTO cart VALUES (?,?,?,?,?)", (urmart._id(), uid, PRODUCT, 1, now))
+        tokens.append(urmart.make_token(uid, "customer"))
+    db.execute("COMMIT")
+    db.close()
+    urmart.catalog_cache.clear()
+    return tokens
+
+
+def test_no_oversell(urmart, client):
+    stock, max_uses = 10, 4
+    tokens = setup(urmart, 40, stock, max_uses)
+
+    def buy(token):
+        headers = {"Authorization": f"Bearer {token}"}
+        r = client.post("/api/orders", json={"address": ADDRESS, "coupon_code": COUPON}, headers=headers)
+        if r.status_code == 409 and "Coupon" in r.get_json()["message"]:
+            # out of coupon uses: check out without it, as the storefront would
+            r = client.post("/api/orders", json={"address": ADDRESS}, headers=headers)
+        return r.status_code
+
+    with ThreadPoolExecutor(12) as pool:
+        codes = list(pool.map(buy, tokens))
+
+    db = sqlite3.connect(urmart.DB_PATH)
+    stock_after = db.execute("SELECT stock FROM products WHERE id=?", (PRODUCT,)).fetchone()[0]
+    used        = db.execute("SELECT used_count FROM coupons WHERE code=?", (COUPON,)).fetchone()[0]
+    sold        = db.execute("SELECT COALESCE(SUM(oi.qty), 0) FROM order_items oi JOIN orders o ON o.id=oi.order_id"
+                             " WHERE oi.product_id=? AND o.user_id LIKE 'race-%'", (PRODUCT,)).fetchone()[0]
+    db.close()
+
+    assert set(codes) <= {200, 409}, codes
+    assert sold == stock - stock_after
+    assert stock_after >= 0
+    assert used <= max_uses
+    assert codes.count(200) == sold
@@ -0,0 +1,18 @@
+"""Malformed paging parameters are a 400, not a 500."""
+
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/api/orders", "/api/admin/orders"])
+def test_order_limit_must_be_an_integer(client, admin, path):
+    r = client.get(path + "?limit=abc", headers=admin)
+    assert r.status_code == 400
+    assert r.get_json()["message"] == "limit must be an integer"
+    assert client.get(path + "?limit=5000", headers=admin).status_code == 200   # clamped
+
+
+def test_review_per_page_must_be_an_integer(client):
+    r = client.get("/api/products/p1/reviews?per_page=ten")
+    assert r.status_code == 400
+    assert r.get_json()["message"] == "per_page must be an integer"
+    assert client.get("/api/products/p1/reviews?per_page=0").get_json()["per_page"] == 1   # clamped
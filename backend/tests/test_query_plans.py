@@ -0,0 +1,28 @@
+"""No route query needs a full table scan or a temp b-tree sort on a fresh schema."""
+
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def fresh_db(urmart, tmp_path, monkeypatch):
+    """A database that init_db() has just built from nothing."""
+    path = str(tmp_path / "plans.db")
+    monkeypatch.setattr(urmart, "DB_PATH", path)
+    urmart.init_db()
+    return path
+
+
+def test_route_queries_use_indexes(urmart, fresh_db):
+    failures = [f"{name}: {'; '.join(problems)}"
+                for name, problems in urmart.query_plan_report(fresh_db) if problems]
+    assert not failures, "\n".join(failures)
+
+
+def test_missing_index_is_caught(urmart, fresh_db):
+    db = sqlite3.connect(fresh_db)
+    db.execute("DROP INDEX idx_products_price")
+    db.close()
+    failed = {name for name, problems in urmart.query_plan_report(fresh_db) if problems}
+    assert {"get_products price_asc", "get_products price_desc"} <= failed
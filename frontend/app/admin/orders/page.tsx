@@ -1,7 +1,7 @@
 "use client";
 import { useEffect, useState } from "react";
 import { ChevronDown, Search } from "lucide-react";
-import { api, Order } from "@/lib/api";
+import { api, Order, OrderEvent, OrderPage } from "@/lib/api";
 
 const STATUSES = ["confirmed","packed","out_for_delivery","delivered","cancelled"];
 const STATUS_COLORS: Record<string, string> = {
@@ -19,16 +19,42 @@ export default function AdminOrdersPage() {
   const [loading, setLoading] = useState(true);
   const [expanded, setExpanded] = useState<string | null>(null);
   const [updating, setUpdating] = useState<string | null>(null);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const load = (status?: string) => {
     setLoading(true);
-    api.admin.orders.list(status)
-      .then((r: unknown) => { const res = r as { data: Order[] }; setOrders(res.data); })
+    api.admin.orders.list({ status })
+      .then((r: unknown) => { const res = r as OrderPage; setOrders(res.data); setCursor(res.next_cursor); })
       .finally(() => setLoading(false));
   };
 
+  const loadMore = () => {
+    if (!cursor) return;
+    setLoadingMore(true);
+    api.admin.orders.list({ status: filter || undefined, cursor })
+      .then((r: unknown) => { const res = r as OrderPage; setOrders(prev => [...prev, ...res.data]); setCursor(res.next_cursor); })
+      .finally(() => setLoadingMore(false));
+  };
+
   useEffect(() => { load(filter || undefined); }, [filter]);
 
+  // Live updates: new orders are fetched with the first page, status changes applied in place
+  useEffect(() => {
+    const status = filter || undefined;
+    return api.admin.orders.events((e: OrderEvent) => {
+      if (e.type === "order.status") {
+        setOrders(prev => prev.map(o => o.id === e.order_id ? { ...o, status: e.status, updated_at: e.at } : o));
+        return;
+      }
+      if (status && e.status !== status) return;
+      api.admin.orders.list({ status }).then((r: unknown) => {
+        const res = r as OrderPage;
+        setOrders(prev => [...res.data.filter(o => !prev.some(p => p.id === o.id)), ...prev]);
+      });
+    }, () => load(status));
+  }, [filter]);
+
   const updateStatus = async (oid: string, status: string) => {
     setUpdating(oid);
     try {
@@ -143,6 +169,13 @@ export default function AdminOrdersPage() {
           ))}
         </div>
       )}
+      {cursor && !loading && (
+        <div className="text-center mt-6">
+          <button onClick={loadMore} disabled={loadingMore} className="btn-outline px-6 py-2 text-sm">
+            {loadingMore ? "Loading..." : "Load more orders"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
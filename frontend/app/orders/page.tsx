@@ -3,7 +3,7 @@ import { useEffect, useState } from "react";
 import Link from "next/link";
 import { useRouter, useSearchParams } from "next/navigation";
 import { Package, CheckCircle, Clock, Truck, XCircle, ChevronDown, ChevronUp } from "lucide-react";
-import { api, Order } from "@/lib/api";
+import { api, Order, OrderEvent, OrderPage } from "@/lib/api";
 import { useApp } from "@/lib/context";
 import { Suspense } from "react";
 
@@ -24,14 +24,42 @@ function OrdersContent() {
   const [orders, setOrders] = useState<Order[]>([]);
   const [loading, setLoading] = useState(true);
   const [expanded, setExpanded] = useState<string | null>(successId);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  useEffect(() => {
-    if (!user) { router.push("/auth/login"); return; }
+  const reload = () =>
     api.orders.list()
-      .then((r: unknown) => { const res = r as { data: Order[] }; setOrders(res.data); })
+      .then((r: unknown) => { const res = r as OrderPage; setOrders(res.data); setCursor(res.next_cursor); })
       .finally(() => setLoading(false));
+
+  useEffect(() => {
+    if (!user) { router.push("/auth/login"); return; }
+    reload();
   }, [user, router]);
 
+  // Status changes and orders placed elsewhere arrive as server-sent events
+  useEffect(() => {
+    if (!user) return;
+    return api.orders.events((e: OrderEvent) => {
+      if (e.type === "order.status") {
+        setOrders(prev => prev.map(o => o.id === e.order_id ? { ...o, status: e.status, updated_at: e.at } : o));
+        return;
+      }
+      api.orders.get(e.order_id).then((r: unknown) => {
+        const order = (r as { data: Order }).data;
+        setOrders(prev => prev.some(o => o.id === order.id) ? prev : [order, ...prev]);
+      });
+    }, reload);
+  }, [user]);
+
+  const loadMore = () => {
+    if (!cursor) return;
+    setLoadingMore(true);
+    api.orders.list({ cursor })
+      .then((r: unknown) => { const res = r as OrderPage; setOrders(prev => [...prev, ...res.data]); setCursor(res.next_cursor); })
+      .finally(() => setLoadingMore(false));
+  };
+
   if (!user) return null;
 
   return (
@@ -136,6 +164,13 @@ function OrdersContent() {
           })}
         </div>
       )}
+      {cursor && !loading && (
+        <div className="text-center mt-6">
+          <button onClick={loadMore} disabled={loadingMore} className="btn-outline px-6 py-2 text-sm">
+            {loadingMore ? "Loading..." : "Load more orders"}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -1,32 +1,52 @@
 "use client";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import Link from "next/link";
 import { ArrowRight, Zap, Shield, Leaf } from "lucide-react";
-import { api, Product, Category } from "@/lib/api";
+import { api, Product, Category, CARD_FIELDS } from "@/lib/api";
 import ProductCard from "@/components/ProductCard";
 import { useApp } from "@/lib/context";
 
 export default function HomePage() {
-  const { user } = useApp();
+  const { user, loading } = useApp();
   const [featured, setFeatured]   = useState<Product[]>([]);
   const [trending, setTrending]   = useState<Product[]>([]);
   const [categories, setCategories] = useState<Category[]>([]);
   const [wishlistIds, setWishlistIds] = useState<Set<string>>(new Set());
+  const wishlistFor = useRef<string | null | undefined>(undefined);   // whose wishlist wishlistIds holds; undefined before the first load
 
   useEffect(() => {
-    api.products.featured().then((r: unknown) => { const res = r as { data: Product[] }; setFeatured(res.data); });
-    api.products.trending().then((r: unknown) => { const res = r as { data: Product[] }; setTrending(res.data); });
-    api.categories.list().then((r: unknown) => { const res = r as { data: Category[] }; setCategories(res.data); });
-  }, []);
+    // One round trip for everything the page needs, once the session is restored
+    // so we know whether to ask for the wishlist
+    if (loading || wishlistFor.current !== undefined) return;
+    wishlistFor.current = user?.id ?? null;
+    const fields = CARD_FIELDS.join(",");
+    api.batch([
+      { path: "/api/products/featured", query: { fields } },
+      { path: "/api/products/trending", query: { fields } },
+      { path: "/api/categories" },
+      ...(user ? [{ path: "/api/wishlist" }] : []),
+    ]).then(({ data: [featured, trending, categories, wishlist] }) => {
+      if (featured.status === 200) setFeatured(featured.body.data as Product[]);
+      if (trending.status === 200) setTrending(trending.body.data as Product[]);
+      if (categories.status === 200) setCategories(categories.body.data as Category[]);
+      if (wishlist?.status === 200) {
+        setWishlistIds(new Set((wishlist.body.data as Array<{ id: string }>).map(p => p.id)));
+      }
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [loading]);
 
   useEffect(() => {
-    if (user) {
-      api.wishlist.get().then((r: unknown) => {
-        const res = r as { data: Array<{ id: string }> };
-        setWishlistIds(new Set(res.data.map(p => p.id)));
-      });
-    }
-  }, [user]);
+    // Signing in or out later only changes the wishlist; the catalog stays
+    const uid = user?.id ?? null;
+    if (wishlistFor.current === undefined || wishlistFor.current === uid) return;
+    wishlistFor.current = uid;
+    if (!uid) { setWishlistIds(new Set()); return; }
+    api.wishlist.get().then((r: unknown) => {
+      const res = r as { data: Array<{ id: string }> };
+      setWishlistIds(new Set(res.data.map(p => p.id)));
+    });
+  }, [user?.id]);
 
   const toggleWishlist = async (pid: string) => {
     await api.wishlist.toggle(pid);
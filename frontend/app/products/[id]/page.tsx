@@ -1,14 +1,14 @@
 "use client";
-import { use, useEffect, useState } from "react";
+import { use, useEffect, useRef, useState } from "react";
 import Link from "next/link";
 import { useRouter } from "next/navigation";
 import { Star, Heart, ShoppingCart, ChevronRight, Plus, Minus } from "lucide-react";
-import { api, Product, Review } from "@/lib/api";
+import { api, Product, Review, ReviewSort } from "@/lib/api";
 import { useApp } from "@/lib/context";
 
 export default function ProductDetailPage({ params }: { params: Promise<{ id: string }> }) {
   const { id } = use(params);
-  const { user, addToCart } = useApp();
+  const { user, loading: restoring, addToCart } = useApp();
   const router = useRouter();
   const [product, setProduct] = useState<Product | null>(null);
   const [qty, setQty] = useState(1);
@@ -18,22 +18,41 @@ export default function ProductDetailPage({ params }: { params: Promise<{ id: st
   const [reviewForm, setReviewForm] = useState({ rating: 5, comment: "" });
   const [submitting, setSubmitting] = useState(false);
   const [reviewMsg, setReviewMsg] = useState("");
+  const [reviewSort, setReviewSort] = useState<ReviewSort>("newest");
+  const [loadingReviews, setLoadingReviews] = useState(false);
+
+  const wishlistFor = useRef<string | null | undefined>(undefined);   // whose wishlist `wishlisted` reflects; undefined before the first load
 
   useEffect(() => {
-    api.products.get(id)
-      .then((r: unknown) => { const res = r as { data: Product }; setProduct(res.data); })
+    // Product and wishlist in one round trip, once the session is restored
+    if (restoring) return;
+    wishlistFor.current = user?.id ?? null;
+    api.batch([
+      { path: `/api/products/${encodeURIComponent(id)}` },
+      ...(user ? [{ path: "/api/wishlist" }] : []),
+    ]).then(({ data: [product, wishlist] }) => {
+      if (product.status !== 200) { router.push("/products"); return; }
+      setProduct(product.body.data as Product);
+      if (wishlist?.status === 200) {
+        setWishlisted((wishlist.body.data as Array<{ id: string }>).some(p => p.id === id));
+      }
+    })
       .catch(() => router.push("/products"))
       .finally(() => setLoading(false));
-  }, [id, router]);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [id, restoring, router]);
 
   useEffect(() => {
-    if (user && product) {
-      api.wishlist.get().then((r: unknown) => {
-        const res = r as { data: Array<{ id: string }> };
-        setWishlisted(res.data.some(p => p.id === product.id));
-      });
-    }
-  }, [user, product]);
+    // Signing in or out later only changes the heart; the product stays
+    const uid = user?.id ?? null;
+    if (wishlistFor.current === undefined || wishlistFor.current === uid) return;
+    wishlistFor.current = uid;
+    if (!uid) { setWishlisted(false); return; }
+    api.wishlist.get().then((r: unknown) => {
+      const res = r as { data: Array<{ id: string }> };
+      setWishlisted(res.data.some(p => p.id === id));
+    });
+  }, [user?.id, id]);
 
   const handleAddToCart = async () => {
     if (!user) { router.push("/auth/login"); return; }
@@ -49,16 +68,40 @@ export default function ProductDetailPage({ params }: { params: Promise<{ id: st
     setWishlisted(res.data.wishlisted);
   };
 
+  // First page of "newest" comes with the product; other sorts and later pages from /reviews
+  const loadReviews = async (sort: ReviewSort, cursor?: string) => {
+    setLoadingReviews(true);
+    try {
+      const r = await api.products.reviews(product!.id, { sort, cursor }) as { data: Review[]; next_cursor: string | null };
+      setProduct(prev => prev ? {
+        ...prev,
+        reviews: cursor ? [...(prev.reviews || []), ...r.data] : r.data,
+        reviews_next_cursor: r.next_cursor,
+      } : prev);
+    } finally {
+      setLoadingReviews(false);
+    }
+  };
+
+  const handleReviewSort = (sort: ReviewSort) => {
+    setReviewSort(sort);
+    loadReviews(sort);
+  };
+
   const handleReview = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!user) { router.push("/auth/login"); return; }
     setSubmitting(true);
     try {
       const r = await api.products.addReview(product!.id, reviewForm.rating, reviewForm.comment) as { data: Review };
-      setProduct(prev => prev ? {
-        ...prev,
-        reviews: [r.data, ...(prev.reviews || [])],
-      } : prev);
+      setProduct(prev => {
+        if (!prev) return prev;
+        const histogram = prev.rating_histogram && {
+          ...prev.rating_histogram,
+          [r.data.rating]: prev.rating_histogram[String(r.data.rating) as keyof typeof prev.rating_histogram] + 1,
+        };
+        return { ...prev, rating_histogram: histogram, reviews: [r.data, ...(prev.reviews || [])] };
+      });
       setReviewForm({ rating: 5, comment: "" });
       setReviewMsg("Review submitted!");
       setTimeout(() => setReviewMsg(""), 3000);
@@ -139,6 +182,25 @@ export default function ProductDetailPage({ params }: { params: Promise<{ id: st
             <span className="font-semibold">{product.rating}</span>
             <span className="text-gray-400 text-sm">({product.review_count} reviews)</span>
           </div>
+          {product.rating_histogram && (
+            <div className="space-y-1 max-w-xs">
+              {(["5", "4", "3", "2", "1"] as const).map(star => {
+                const counts = Object.values(product.rating_histogram!);
+                const total = counts.reduce((a, b) => a + b, 0);
+                const n = product.rating_histogram![star];
+                return (
+                  <div key={star} className="flex items-center gap-2 text-xs text-gray-500">
+                    <span className="w-3">{star}</span>
+                    <Star className="w-3 h-3 fill-amber-400 text-amber-400" />
+                    <div className="flex-1 h-2 bg-gray-100 rounded-full overflow-hidden">
+                      <div className="h-full bg-amber-400" style={{ width: `${total ? (n / total) * 100 : 0}%` }} />
+                    </div>
+                    <span className="w-8 text-right">{n}</span>
+                  </div>
+                );
+              })}
+            </div>
+          )}
 
           {/* Price */}
           <div className="flex items-baseline gap-3">
@@ -194,7 +256,16 @@ export default function ProductDetailPage({ params }: { params: Promise<{ id: st
 
       {/* Reviews */}
       <section>
-        <h2 className="text-2xl font-bold mb-6">Reviews</h2>
+        <div className="flex items-center justify-between mb-6">
+          <h2 className="text-2xl font-bold">Reviews</h2>
+          <select value={reviewSort} onChange={e => handleReviewSort(e.target.value as ReviewSort)}
+            className="input w-auto text-sm">
+            <option value="newest">Newest</option>
+            <option value="oldest">Oldest</option>
+            <option value="highest">Highest rated</option>
+            <option value="lowest">Lowest rated</option>
+          </select>
+        </div>
         <div className="grid grid-cols-1 md:grid-cols-2 gap-8">
           {/* Review form */}
           <div className="card p-6">
@@ -260,6 +331,12 @@ export default function ProductDetailPage({ params }: { params: Promise<{ id: st
                 <p className="text-sm text-gray-600">{review.comment}</p>
               </div>
             ))}
+            {product.reviews_next_cursor && (
+              <button onClick={() => loadReviews(reviewSort, product.reviews_next_cursor!)} disabled={loadingReviews}
+                className="w-full py-2 text-sm text-primary-600 font-medium hover:underline">
+                {loadingReviews ? "Loading..." : "Show more reviews"}
+              </button>
+            )}
           </div>
         </div>
       </section>
@@ -2,7 +2,7 @@
 import { useEffect, useState, useCallback } from "react";
 import { useSearchParams, useRouter } from "next/navigation";
 import { Search, SlidersHorizontal, X } from "lucide-react";
-import { api, Product, Category } from "@/lib/api";
+import { api, Product, Category, CARD_FIELDS } from "@/lib/api";
 import ProductCard from "@/components/ProductCard";
 import { useApp } from "@/lib/context";
 import { Suspense } from "react";
@@ -27,7 +27,7 @@ function ProductsContent() {
   const load = useCallback(async () => {
     setLoading(true);
     try {
-      const res = await api.products.list({ category, search, sort, per_page: 50 }) as { data: Product[]; total: number };
+      const res = await api.products.list({ category, search, sort, per_page: 50, fields: CARD_FIELDS }) as { data: Product[]; total: number };
       setProducts(res.data);
       setTotal(res.total);
     } finally {
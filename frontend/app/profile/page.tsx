@@ -44,7 +44,9 @@ export default function ProfilePage() {
     e.preventDefault();
     if (pw.newPw !== pw.confirm) { setPwMsg({ text: "Passwords don't match", ok: false }); return; }
     try {
-      await api.users.changePassword(pw.old, pw.newPw);
+      const res = await api.users.changePassword(pw.old, pw.newPw) as { data: { token: string } };
+      // Other sessions are signed out; keep this one on the new token
+      localStorage.setItem("urmart_token", res.data.token);
       setPwMsg({ text: "Password changed!", ok: true });
       setPw({ old: "", newPw: "", confirm: "" });
     } catch (err: unknown) {
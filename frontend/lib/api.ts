@@ -22,6 +22,71 @@ async function request<T = unknown>(
   return data;
 }
 
+function orderQuery(params?: OrderListParams): URLSearchParams {
+  const q = new URLSearchParams();
+  if (params?.status) q.set("status", params.status);
+  if (params?.from) q.set("from", params.from);
+  if (params?.to) q.set("to", params.to);
+  if (params?.cursor) q.set("cursor", params.cursor);
+  if (params?.limit) q.set("limit", String(params.limit));
+  return q;
+}
+
+// Server-sent order events. EventSource can't send headers, so each open first
+// trades the token for a short-lived stream ticket and only that goes in the
+// URL. The browser reconnects dropped streams by itself and resumes after the
+// last event id; once that is refused we look at why. A stream that had been
+// open (its ticket has expired by now) opens again at once with a new ticket.
+// One that never opened (the server is busy, 503) falls back to the normal
+// list poll: `reload` runs and the stream is tried again after a backoff that
+// doubles up to a minute, so a full server sees polls, not a reconnect storm.
+// Returns a function that closes the stream.
+const STREAM_RETRY_MS = 5000;
+const STREAM_RETRY_MAX_MS = 60000;
+
+function orderEvents(path: string, onEvent: (e: OrderEvent) => void, reload?: () => void): () => void {
+  let source: EventSource | null = null;
+  let lastId = "";
+  let retry: ReturnType<typeof setTimeout> | undefined;
+  let backoff = STREAM_RETRY_MS;
+  let closed = false;
+  const refused = () => {
+    if (closed) return;
+    reload?.();
+    retry = setTimeout(open, backoff);
+    backoff = Math.min(backoff * 2, STREAM_RETRY_MAX_MS);
+  };
+  const open = async () => {
+    let ticket: string;
+    try {
+      ticket = (await request<{ data: { ticket: string } }>("/api/orders/events/ticket", { method: "POST" })).data.ticket;
+    } catch {
+      refused();
+      return;
+    }
+    if (closed) return;
+    const q = new URLSearchParams({ ticket });
+    if (lastId) q.set("last_event_id", lastId);
+    let opened = false;
+    source = new EventSource(`${BASE}${path}?${q}`);
+    source.onopen = () => { opened = true; backoff = STREAM_RETRY_MS; };
+    const handle = (m: MessageEvent) => {
+      lastId = m.lastEventId || lastId;
+      onEvent(JSON.parse(m.data));
+    };
+    source.addEventListener("order.created", handle);
+    source.addEventListener("order.status", handle);
+    source.addEventListener("resync", () => reload?.());
+    source.onerror = () => {
+      if (closed || source?.readyState !== EventSource.CLOSED) return;
+      if (opened) open();
+      else refused();
+    };
+  };
+  open();
+  return () => { closed = true; clearTimeout(retry); source?.close(); };
+}
+
 // ── Auth ──────────────────────────────────────────────────────────
 export const api = {
   auth: {
@@ -65,11 +130,21 @@ export const api = {
       if (params?.sort) q.set("sort", params.sort);
       if (params?.page) q.set("page", String(params.page));
       if (params?.per_page) q.set("per_page", String(params.per_page));
+      if (params?.fields) q.set("fields", params.fields.join(","));
       return request(`/api/products?${q}`);
     },
     get: (id: string) => request(`/api/products/${id}`),
-    featured: () => request("/api/products/featured"),
-    trending: () => request("/api/products/trending"),
+    featured: (fields?: readonly string[]) =>
+      request(`/api/products/featured${fields ? `?fields=${fields.join(",")}` : ""}`),
+    trending: (fields?: readonly string[]) =>
+      request(`/api/products/trending${fields ? `?fields=${fields.join(",")}` : ""}`),
+    reviews: (pid: string, params?: ReviewParams) => {
+      const q = new URLSearchParams();
+      if (params?.sort) q.set("sort", params.sort);
+      if (params?.cursor) q.set("cursor", params.cursor);
+      if (params?.per_page) q.set("per_page", String(params.per_page));
+      return request(`/api/products/${pid}/reviews?${q}`);
+    },
     addReview: (pid: string, rating: number, comment: string) =>
       request(`/api/products/${pid}/reviews`, { method: "POST", body: JSON.stringify({ rating, comment }) }),
   },
@@ -104,8 +179,10 @@ export const api = {
   orders: {
     place: (data: OrderInput) =>
       request("/api/orders", { method: "POST", body: JSON.stringify(data) }),
-    list: () => request("/api/orders"),
+    list: (params?: OrderListParams) => request(`/api/orders?${orderQuery(params)}`),
     get: (id: string) => request(`/api/orders/${id}`),
+    events: (onEvent: (e: OrderEvent) => void, reload?: () => void) =>
+      orderEvents("/api/orders/events", onEvent, reload),
   },
 
   // ── Admin ─────────────────────────────────────────────────────
@@ -120,11 +197,18 @@ export const api = {
       delete: (id: string) => request(`/api/admin/products/${id}`, { method: "DELETE" }),
     },
     orders: {
-      list: (status?: string) => request(`/api/admin/orders${status ? `?status=${status}` : ""}`),
+      list: (params?: OrderListParams) => request(`/api/admin/orders?${orderQuery(params)}`),
       updateStatus: (id: string, status: string) =>
         request(`/api/admin/orders/${id}/status`, { method: "PUT", body: JSON.stringify({ status }) }),
+      events: (onEvent: (e: OrderEvent) => void, reload?: () => void) =>
+        orderEvents("/api/admin/orders/events", onEvent, reload),
     },
   },
+
+  // ── Batch ─────────────────────────────────────────────────────
+  // Several API calls in one round trip; results come back in order, each with its own status
+  batch: (requests: BatchRequest[]) =>
+    request<{ data: BatchResult[] }>("/api/batch", { method: "POST", body: JSON.stringify({ requests }) }),
 };
 
 // ── Types ─────────────────────────────────────────────────────────────────────
@@ -162,7 +246,9 @@ export interface Product {
   review_count: number;
   is_active: boolean;
   created_at: string;
+  rating_histogram?: Record<"1" | "2" | "3" | "4" | "5", number>;
   reviews?: Review[];
+  reviews_next_cursor?: string | null;
 }
 
 export interface Review {
@@ -175,6 +261,14 @@ export interface Review {
   created_at: string;
 }
 
+export type ReviewSort = "newest" | "oldest" | "highest" | "lowest";
+
+export interface ReviewParams {
+  sort?: ReviewSort;
+  cursor?: string;
+  per_page?: number;
+}
+
 export interface CartItem {
   id: string;
   qty: number;
@@ -252,6 +346,15 @@ export interface Order {
   user_email?: string;
 }
 
+export interface OrderEvent {
+  type: "order.created" | "order.status";
+  order_id: string;
+  user_id: string;
+  status: string;
+  total: number;
+  at: string;
+}
+
 export interface OrderInput {
   address: {
     line1: string;
@@ -270,4 +373,35 @@ export interface ProductParams {
   sort?: string;
   page?: number;
   per_page?: number;
+  fields?: readonly string[];
+}
+
+// Columns a ProductCard renders; grids ask for just these (`?fields=`)
+export const CARD_FIELDS = [
+  "name", "emoji", "brand", "weight", "price", "mrp", "discount", "stock", "rating", "review_count",
+] as const;
+
+export interface OrderListParams {
+  status?: string;
+  from?: string;
+  to?: string;
+  cursor?: string;
+  limit?: number;
+}
+
+export interface BatchRequest {
+  path: string;
+  method?: string;
+  query?: string | Record<string, string>;
+  body?: unknown;
+}
+
+export interface BatchResult<T = unknown> {
+  status: number;
+  body: { success: boolean; message: string; data?: T };
+}
+
+export interface OrderPage {
+  data: Order[];
+  next_cursor: string | null;
 }
@@ -2,14 +2,27 @@
 """
 UR MART — Full Stack Startup Script
 Starts the Flask backend which also serves the React frontend.
+
+    python start.py                              # dev server (debug, opens a browser)
+    python start.py --workers 4 --threads 8      # production: pre-forked workers
+    python start.py --asgi [--workers 4]         # ASGI via uvicorn
+
+Production mode imports the app once in the master (so init_db() runs once),
+then forks workers that share the listening socket. Each worker serves
+requests on a fixed pool of threads with debug off.
+  SIGHUP          replace workers one at a time, each old one after its
+                  in-flight requests finish
+  SIGTERM/Ctrl-C  stop accepting, let workers finish (--graceful-timeout), exit
+  --max-requests  recycle a worker after that many requests (+ jitter)
+The app is preloaded, so code changes need a full restart, not a HUP.
 """
 
-import subprocess, sys, os, webbrowser, time
+import argparse, importlib.util, random, secrets, signal, socket, subprocess, sys, os, threading, webbrowser, time
+from concurrent.futures import ThreadPoolExecutor
 
-def main():
-    backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
-    app_py      = os.path.join(backend_dir, "app.py")
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
 
+def banner(url):
     print("\n" + "═"*56)
     print("  ██╗   ██╗██████╗     ███╗   ███╗ █████╗ ██████╗ ████████╗")
     print("  ██║   ██║██╔══██╗    ████╗ ████║██╔══██╗██╔══██╗╚══██╔══╝")
@@ -19,25 +32,308 @@ def main():
     print("   ╚═════╝ ╚═╝  ╚═╝    ╚═╝     ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝   ╚═╝   ")
     print("═"*56)
     print("  Tech Stack: Flask + SQLite + JWT + React 18")
-    print("  URL:        http://localhost:5000")
+    print(f"  URL:        {url}")
     print("  Admin:      admin@urmart.com / admin123")
     print("  Coupons:    WELCOME10 · SAVE50 · FRESH20")
     print("═"*56 + "\n")
 
+# ─── Production server ────────────────────────────────────────────────────────
+
+def make_server_class():
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class Handler(WSGIRequestHandler):
+        # One request per connection: idle keep-alives can't pin pool threads
+        protocol_version = "HTTP/1.0"
+
+        def make_environ(self):
+            environ = super().make_environ()
+            environ["urmart.sendfile"] = self.sendfile   # used by the app's static file bodies
+            return environ
+
+        def sendfile(self, file, offset, count):
+            """Zero-copy: the kernel copies the file straight into the socket."""
+            self.connection.sendfile(file, offset, count)
+
+    class PoolServer(BaseWSGIServer):
+        """WSGI server on an inherited listening socket with a fixed thread pool.
+
+        A connection is only accepted once a thread is free, so a busy worker
+        leaves new connections for its siblings.
+        """
+        multithread = True
+
+        def __init__(self, sock, app, threads, max_requests):
+            host, port = sock.getsockname()[:2]
+            super().__init__(host, port, app, handler=Handler, fd=sock.fileno())
+            self.socket.setblocking(False)  # siblings race for accept(); losers just go back to select
+            self.slots        = threading.BoundedSemaphore(threads)
+            self.pool         = ThreadPoolExecutor(threads, thread_name_prefix="http")
+            self.max_requests = max_requests
+            self.handled      = 0
+
+        def get_request(self):
+            self.slots.acquire()
+            try:
+                return super().get_request()
+            except BaseException:
+                self.slots.release()
+                raise
+
+        def process_request(self, request, client_address):
+            self.handled += 1
+            self.pool.submit(self._handle, request, client_address)
+            if self.max_requests and self.handled >= self.max_requests:
+                self.stop()
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self.slots.release()
+
+        def stop(self):
+            # shutdown() waits for serve_forever(), so it can't run on that thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+    return PoolServer
+
+
+class Arbiter:
+    """Keeps `workers` forked server processes alive on a shared socket."""
+
+    def __init__(self, sock, app, workers, threads, max_requests, jitter, graceful_timeout,
+                 on_worker_stop=None, on_worker_exit=None):
+        self.sock             = sock
+        self.app              = app
+        self.on_worker_stop   = on_worker_stop   # before waiting for in-flight requests: end long-lived ones
+        self.on_worker_exit   = on_worker_exit   # workers leave via os._exit(): no atexit hooks
+        self.size             = workers
+        self.threads          = threads
+        self.max_requests     = max_requests
+        self.jitter           = jitter
+        self.graceful_timeout = graceful_timeout
+        self.server_class     = make_server_class()
+        self.workers          = {}   # pid -> start time
+        self.stopping         = False
+        self.reloading        = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT,  self._on_stop)
+        signal.signal(signal.SIGHUP,  self._on_reload)
+        print(f"[*] Master {os.getpid()}: {self.size} workers × {self.threads} threads")
+        while not self.stopping:
+            self.reap()
+            if self.reloading:
+                self.reloading = False
+                self.reload()
+            while len(self.workers) < self.size and not self.stopping:
+                self.spawn()
+            time.sleep(0.5)
+        self.shutdown()
+
+    def reload(self):
+        """Replace workers one at a time.
+
+        Each old worker is stopped only after its replacement is forked, and
+        the next one only after it has exited (in-flight requests finish,
+        up to --graceful-timeout). A replacement that dies ends the reload,
+        leaving the remaining old workers serving.
+        """
+        print("[*] SIGHUP: replacing workers one at a time")
+        for pid in list(self.workers):
+            if self.stopping:
+                return
+            new = self.spawn()
+            self.kill(pid, signal.SIGTERM)
+            deadline = time.monotonic() + self.graceful_timeout
+            while pid in self.workers and not self.stopping:
+                self.reap()
+                if time.monotonic() > deadline:
+                    self.kill(pid, signal.SIGKILL)
+                time.sleep(0.1)
+            if new not in self.workers:
+                print(f"[!] Replacement worker {new} exited; stopping the reload")
+                return
+
+    def spawn(self):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+        code = 0
+        try:
+            self.serve()
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def serve(self):
+        """Worker process body."""
+        max_requests = self.max_requests and self.max_requests + random.randint(0, self.jitter)
+        server = self.server_class(self.sock, self.app, self.threads, max_requests)
+        signal.signal(signal.SIGTERM, lambda *_: server.stop())
+        signal.signal(signal.SIGINT,  signal.SIG_IGN)   # Ctrl-C reaches the whole group; the master decides
+        signal.signal(signal.SIGHUP,  signal.SIG_IGN)
+        server.serve_forever(poll_interval=0.5)
+        if self.on_worker_stop:
+            self.on_worker_stop()
+        server.pool.shutdown(wait=True)   # let in-flight requests finish
+        if self.on_worker_exit:
+            self.on_worker_exit()
+        if max_requests and server.handled >= max_requests:
+            print(f"[*] Worker {os.getpid()} recycled after {server.handled} requests")
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            started = self.workers.pop(pid, None)
+            if started is not None and os.waitstatus_to_exitcode(status) != 0 and not self.stopping:
+                print(f"[!] Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+                if time.monotonic() - started < 1:
+                    time.sleep(1)   # don't spin if workers die on boot
+
+    def kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+    def shutdown(self):
+        print("\n[*] Shutting down UR MART...")
+        for pid in list(self.workers):
+            self.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            self.kill(pid, signal.SIGKILL)
+        self.reap()
+        self.sock.close()
+
+    def _on_stop(self, *_):
+        self.stopping = True
+
+    def _on_reload(self, *_):
+        self.reloading = True
+
+
+def serve_production(args):
+    if not hasattr(os, "fork"):
+        sys.exit("[!] --workers needs a platform with fork(); use --asgi --workers there")
+    host, _, port = args.bind.rpartition(":")
+    sock = socket.create_server((host or "0.0.0.0", int(port)), backlog=2048)
+
+    sys.path.insert(0, BACKEND_DIR)
     print("[*] Initializing SQLite database...")
-    print("[*] Starting Flask server on port 5000...\n")
+    import app as urmart    # preload: init_db() runs here, once, before forking
+    urmart.app.debug = False
+    if args.seed and urmart.seed_db():
+        print("[*] Demo data loaded")
+    if args.precompress:
+        print(f"[*] Precompressed {urmart.precompress_static()} static file(s)")
+    if urmart.CART_STORE == "memory" and args.workers > 1:
+        sys.exit("[!] CART_STORE=memory keeps carts per process; use CART_STORE=shared with --workers > 1")
+    urmart.cart_store.start()   # CART_STORE=shared: one store process, before the workers fork
+
+    banner(f"http://{host or '0.0.0.0'}:{port}")
+    try:
+        Arbiter(sock, urmart.app, args.workers, args.threads, args.max_requests,
+                args.max_requests_jitter, args.graceful_timeout,
+                on_worker_stop=urmart.order_events.close, on_worker_exit=urmart.cart_store.close).run()
+    finally:
+        urmart.cart_store.close()
+
+# ─── Entry point ──────────────────────────────────────────────────────────────
+
+def main():
+    ap = argparse.ArgumentParser(description="Start UR MART")
+    ap.add_argument("--asgi", action="store_true",
+                    help="serve backend/asgi.py with uvicorn instead of the Flask dev server")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="production mode: number of worker processes")
+    ap.add_argument("--threads", type=int, default=8, help="request threads per worker")
+    ap.add_argument("--bind", default="0.0.0.0:5000", help="HOST:PORT to listen on")
+    ap.add_argument("--max-requests", type=int, default=0,
+                    help="recycle a worker after this many requests (0 = never)")
+    ap.add_argument("--max-requests-jitter", type=int, default=0,
+                    help="random extra requests per worker so they don't recycle together")
+    ap.add_argument("--seed", action="store_true",
+                    help="--workers: load the demo data first (dev servers, without --workers, always do)")
+    ap.add_argument("--precompress", action="store_true",
+                    help="production mode: write .gz/.br copies of the frontend build first")
+    ap.add_argument("--graceful-timeout", type=float, default=30,
+                    help="seconds workers get to finish in-flight requests on shutdown or SIGHUP")
+    args = ap.parse_args()
+
+    if args.workers and not args.asgi:
+        return serve_production(args)
+
+    app_py  = os.path.join(BACKEND_DIR, "app.py")
+    command = [sys.executable, app_py]
+    if args.asgi:
+        if importlib.util.find_spec("uvicorn") is None:
+            sys.exit("[!] --asgi needs uvicorn: pip install uvicorn")
+        host, _, port = args.bind.rpartition(":")
+        command = [sys.executable, "-m", "uvicorn", "asgi:application",
+                   "--host", host or "0.0.0.0", "--port", port]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+
+    # uvicorn spawns its workers rather than forking them from us, so each
+    # would draw its own SECRET_KEY and build its own cart store: pick the key
+    # here, refuse "memory", and host "shared" here
+    env, carts = dict(os.environ), None
+    if args.asgi and args.workers > 1:
+        env.setdefault("SECRET_KEY", secrets.token_hex(32))
+    store = os.environ.get("CART_STORE", "sql")
+    if args.asgi and args.workers > 1 and store == "memory":
+        sys.exit("[!] CART_STORE=memory keeps carts per process; use CART_STORE=shared with --workers > 1")
+    if args.asgi and args.workers > 1 and store == "shared":
+        sys.path.insert(0, BACKEND_DIR)
+        import app as urmart
+        carts = urmart.cart_store
+        carts.start()
+        env.update(carts.environ())
+
+    banner("http://localhost:5000" if not args.asgi else f"http://{args.bind}")
+    print("[*] Initializing SQLite database...")
+    if args.asgi and (args.seed or not args.workers):
+        # app.py seeds when run directly; asgi.py, like any import of app, doesn't
+        subprocess.run([sys.executable, "-m", "flask", "--app", "app", "seed"], cwd=BACKEND_DIR, check=True)
+    print(f"[*] Starting {'ASGI (uvicorn)' if args.asgi else 'Flask'} server"
+          f" on {args.bind if args.asgi else 'port 5000'}...\n")
 
     try:
         proc = subprocess.Popen(
-            [sys.executable, app_py],
-            cwd=backend_dir,
+            command,
+            cwd=BACKEND_DIR,
+            env=env,
         )
         time.sleep(1.5)
-        webbrowser.open("http://localhost:5000")
+        if not args.workers:
+            webbrowser.open("http://localhost:5000")
         proc.wait()
     except KeyboardInterrupt:
         print("\n[*] Shutting down UR MART...")
         proc.terminate()
+        proc.wait()
+    finally:
+        if carts:
+            carts.close()   # after the workers: flushes every cart they left
 
 if __name__ == "__main__":
     main()